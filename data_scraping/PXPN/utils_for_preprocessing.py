@@ -1,62 +1,447 @@
 import os
+import hashlib
+import shutil
+import tempfile
+import threading
 import zipfile
 import pandas as pd
 import numpy as np
+from collections import OrderedDict
+from itertools import repeat
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 
+from library.cache_utils import file_fingerprint, make_cache_key, load_cached_table, save_cached_table
+from library.id_filter import IdFilter
+from library.ingest_manifest import IngestManifest
+from library.minute_features import interpolate_days, fit_cosinor_days, acrophase_to_hours, daily_stats
+from library.hr_features import HR_FEATURE_GROUPS, padded_day_signals
 
+PASSIVE_SKIP_PATTERNS = ['__MACOSX', '/._', '.DS_Store']
+# inner ZIP이 이 크기(바이트)를 넘으면 메모리 대신 임시 파일로 내려 씁니다.
+SPOOL_MAX_SIZE = 64 * 1024 * 1024
+# 패시브 데이터 추출에서 기본으로 제외하는 환자 ID 접두사
+PASSIVE_DENY_PREFIXES = ('SRTN',)
 
-import zipfile
-import pandas as pd
-from io import BytesIO
 
-def read_all_data(title, outer_zip_path, exclude_keywords=None):
+def _list_passive_entries(outer_zf, id_filter=None):
     """
-    title 키워드를 포함한 CSV 파일을 모두 읽어 DataFrame 으로 결합하여 반환합니다.
-    outer_zip_path: 'raw_data/PXPN/pixelpanic_raw_data.zip' 같은 상대 또는 절대 경로를 지정하세요.
-    exclude_keywords: 해당 키워드가 포함된 파일명은 건너뜁니다.
+    바깥 ZIP 안의 환자별 `_PassiveData.zip` 항목을 (pid, 경로) 리스트로 반환합니다. 숨김 파일은 제외합니다.
+    id_filter(IdFilter)를 통과하지 못한 환자의 inner ZIP은 목록에서 빠지므로 압축을 풀지 않으며,
+    건너뛴 개수와 압축 크기가 필터별로 집계됩니다.
+    id_filter를 주지 않으면 IdFilter(deny_prefixes=PASSIVE_DENY_PREFIXES)로 SRTN 환자만 제외합니다.
+    (직접 넘기는 필터에는 SRTN 제외도 포함해야 합니다.)
+    """
+    if id_filter is None:
+        id_filter = IdFilter(deny_prefixes=PASSIVE_DENY_PREFIXES)
+    entries = []
+    for info in outer_zf.infolist():
+        f = info.filename
+        raw = os.path.basename(f)
+        if ('PassiveData/' in f and raw.endswith('.zip') and '_PassiveData' in raw
+                and not any(x in f for x in PASSIVE_SKIP_PATTERNS)):
+            pid = raw.split('_PassiveData')[0]
+            if not id_filter.accepts(pid, n_bytes=info.compress_size):
+                continue
+            entries.append((pid, f))
+    return entries
+
+
+def _matches_title(member, title, exclude_keywords):
+    name_lower = member.lower()
+    return (title in member and name_lower.endswith('.csv')
+            and (exclude_keywords is None or not any(kw.lower() in name_lower for kw in exclude_keywords)))
+
+
+def _spool_inner_zip(outer_zf, zip_path, spool_max_size=SPOOL_MAX_SIZE):
+    """
+    inner ZIP을 SpooledTemporaryFile로 복사하여 seek 가능한 파일 객체로 반환합니다.
+    spool_max_size를 넘는 inner ZIP은 디스크 임시 파일에 저장되므로 메모리에 통째로 올라가지 않습니다.
+    ZIP 형식이 아니면 None을 반환합니다. 호출한 쪽에서 close() 해야 합니다.
+    """
+    spool = tempfile.SpooledTemporaryFile(max_size=spool_max_size)
+    with outer_zf.open(zip_path) as inner_stream:
+        shutil.copyfileobj(inner_stream, spool, 1024 * 1024)
+    spool.seek(0)
+    if not zipfile.is_zipfile(spool):
+        spool.close()
+        return None
+    spool.seek(0)
+    return spool
+
+
+def _extract_inner(outer_zf, zip_path, pid, specs):
+    """
+    inner ZIP 하나를 풀어 {spec 이름: [DataFrame, ...]}을 반환합니다.
+    CSV는 한 번만 파싱하여 일치하는 모든 spec의 리스트에 담습니다.
+    """
+    sinks = {name: [] for name in specs}
+    spool = _spool_inner_zip(outer_zf, zip_path)
+    if spool is None:
+        return sinks
+    with spool, zipfile.ZipFile(spool, 'r') as inner_zf:
+        for member in inner_zf.namelist():
+            targets = [name for name, (title, exclude_keywords) in specs.items()
+                       if _matches_title(member, title, exclude_keywords)]
+            if not targets:
+                continue
+            with inner_zf.open(member) as csvfile:
+                try:
+                    df_temp = pd.read_csv(csvfile, index_col=False)
+                except Exception:
+                    continue
+            df_temp['ID'] = pid
+            for name in targets:
+                sinks[name].append(df_temp)
+    return sinks
+
+
+def _extract_entries(outer_zip_path, entries, specs):
+    """
+    entries의 inner ZIP을 한 번씩만 풀어, 각 CSV를 일치하는 모든 spec의 리스트에 담아 반환합니다.
+    프로세스 풀의 작업 단위로도 사용되므로 모듈 최상위 함수로 둡니다.
+    """
+    sinks = {name: [] for name in specs}
+    with zipfile.ZipFile(outer_zip_path, 'r') as outer_zf:
+        for pid, zip_path in entries:
+            for name, frames in _extract_inner(outer_zf, zip_path, pid, specs).items():
+                sinks[name].extend(frames)
+    return sinks
+
+
+def _extract_all(specs, outer_zip_path, n_jobs, chunk_size, id_filter=None):
+    with zipfile.ZipFile(outer_zip_path, 'r') as outer_zf:
+        entries = _list_passive_entries(outer_zf, id_filter)
+
+    chunks = [entries[i:i + chunk_size] for i in range(0, len(entries), chunk_size)]
+    if n_jobs is None or n_jobs < 1:
+        n_jobs = os.cpu_count() or 1
+
+    if n_jobs == 1 or len(chunks) <= 1:
+        results = [_extract_entries(outer_zip_path, entries, specs)]
+    else:
+        with ProcessPoolExecutor(max_workers=min(n_jobs, len(chunks))) as executor:
+            # map은 입력 순서를 유지하므로 환자 순서가 단일 프로세스 결과와 같습니다.
+            results = list(executor.map(_extract_entries,
+                                        repeat(outer_zip_path), chunks, repeat(specs)))
+
+    merged = {}
+    for name in specs:
+        frames = [df for sinks in results for df in sinks[name]]
+        merged[name] = pd.concat(frames, axis=0, ignore_index=True) if frames else pd.DataFrame()
+    return merged
+
+
+def read_all_data_multi(specs, outer_zip_path, n_jobs=1, chunk_size=16, cache_dir=None, id_filter=None):
+    """
+    여러 title을 바깥 ZIP 한 번 순회로 추출합니다.
+    specs: {이름: (title, exclude_keywords)} 형태의 dict. 예)
+        {'step': ('Step', ['resting', 'variability']),
+         'heartrate': ('HeartRate', ['resting', 'variability'])}
+    n_jobs: inner ZIP을 처리할 프로세스 수 (1이면 현재 프로세스, -1 또는 None이면 CPU 수만큼).
+    chunk_size: 한 작업(프로세스 호출)이 처리할 inner ZIP 개수.
+    cache_dir: 지정하면 추출 결과를 캐시합니다. 캐시 키는 ZIP 파일의 내용 해시와
+        (title, exclude_keywords)이며, 캐시가 없는 title만 추출합니다.
+    id_filter: IdFilter를 주면 허용/제외 목록에 따라 환자의 inner ZIP을 열지 않고 건너뜁니다.
+        (주지 않으면 SRTN 환자만 제외합니다. _list_passive_entries 참고)
+    반환값은 {이름: DataFrame}이며, 각 DataFrame은 read_all_data(title, ...)와 같은 행 순서를 가집니다.
+    """
+    try:
+        fingerprint = file_fingerprint(outer_zip_path) if cache_dir is not None else None
+        if fingerprint is None:
+            return _extract_all(specs, outer_zip_path, n_jobs, chunk_size, id_filter)
+
+        loaded, keys = {}, {}
+        for name, (title, exclude_keywords) in specs.items():
+            params = {'loader': 'read_all_data', 'title': title, 'exclude_keywords': exclude_keywords}
+            if id_filter is not None:
+                params['id_filter'] = id_filter.cache_params()
+            keys[name] = make_cache_key([fingerprint], params)
+            df = load_cached_table(cache_dir, keys[name])
+            if df is not None:
+                loaded[name] = df
+
+        pending = {name: spec for name, spec in specs.items() if name not in loaded}
+        if pending:
+            for name, df in _extract_all(pending, outer_zip_path, n_jobs, chunk_size, id_filter).items():
+                save_cached_table(df, cache_dir, keys[name])
+                loaded[name] = df
+        return {name: loaded[name] for name in specs}
+    except FileNotFoundError:
+        print(f"Outer ZIP not found: {outer_zip_path}")
+        return {name: pd.DataFrame() for name in specs}
+
+
+def _extract_patients(outer_zip_path, items, specs):
+    """
+    items: [(pid, zip_path, [spec 이름, ...]), ...]
+    환자(inner ZIP)별로 {spec 이름: DataFrame 또는 None} 리스트를 반환합니다. (프로세스 풀 작업 단위)
+    """
+    results = []
+    with zipfile.ZipFile(outer_zip_path, 'r') as outer_zf:
+        for pid, zip_path, names in items:
+            sinks = _extract_inner(outer_zf, zip_path, pid, {name: specs[name] for name in names})
+            results.append({name: pd.concat(frames, axis=0, ignore_index=True) if frames else None
+                            for name, frames in sinks.items()})
+    return results
+
+
+def _partition_name(pid, zip_path):
+    # 한 환자에게 inner ZIP이 여러 개일 수 있으므로 경로 해시를 덧붙입니다.
+    return f"{pid}_{hashlib.sha1(zip_path.encode('utf-8')).hexdigest()[:8]}"
+
+
+def read_all_data_incremental(specs, outer_zip_path, output_dir, n_jobs=1, chunk_size=16, id_filter=None):
+    """
+    read_all_data_multi의 증분(incremental) 버전입니다.
+    환자별 inner ZIP의 추출 결과를 output_dir/<이름>/ 아래에 환자 단위 파티션으로 저장하고,
+    output_dir/manifest.json에 (pid, inner ZIP 경로, CRC/크기, title 설정) → 파티션 경로를 기록합니다.
+    새 데이터로 다시 실행하면 CRC/크기가 바뀌었거나 새로 추가된 환자만 압축을 풀어 추출하고,
+    나머지는 기존 파티션을 그대로 사용합니다. 아카이브에서 사라진 환자의 파티션은 삭제합니다.
+    (inner ZIP의 CRC/크기는 바깥 ZIP의 목록에 있으므로 확인할 때 압축을 풀지 않습니다.)
+
+    specs, n_jobs, chunk_size, id_filter는 read_all_data_multi와 같습니다.
+    (id_filter로 제외된 환자는 아카이브에서 사라진 환자와 같이 파티션이 삭제됩니다.)
+    추출 결과는 환자 청크가 끝날 때마다 바로 파티션으로 저장하고, 환자를 모두 이어 붙이지 않습니다.
+    반환값은 {이름: PassivePartitions}이며, 파티션을 read_all_data_multi와 같은 행 순서로 하나씩 읽습니다.
     """
-    all_data_list = []
+    manifest = IngestManifest(os.path.join(output_dir, 'manifest.json'))
     try:
         with zipfile.ZipFile(outer_zip_path, 'r') as outer_zf:
-            entries = []
-            for f in outer_zf.namelist():
-                raw = os.path.basename(f)
-                if ('PassiveData/' in f and raw.endswith('.zip') and '_PassiveData' in raw
-                        and not any(x in f for x in ['__MACOSX', '/._', '.DS_Store'])):
-                    pid = raw.split('_PassiveData')[0]
-                    if pid.startswith('SRTN'):
-                        continue
-                    entries.append((pid, f))
-            # 각 ZIP 파일 순회
-            for pid, zip_path in entries:
-                with outer_zf.open(zip_path) as inner_stream:
-                    buf = BytesIO(inner_stream.read())
-                    buf.seek(0)
-                    if not zipfile.is_zipfile(buf):
-                        continue
-                    buf.seek(0)
-                    with zipfile.ZipFile(buf, 'r') as inner_zf:
-                        for member in inner_zf.namelist():
-                            name_lower = member.lower()
-                            if (title in member and name_lower.endswith('.csv')
-                                    and (exclude_keywords is None or not any(kw.lower() in name_lower for kw in exclude_keywords))):
-                                with inner_zf.open(member) as csvfile:
-                                    try:
-                                        df_temp = pd.read_csv(csvfile, index_col=False)
-                                        df_temp['ID'] = pid
-                                        all_data_list.append(df_temp)
-                                    except Exception:
-                                        continue
+            entries = [(pid, zip_path, outer_zf.getinfo(zip_path))
+                       for pid, zip_path in _list_passive_entries(outer_zf, id_filter)]
     except FileNotFoundError:
         print(f"Outer ZIP not found: {outer_zip_path}")
-        return pd.DataFrame()
+        return {name: PassivePartitions(os.path.join(output_dir, name), []) for name in specs}
+
+    def signature(info, name):
+        title, exclude_keywords = specs[name]
+        return {'crc': info.CRC, 'size': info.file_size,
+                'title': title, 'exclude_keywords': exclude_keywords}
+
+    items = []
+    for pid, zip_path, info in entries:
+        names = [name for name in specs if not manifest.is_current(name, zip_path, signature(info, name))]
+        if names:
+            items.append((pid, zip_path, names))
+
+    # 아카이브에서 사라진 환자 정리
+    current_members = {zip_path for _, zip_path, _ in entries}
+    n_removed = 0
+    for name in specs:
+        for member in manifest.members(name):
+            if member not in current_members:
+                manifest.remove(name, member)
+                n_removed += 1
 
-    if all_data_list:
-        return pd.concat(all_data_list, axis=0, ignore_index=True)
+    def save(chunk, results):
+        # 바뀐 환자의 이전 파티션은 지움 (새 결과가 없거나 Parquet ↔ pickle 형식이 바뀌어도 옛 파일이 남지 않도록)
+        for (pid, zip_path, names), frames in zip(chunk, results):
+            for name in names:
+                manifest.remove(name, zip_path)
+                output = None
+                if frames[name] is not None:
+                    output = save_cached_table(frames[name], os.path.join(output_dir, name),
+                                               _partition_name(pid, zip_path))
+                manifest.record(name, zip_path, pid, signature(infos[zip_path], name), output)
+
+    infos = {zip_path: info for _, zip_path, info in entries}
+    chunks = [items[i:i + chunk_size] for i in range(0, len(items), chunk_size)]
+    if n_jobs is None or n_jobs < 1:
+        n_jobs = os.cpu_count() or 1
+    # 청크 결과는 끝나는 대로 저장하고 버리므로, 메모리에는 처리 중인 청크의 환자만 남습니다
+    if n_jobs == 1 or len(chunks) <= 1:
+        for chunk in chunks:
+            save(chunk, _extract_patients(outer_zip_path, chunk, specs))
     else:
-        return pd.DataFrame()
+        with ProcessPoolExecutor(max_workers=min(n_jobs, len(chunks))) as executor:
+            for chunk, results in zip(chunks, executor.map(_extract_patients, repeat(outer_zip_path), chunks, repeat(specs))):
+                save(chunk, results)
+    manifest.save()
+    print(f"증분 추출: 환자 {len(entries)}명 중 {len(items)}명 추출, {len(entries) - len(items)}명 재사용, "
+          f"삭제된 파티션 {n_removed}개")
+
+    return {name: PassivePartitions(os.path.join(output_dir, name),
+                                    [_partition_name(pid, zip_path) for pid, zip_path, _ in entries
+                                     if manifest.get(name, zip_path)['output'] is not None])
+            for name in specs}
+
+
+class PassivePartitions:
+    """
+    read_all_data_incremental이 저장한 한 종류(spec 이름)의 환자별 파티션 목록입니다.
+    파티션은 순회할 때 디스크에서 하나씩 불러오므로, 코호트 전체의 원본을 한 번에 메모리에 올리지 않습니다.
+    """
+
+    def __init__(self, directory, keys):
+        self.directory = directory
+        self.keys = list(keys)
+
+    def __len__(self):
+        return len(self.keys)
+
+    def __iter__(self):
+        for key in self.keys:
+            yield load_cached_table(self.directory, key)
+
+    def concat(self, func=None):
+        """
+        파티션마다 func(DataFrame → DataFrame)를 적용한 뒤 이어 붙입니다.
+        func에서 필요 없는 컬럼을 버리면 원본 전체 대신 줄어든 결과만 메모리에 남습니다.
+        """
+        frames = [df if func is None else func(df) for df in self]
+        return pd.concat(frames, axis=0, ignore_index=True) if frames else pd.DataFrame()
+
+
+def read_all_data(title, outer_zip_path, exclude_keywords=None, cache_dir=None, id_filter=None):
+    """
+    title 키워드를 포함한 CSV 파일을 모두 읽어 DataFrame 으로 결합하여 반환합니다.
+    outer_zip_path: 'raw_data/PXPN/pixelpanic_raw_data.zip' 같은 상대 또는 절대 경로를 지정하세요.
+    exclude_keywords: 해당 키워드가 포함된 파일명은 건너뜁니다.
+    cache_dir: 지정하면 결과를 캐시하고, ZIP 파일과 인자가 같으면 캐시에서 불러옵니다.
+    id_filter: IdFilter를 주면 제외된 환자의 inner ZIP은 압축을 풀지 않습니다.
+    여러 title이 필요하면 read_all_data_multi로 한 번에 추출하세요.
+    """
+    return read_all_data_multi({title: (title, exclude_keywords)}, outer_zip_path,
+                               cache_dir=cache_dir, id_filter=id_filter)[title]
+
+
+class ArchiveIndex:
+    """
+    바깥 ZIP의 환자별 inner ZIP(예: `_ActiveData.zip`)을 한 번만 색인하여 재사용합니다.
+    pid → inner ZIP 경로 → 멤버 이름 목록을 보관하고, 열어 둔 inner ZIP 핸들을 최대 max_open개까지 캐시하므로
+    환자별 설문/인구학 CSV 읽기가 namelist() 재탐색 없이 바로 조회됩니다.
+    여러 스레드에서 함께 사용할 수 있으며, read_for_patients로 환자들을 스레드 풀에서 병렬로 읽습니다.
+
+    예:
+        active_index = ArchiveIndex(zip_path, suffix='_ActiveData.zip')
+        soc = active_index.read_csv('PXPN_10001', 'PXPN_10001_Sociodemographic.csv', header=None, index_col=0)
+        checkups = active_index.read_for_patients(pids, '{pid}_Checkup.csv', n_threads=8)
+    """
+
+    def __init__(self, outer_zip_path, suffix='_ActiveData.zip', max_open=64, id_filter=None):
+        """
+        outer_zip_path: 바깥 ZIP 경로
+        suffix: 환자별 inner ZIP 파일명의 접미사 (pid는 파일명에서 suffix를 뗀 부분)
+        max_open: 열어 둔 채로 캐시할 inner ZIP 개수 (넘으면 가장 오래 사용하지 않은 것부터 닫음)
+        id_filter: IdFilter를 주면 통과하지 못한 환자는 색인하지 않습니다.
+        """
+        self.outer_zip_path = outer_zip_path
+        self.max_open = max_open
+        self._outer = zipfile.ZipFile(outer_zip_path, 'r')
+        self._outer_lock = threading.Lock()
+        self._handles = OrderedDict()  # pid → (spool, ZipFile)
+        self._members = {}
+        self._pid_locks = {}
+
+        folder = suffix.lstrip('_').replace('.zip', '') + '/'
+        self._inner_paths = {}
+        for info in self._outer.infolist():
+            f = info.filename
+            if (folder in f and f.endswith(suffix)
+                    and not any(x in f for x in PASSIVE_SKIP_PATTERNS)):
+                pid = os.path.basename(f).replace(suffix, '')
+                if id_filter is not None and not id_filter.accepts(pid, n_bytes=info.compress_size):
+                    continue
+                self._inner_paths[pid] = f
+        self._pid_locks = {pid: threading.Lock() for pid in self._inner_paths}
 
+    def __contains__(self, pid):
+        return pid in self._inner_paths
 
+    def __len__(self):
+        return len(self._inner_paths)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def pids(self):
+        """색인된 pid 목록 (바깥 ZIP의 순서)."""
+        return list(self._inner_paths)
+
+    def inner_path(self, pid):
+        """pid의 inner ZIP 경로 (없으면 None)."""
+        return self._inner_paths.get(pid)
+
+    def _handle(self, pid):
+        # 호출한 쪽에서 self._pid_locks[pid]를 잡고 있어야 합니다.
+        with self._outer_lock:
+            if pid in self._handles:
+                self._handles.move_to_end(pid)
+                return self._handles[pid][1]
+            spool = _spool_inner_zip(self._outer, self._inner_paths[pid])
+        if spool is None:
+            raise zipfile.BadZipFile(f"{self._inner_paths[pid]} 는 ZIP이 아닙니다.")
+        inner_zf = zipfile.ZipFile(spool, 'r')
+        with self._outer_lock:
+            self._handles[pid] = (spool, inner_zf)
+            self._members[pid] = inner_zf.namelist()
+            while len(self._handles) > self.max_open:
+                old_pid, _ = next(iter(self._handles.items()))
+                if not self._pid_locks[old_pid].acquire(blocking=False):
+                    break  # 다른 스레드가 사용 중이면 다음 번에 닫습니다.
+                try:
+                    old_spool, old_zf = self._handles.pop(old_pid)
+                    old_zf.close()
+                    old_spool.close()
+                finally:
+                    self._pid_locks[old_pid].release()
+        return inner_zf
+
+    def members(self, pid):
+        """
+        pid inner ZIP의 멤버 이름 목록. 한 번 조회한 목록은 핸들을 닫은 뒤에도 유지됩니다.
+        색인에 없는 pid는 KeyError, ZIP이 아닌 경우 zipfile.BadZipFile을 발생시킵니다.
+        """
+        if pid not in self._members:
+            with self._pid_locks[pid]:
+                if pid not in self._members:
+                    self._handle(pid)
+        return self._members[pid]
+
+    def read_csv(self, pid, member, **read_csv_kwargs):
+        """
+        pid inner ZIP의 member CSV를 DataFrame으로 읽습니다.
+        pid가 색인에 없거나, ZIP이 아니거나, member가 없으면 None을 반환합니다.
+        """
+        if pid not in self._inner_paths:
+            return None
+        with self._pid_locks[pid]:
+            try:
+                inner_zf = self._handle(pid)
+            except zipfile.BadZipFile:
+                return None
+            if member not in self._members[pid]:
+                return None
+            with inner_zf.open(member) as f:
+                return pd.read_csv(f, **read_csv_kwargs)
+
+    def read_for_patients(self, pids, member_template, n_threads=8, **read_csv_kwargs):
+        """
+        여러 환자의 같은 종류 CSV를 스레드 풀에서 읽어 {pid: DataFrame 또는 None}으로 반환합니다.
+        member_template은 '{pid}_Checkup.csv'처럼 pid 자리를 포함한 멤버 이름입니다.
+        반환 dict의 순서는 pids 순서와 같습니다. (압축 해제와 CSV 파싱은 GIL을 놓는 구간이 많아 스레드로도 빨라집니다.)
+        """
+        pids = [str(pid).strip() for pid in pids]
+
+        def read(pid):
+            return self.read_csv(pid, member_template.format(pid=pid), **read_csv_kwargs)
+
+        if n_threads is None or n_threads <= 1:
+            return {pid: read(pid) for pid in pids}
+        with ThreadPoolExecutor(max_workers=n_threads) as executor:
+            return dict(zip(pids, executor.map(read, pids)))
+
+    def close(self):
+        """열어 둔 inner ZIP 핸들과 바깥 ZIP을 닫습니다."""
+        with self._outer_lock:
+            for spool, inner_zf in self._handles.values():
+                inner_zf.close()
+                spool.close()
+            self._handles.clear()
+            self._outer.close()
 
 from pandas import DataFrame
 from scipy.signal import welch
@@ -153,4 +538,76 @@ def acrophase(col_index, col_HR):
     acr = cosinor1.fit_cosinor(col_index, col_HR, period= 1440, plot_on=False)[3]['values'][2]
     acrophase_min = cosinor.acrophase_to_hours(acr)
     acrophase = (acrophase_min +1440)/60
-    return acrophase_min
\ No newline at end of file
+    return acrophase_min
+
+MINUTES_PER_DAY = 1440
+NS_PER_MINUTE = 60 * 10**9
+
+def _interpolated_day_matrix(HR, min_count, limit):
+    # 2_stage의 ID/날짜 루프(1분 평균 → 1440분 재색인 → interpolate(method='time', limit=30, limit_direction='both'))와
+    # 같은 (ID, 날짜) × 1440분 보간 행렬; 원본 측정 행이 min_count개를 넘는 날만 보간하고 나머지 날은 모두 NaN
+    # 반환: (values, qualified, uniques(ID, 날짜), orig_count)
+    if 'heart_rate' in HR.columns:
+        HR = HR.rename(columns={'heart_rate': 'HR'})
+    hr = pd.to_numeric(HR['HR'], errors='coerce').to_numpy(dtype=np.float64)
+    dt = pd.to_datetime(HR['date'] + ' ' + HR['time'], errors='coerce')
+    keep = (dt.notna() & HR['ID'].notna()).to_numpy()
+    hr, dt, ids = hr[keep], dt[keep], HR['ID'].to_numpy()[keep]
+
+    day = dt.dt.normalize()
+    minute = ((dt - day) // pd.Timedelta(minutes=1)).to_numpy()
+    codes, uniques = pd.MultiIndex.from_arrays([ids, day]).factorize(sort=True)
+    n_days = len(uniques)
+
+    # 분 단위 평균 (resample('1min').mean()과 같음)
+    valid = ~np.isnan(hr)
+    cells = codes * MINUTES_PER_DAY + minute
+    sums = np.bincount(cells[valid], weights=hr[valid], minlength=n_days * MINUTES_PER_DAY)
+    counts = np.bincount(cells[valid], minlength=n_days * MINUTES_PER_DAY)
+    with np.errstate(invalid='ignore'):
+        values = (sums / counts).reshape(n_days, MINUTES_PER_DAY)
+
+    orig_count = np.bincount(codes[valid], minlength=n_days)
+    values, qualified = interpolate_days(values, min_count=min_count, limit=limit,
+                                         x_step=NS_PER_MINUTE, counts=orig_count)
+    values[~qualified] = np.nan
+    return values, qualified, uniques, orig_count
+
+def hr_day_features(HR, hr_filters=(360, 720), limit=30):
+    """
+    library.hr_features.hr_feature_table에 넘기는 PXPN의 HR 일별 특징 준비 단계입니다.
+    2_stage의 HR 셀들(HR_date_fixed → HR_interpolated → circadian_parameter → circadian_delta → bandpower)이
+    기준마다 큰 중간 CSV를 쓰고 다시 읽던 것을, (ID, 날짜) × 1440분 보간 행렬을 한 번만 만들어 cosinor, bandpower에 함께 씁니다.
+    - HR_date: daily_stats (0이 아닌 HR이 있는 날)
+    - circadian: 측정 행과 보간 후 HR이 모두 가장 느슨한 기준을 넘는 날의 cosinor 적합 (날마다 둘 중 작은 수를 기준과 비교)
+    - days: 같은 날의 보간 신호 (library.hr_features.padded_day_signals)
+    - 반환: (HR_date, circadian, circadian_counts, days); HR은 숫자형 HR 컬럼을 가진 롱 포맷(ID, date, time, HR)
+    """
+    loose = min(hr_filters)
+
+    # 1) 일별 통계 (0이 아닌 HR이 있는 날만)
+    HR_stats = daily_stats(HR, 'HR', zero_as_missing=True, hvar_zero_as_missing=False)
+    HR_date = HR_stats.loc[HR_stats['HR_count'] > 0, ['ID', 'date'] + HR_FEATURE_GROUPS['HR_date']]
+
+    # 2) 보간 행렬을 한 번만 만듦 (가장 느슨한 기준; 더 엄격한 기준에서는 측정 행이 기준 이하인 날만 빠짐)
+    values, qualified, uniques, orig_count = _interpolated_day_matrix(HR, loose, limit)
+    n_valid = (~np.isnan(values)).sum(axis=1)
+    counts = np.minimum(orig_count, n_valid)
+    keys = pd.DataFrame({'ID': uniques.get_level_values(0).to_numpy(dtype=object),
+                         'date': uniques.get_level_values(1)})
+
+    # 3) cosinor: 가장 느슨한 기준을 넘는 날만 한 번 적합
+    fit_rows = np.flatnonzero(counts > loose)
+    fit = fit_cosinor_days(values[fit_rows], period=1440)
+    circadian = pd.DataFrame({
+        'ID': keys['ID'].to_numpy()[fit_rows],
+        'date': keys['date'].dt.strftime('%Y-%m-%d').to_numpy()[fit_rows],
+        'acr': acrophase_to_hours(fit['acrophase']),
+        'amp': fit['amplitude'],
+        'mesor': fit['mesor'],
+    })
+
+    # 4) 기준마다 bandpower 신호 (보간 파일에는 모든 날이 있으므로 ID의 마지막 날은 기준과 관계없음)
+    lengths = np.full(len(keys), values.shape[1])
+    days = {t: padded_day_signals(values, lengths, keys, counts > t) for t in hr_filters}
+    return HR_date, circadian, counts[fit_rows], days
@@ -0,0 +1,96 @@
+"""
+HR 보간 벤치마크: 2_stage_SYM의 ID/날짜 이중 루프 보간과 코호트 단위 보간(hr_feature_table)을 비교합니다.
+
+HR.csv와 같은 롱 포맷(ID, date, time, HR; 값이 없으면 0)의 합성 데이터를 만든 뒤, 루프로 만든
+HR_interpolated_720의 bandpower와 hr_feature_table의 bandpower 그룹을 계산하여 실행 시간을 출력하고
+두 결과가 같은지 확인합니다. (보간 신호는 bandpower에만 쓰이므로 bandpower로 비교합니다.)
+
+사용 예:
+    python benchmark_hr_interpolation.py --ids 30 --days 20
+"""
+import config as cfg
+
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from library.hr_features import BANDPOWER_BANDS, bandpower_bands, hr_feature_table, padded_day_signals
+from library.minute_features import long_to_day_matrix
+from utils_for_analysis import hr_day_features
+
+def make_synthetic_hr(n_ids, n_days, seed=0):
+    rng = np.random.default_rng(seed)
+    days = [(f"SYM1-1-{100 + i}", (pd.Timestamp('2021-01-01') + pd.Timedelta(days=d)).strftime('%Y-%m-%d'))
+            for d in range(n_days) for i in range(n_ids)]
+    values = rng.integers(50, 120, (len(days), 1440)).astype(float)
+    # 하루마다 착용률을 다르게 하여 보간 대상이 아닌 날(720분 이하)도 섞이도록 합니다.
+    coverage = rng.choice([0.3, 0.6, 0.9, 1.0], size=(len(days), 1))
+    values[rng.random(values.shape) > coverage] = 0
+    times = pd.date_range('2000-01-01', periods=1440, freq='1min').strftime('%H:%M:%S')
+    return pd.DataFrame({
+        'date': np.repeat([d for _, d in days], 1440),
+        'ID': np.repeat([pid for pid, _ in days], 1440),
+        'time': np.tile(times, len(days)),
+        'HR': values.ravel(),
+    })
+
+def interpolate_hr_loop(HR, min_count=720):
+    # 2_stage_SYM의 기존 구현
+    id_list = HR['ID'].unique()
+    HR_interpolated = pd.DataFrame(columns=['index', 'ID', 'date', 'time', 'HR'])
+    for id in id_list:
+        temp_id = HR.loc[(HR['ID'] == id)].copy()
+        temp_id.reset_index(inplace=True)
+        temp_id.drop('index', axis=1, inplace=True)
+        for date in temp_id['date'].unique():
+            temp_date = temp_id.loc[(temp_id['date'] == date)].copy()
+            temp_date.reset_index(inplace=True)
+            temp_date.drop('index', axis=1, inplace=True)
+            temp_date.reset_index(inplace=True)
+            temp_date = temp_date.replace(0, np.nan)
+            if temp_date.HR.count() > min_count:
+                temp_date = temp_date.interpolate(method='values', limit_direction='both')
+                HR_interpolated = pd.concat([HR_interpolated, temp_date], axis=0)
+    HR_interpolated.reset_index(drop=True, inplace=True)
+    return HR_interpolated
+
+def loop_bandpower(HR, min_count=720):
+    # 루프 보간 파일에서 2_stage_SYM의 bandpower 셀과 같은 신호를 만들어 계산
+    HR_interpolated = interpolate_hr_loop(HR, min_count).astype({'HR': float})
+    values, lengths, keys, _, _ = long_to_day_matrix(HR_interpolated, 'HR')
+    keys = keys.assign(date=pd.to_datetime(keys['date']))
+    keys, signals, lengths = padded_day_signals(values, lengths, keys, np.ones(len(keys), dtype=bool))
+    power = bandpower_bands(signals, 1/60, BANDPOWER_BANDS, lengths=lengths)
+    return keys.assign(date=keys['date'].dt.strftime('%Y-%m-%d'), **dict(zip(BANDPOWER_BANDS, power.T)))
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark per-day loop vs vectorized HR interpolation")
+    parser.add_argument('--ids', type=int, default=30, help='number of patients')
+    parser.add_argument('--days', type=int, default=20, help='days per patient')
+    args = parser.parse_args()
+
+    HR = make_synthetic_hr(args.ids, args.days)
+    print(f"HR: {len(HR)} rows ({args.ids} IDs x {args.days} days)")
+
+    start = time.perf_counter()
+    df_loop = loop_bandpower(HR)
+    t_loop = time.perf_counter() - start
+
+    start = time.perf_counter()
+    table = hr_feature_table(HR, hr_day_features, hr_filters=(720,))
+    t_vec = time.perf_counter() - start
+    columns = ['ID', 'date'] + list(BANDPOWER_BANDS)
+    df_vec = table.loc[table['has_bandpower'], columns].sort_values(['ID', 'date']).reset_index(drop=True)
+    df_loop = df_loop[columns].sort_values(['ID', 'date']).reset_index(drop=True)
+
+    print(f"{'method':<12}{'time (s)':>12}")
+    print(f"{'loop':<12}{t_loop:>12.2f}")
+    print(f"{'vectorized':<12}{t_vec:>12.2f}")
+    print(f"speedup: {t_loop / t_vec:.1f}x")
+    print("same days:", df_loop[['ID', 'date']].equals(df_vec[['ID', 'date']]))
+    print(f"max abs bandpower diff: {(df_loop[columns[2:]] - df_vec[columns[2:]]).abs().max().max():.2e}")
+
+if __name__ == '__main__':
+    main()
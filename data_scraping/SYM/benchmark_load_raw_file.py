@@ -0,0 +1,78 @@
+"""
+load_raw_file 벤치마크: full 모드(기존) 로더와 read_only 스트리밍 로더를 비교합니다.
+
+backup_SYM 워크북과 비슷한 구조(여러 시트, 1440개 값이 쉼표로 이어진 심박수 시트 포함)의
+합성 워크북을 만든 뒤, 요청한 시트 하나를 두 로더로 불러와 실행 시간과 최대 메모리
+(tracemalloc 기준)를 출력하고 두 결과가 같은지 확인합니다.
+
+사용 예:
+    python benchmark_load_raw_file.py --rows 50000
+"""
+import config as cfg
+
+import argparse
+import datetime
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+import numpy as np
+from openpyxl import Workbook
+
+from utils_for_preprocessing import _load_sheet, _load_sheet_full
+
+def make_synthetic_workbook(path, n_rows, n_ids=300, seed=0):
+    rng = np.random.default_rng(seed)
+    wb = Workbook(write_only=True)
+
+    ws = wb.create_sheet('정서일지')
+    ws.append(['비식별키', '날짜', '시간', '긍정적기분', '부정적기분', '긍정적에너지', '부정적에너지', '불안', '짜증'])
+    base = datetime.datetime(2021, 1, 1)
+    for i in range(n_rows):
+        ws.append([f"SYM1-1-{100 + i % n_ids}", base + datetime.timedelta(days=i // n_ids), '21:00',
+                   *rng.integers(0, 10, 6).tolist()])
+
+    # 요청하지 않은 큰 시트: full 모드에서는 이 시트도 함께 메모리에 올라갑니다.
+    ws = wb.create_sheet('라이프로그-심박수')
+    ws.append(['비식별키', '날짜', '측정값(-1 : 값 없음)', '평균 심박수'])
+    for i in range(max(1, n_rows // 20)):
+        values = rng.integers(50, 120, 1440)
+        ws.append([f"SYM1-1-{100 + i % n_ids}", (base + datetime.timedelta(days=i // n_ids)).date().isoformat(),
+                   ','.join(map(str, values)), float(values.mean())])
+    wb.save(path)
+
+def measure(loader, path, sheet_name):
+    # tracemalloc은 실행을 느리게 하므로 시간과 메모리는 따로 측정합니다.
+    start = time.perf_counter()
+    df = loader(path, sheet_name)
+    elapsed = time.perf_counter() - start
+
+    tracemalloc.start()
+    loader(path, sheet_name)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return df, elapsed, peak
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark full vs read_only xlsx loaders")
+    parser.add_argument('--rows', type=int, default=50000, help='rows in the requested sheet')
+    parser.add_argument('--sheet', type=str, default='정서일지', help='sheet to load')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = str(Path(tmp_dir) / "synthetic_backup_SYM.xlsx")
+        make_synthetic_workbook(path, args.rows)
+        print(f"workbook: {args.rows} rows, {Path(path).stat().st_size / 1e6:.1f} MB")
+
+        df_full, t_full, m_full = measure(_load_sheet_full, path, args.sheet)
+        df_ro, t_ro, m_ro = measure(_load_sheet, path, args.sheet)
+
+    print(f"{'loader':<12}{'time (s)':>12}{'peak mem (MB)':>16}")
+    print(f"{'full':<12}{t_full:>12.2f}{m_full / 1e6:>16.1f}")
+    print(f"{'read_only':<12}{t_ro:>12.2f}{m_ro / 1e6:>16.1f}")
+    print(f"speedup: {t_full / t_ro:.2f}x, memory: {m_full / max(m_ro, 1):.2f}x less")
+    print("identical result:", df_full.equals(df_ro))
+
+if __name__ == '__main__':
+    main()
@@ -6,6 +6,10 @@ from CosinorPy import cosinor, cosinor1
 import pandas as pd 
 import numpy as np 
 
+from library.minute_features import long_to_day_matrix, interpolate_days, fit_cosinor_days, acrophase_to_hours, daily_stats
+from library.coverage_index import coverage_index
+from library.hr_features import HR_FEATURE_GROUPS, padded_day_signals
+
 
 def bandpower(data, sf, band, method='welch', window_sec=None, relative=False):
     band = np.asarray(band)
@@ -93,4 +97,52 @@ def acrophase(col_index, col_HR):
     acr = cosinor1.fit_cosinor(col_index, col_HR, period= 1440, plot_on=False)[3]['values'][2]
     acrophase_min = cosinor.acrophase_to_hours(acr)
     acrophase = (acrophase_min +1440)/60
-    return acrophase_min
\ No newline at end of file
+    return acrophase_min
+
+def hr_day_features(HR, hr_filters=(360, 720)):
+    """
+    library.hr_features.hr_feature_table에 넘기는 SYM의 HR 일별 특징 준비 단계입니다.
+    2_stage_SYM의 HR 셀들(HR_date_fixed → HR_interpolated → circadian_parameter → circadian_delta → bandpower_fixed)이
+    기준마다 큰 중간 CSV를 쓰고 다시 읽던 것을, 하루 분 배열을 한 번만 만들어 보간, cosinor, bandpower에 함께 씁니다.
+    - HR_date: daily_stats (0이 아닌 HR이 2개 이상인 날)
+    - circadian: 0을 포함한 원래 HR이 가장 느슨한 기준을 넘는 날의 cosinor 적합 (날마다 그 분 수를 기준과 비교)
+    - days: 0이 아닌 HR이 기준을 넘는 날을 보간한 bandpower 신호 (library.hr_features.padded_day_signals)
+    - 반환: (HR_date, circadian, circadian_counts, days); HR은 숫자형 HR 컬럼을 가진 롱 포맷(ID, date, time, HR)
+    """
+    loose = min(hr_filters)
+
+    # 1) 일별 통계 (최소 2개 이상의 nonzero HR이 있는 날만)
+    HR_stats = daily_stats(HR, 'HR', zero_as_missing=True, hvar_zero_as_missing=False)
+    HR_date = HR_stats.loc[HR_stats['HR_count'] >= 2, ['ID', 'date'] + HR_FEATURE_GROUPS['HR_date']]
+
+    # 2) 하루 분 배열을 한 번만 만듦 (ID 처음 등장 순, 하루 안에서는 원래 행 순서)
+    values, lengths, keys, codes, positions = long_to_day_matrix(HR, 'HR')
+    nonzero = np.where(values == 0, np.nan, values)
+    # 날짜별 유효 분 수 (coverage_index도 (ID, date)를 처음 등장한 순서로 셈)
+    coverage = coverage_index(HR, 'HR')
+    n_valid = coverage['n_valid'].to_numpy()
+    n_nonzero = coverage['n_nonzero'].to_numpy()
+    id_rank = pd.factorize(keys['ID'])[0]
+    order = np.argsort(id_rank, kind='stable')
+
+    # 3) cosinor: 가장 느슨한 기준을 넘는 날만 한 번 적합 (x는 하루 안의 행 번호, 결측인 분은 제외)
+    fit_rows = order[n_valid[order] > loose]
+    fit = fit_cosinor_days(values[fit_rows], period=1440)
+    circadian = pd.DataFrame({
+        'ID': keys['ID'].to_numpy()[fit_rows],
+        'date': keys['date'].to_numpy()[fit_rows],
+        'acr': acrophase_to_hours(fit['acrophase']),
+        'amp': fit['amplitude'],
+        'mesor': fit['mesor'],
+    })
+
+    # 4) 보간 (유효한 분이 기준을 넘는 날만 선형 보간) → 기준마다 bandpower 신호 (파일에는 기준을 넘는 날만 있었음)
+    filled, qualified = interpolate_days(nonzero, min_count=loose)
+    filled[np.arange(filled.shape[1]) >= lengths[:, None]] = np.nan
+    day_keys = keys.assign(date=pd.to_datetime(keys['date']))
+    days = {}
+    for t in hr_filters:
+        in_file = np.flatnonzero(qualified & (n_nonzero > t))
+        days[t] = padded_day_signals(filled[in_file], lengths[in_file], day_keys.iloc[in_file].reset_index(drop=True),
+                                      np.ones(len(in_file), dtype=bool))
+    return HR_date, circadian, n_valid[fit_rows], days
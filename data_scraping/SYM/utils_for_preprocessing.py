@@ -511,16 +511,108 @@ def filter_by_valid_ids(df, id_column="ID"):
 # print(df_serialized_hr.head())
 
 
+import os
+import warnings
 import pandas as pd
 import numpy as np
 from openpyxl import load_workbook
-from itertools import islice
+from itertools import islice, repeat
+from concurrent.futures import ProcessPoolExecutor
 
-def load_raw_file(paths, sheet_name):
+from library.cache_utils import cached_table, file_fingerprint, make_cache_key, load_cached_table, save_cached_table
+from library.id_filter import IdFilter
+
+# read_only 모드에서 한 번에 열(column) 배열로 옮기는 행 수
+ROW_CHUNK_SIZE = 10000
+
+def _clean_sheet_df(df):
+    df.replace("", np.nan, inplace=True)
+    df.columns = [
+        col.replace(" ", "_").replace("-", "_") if col is not None else col
+        for col in df.columns
+    ]
+    return df
+
+def _load_sheet_full(path, sheet_name):
+    """기존 방식: 워크북 전체를 full 모드로 읽은 뒤 시트 전체를 리스트로 복사합니다."""
+    wb = load_workbook(path, data_only=True)
+    ws = wb[sheet_name]
+    data = ws.values
+    cols = next(data)[0:]
+    rows = list(data)
+    _ = [r[0] for r in rows]  # 첫 열값을 인덱스로 읽었으나 실제로 사용하지 않음
+    rows = (islice(r, 0, None) for r in rows)
+    df = pd.DataFrame(rows, columns=cols)
+    return _clean_sheet_df(df)
+
+def _id_column_index(cols):
+    """헤더에서 '비식별키' 컬럼의 위치를 찾습니다 (없으면 None)."""
+    return next((i for i, col in enumerate(cols) if col is not None and '비식별키' in str(col)), None)
+
+def _worksheet_to_df(ws, chunk_size=ROW_CHUNK_SIZE, id_filter=None):
+    """
+    read_only 워크시트를 스트리밍하여 DataFrame을 만듭니다.
+    행을 chunk_size개씩 읽어 열별 리스트에 이어 붙이므로, 시트 전체의 행 리스트 복사본을
+    메모리에 만들지 않습니다.
+    id_filter(IdFilter)를 주면 '비식별키'가 필터를 통과하지 못한 행은 컬럼에 담지 않습니다.
+    ('비식별키' 컬럼이 없는 시트는 그대로 읽습니다.)
+    """
+    rows = ws.iter_rows(values_only=True)
+    cols = next(rows, ())
+    n_cols = len(cols)
+    id_idx = _id_column_index(cols) if id_filter is not None else None
+    columns = [[] for _ in range(n_cols)]
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            break
+        # read_only 모드에서는 행 길이가 헤더와 다를 수 있으므로 헤더 길이에 맞춤
+        chunk = [r[:n_cols] if len(r) >= n_cols else r + (None,) * (n_cols - len(r)) for r in chunk]
+        if id_idx is not None:
+            keep = id_filter.mask([r[id_idx] for r in chunk])
+            chunk = [r for r, k in zip(chunk, keep) if k]
+            if not chunk:
+                continue
+        for column, values in zip(columns, zip(*chunk)):
+            column.extend(values)
+
+    df = pd.DataFrame(dict(enumerate(columns)), columns=range(n_cols))
+    df.columns = list(cols)
+    return _clean_sheet_df(df)
+
+def _load_sheet(path, sheet_name, chunk_size=ROW_CHUNK_SIZE, id_filter=None):
+    """read_only 모드로 요청한 시트만 읽어 DataFrame을 만듭니다."""
+    wb = load_workbook(path, read_only=True, data_only=True)
+    try:
+        return _worksheet_to_df(wb[sheet_name], chunk_size, id_filter)
+    finally:
+        wb.close()
+
+def _sheet_cache_key(fingerprint, sheet_name):
+    return make_cache_key([fingerprint], {'loader': 'load_raw_file', 'sheet_name': sheet_name})
+
+def _filter_sheet(df, id_filter):
+    """캐시에서 불러온(필터 전) 시트에 id_filter를 적용합니다."""
+    if id_filter is None:
+        return df
+    id_idx = _id_column_index(df.columns)
+    if id_idx is None:
+        return df
+    return df[id_filter.mask(df.iloc[:, id_idx].to_numpy())].reset_index(drop=True)
+
+def load_raw_file(paths, sheet_name, cache_dir=None, read_only=True, id_filter=None):
     """
     단일 파일 경로(str) 또는 파일 경로 리스트(list)를 받아,
     지정된 시트를 DataFrame으로 불러온 뒤 모두 합쳐서 반환합니다.
+    cache_dir를 지정하면 파일별·시트별 결과를 캐시하며, 파일의 내용 해시와
+    sheet_name이 같으면 엑셀을 다시 읽지 않고 캐시에서 불러옵니다.
+    read_only=False이면 기존 full 모드 로더(워크북 전체 로드)를 사용합니다.
+    id_filter(IdFilter)를 주면 '비식별키'가 필터를 통과하지 못한 행을 읽는 단계에서 제외합니다.
+    (캐시는 필터 전 시트를 저장하므로, 캐시를 사용할 때는 불러온 뒤 필터를 적용합니다.)
     """
+    load_sheet = _load_sheet if read_only else _load_sheet_full
+    # 행 스트리밍 단계에서 필터를 적용할 수 있는 경우 (read_only, 캐시 없음)
+    pushdown = id_filter is not None and read_only and cache_dir is None
     if isinstance(paths, str):
         paths = [paths]
 
@@ -529,26 +621,249 @@ def load_raw_file(paths, sheet_name):
         # 파일 확장자가 .xlsx, .xlsm 등 openpyxl 지원 형식인지 확인
         if not (path.endswith(".xlsx") or path.endswith(".xlsm") or path.endswith(".xltx") or path.endswith(".xltm")):
             raise ValueError(f"Invalid file format: {path!r}. .xlsx/.xlsm/.xltx/.xltm만 지원합니다.")
-        wb = load_workbook(path, data_only=True)
-        ws = wb[sheet_name]
-        data = ws.values
-        cols = next(data)[0:]
-        rows = list(data)
-        _ = [r[0] for r in rows]  # 첫 열값을 인덱스로 읽었으나 실제로 사용하지 않음
-        rows = (islice(r, 0, None) for r in rows)
-        df = pd.DataFrame(rows, columns=cols)
-        df.replace("", np.nan, inplace=True)
-        df.columns = [
-            col.replace(" ", "_").replace("-", "_") if col is not None else col
-            for col in df.columns
-        ]
+        if pushdown:
+            df = _load_sheet(path, sheet_name, id_filter=id_filter)
+        elif cache_dir is None:
+            df = _filter_sheet(load_sheet(path, sheet_name), id_filter)
+        else:
+            df = cached_table(
+                lambda: load_sheet(path, sheet_name),
+                sources=[path],
+                params={'loader': 'load_raw_file', 'sheet_name': sheet_name},
+                cache_dir=cache_dir,
+            )
+            df = _filter_sheet(df, id_filter)
         all_dfs.append(df)
 
     return pd.concat(all_dfs, ignore_index=True)
 
-def serialize_lifelog_heartrate(path):
+def _load_workbook_sheets(path, sheet_names=None, cache_dir=None, id_filter=None):
+    """
+    워크북을 read_only 모드로 한 번만 열어 여러 시트를 읽고 ({시트명: DataFrame}, id_filter)를 반환합니다.
+    sheet_names가 None이면 모든 시트를 읽습니다. cache_dir가 있으면 load_raw_file과 같은 캐시를 공유합니다.
+    id_filter는 load_raw_file과 같이 적용되며, 프로세스 풀에서는 복사본의 집계를 돌려받기 위해 함께 반환합니다.
+    WorkbookSession이 프로세스 풀 작업 단위로 사용하므로 모듈 최상위 함수로 둡니다.
+    """
+    fingerprint = file_fingerprint(path) if cache_dir is not None else None
+    sheets = {}
+    wb = load_workbook(path, read_only=True, data_only=True)
+    try:
+        names = wb.sheetnames if sheet_names is None else list(sheet_names)
+        for name in names:
+            if fingerprint is not None:
+                key = _sheet_cache_key(fingerprint, name)
+                df = load_cached_table(cache_dir, key)
+                if df is None:
+                    df = _worksheet_to_df(wb[name])
+                    save_cached_table(df, cache_dir, key)
+                df = _filter_sheet(df, id_filter)
+            else:
+                df = _worksheet_to_df(wb[name], id_filter=id_filter)
+            sheets[name] = df
+    finally:
+        wb.close()
+    return sheets, id_filter
+
+class WorkbookSession:
+    """
+    backup_SYM 워크북들을 파일당 한 번만 파싱하여 여러 시트/컬럼 추출에 재사용하는 세션입니다.
+    여러 파일은 프로세스 풀에서 병렬로 읽습니다.
+
+    읽을 시트를 sheet_names로 넘기면 그 시트만 미리 파싱하므로, 쓰지 않는 시트를 읽는 비용이 들지 않습니다.
+
+    예:
+        session = WorkbookSession(str_paths, sheet_names=["공황일지", "정서일지"], cache_dir=raw_cache_dir)
+        panic_raw = session.load("공황일지")                      # load_raw_file(str_paths, "공황일지")와 동일
+        sym1_diary = session.load("정서일지", paths=str_paths[0])  # 특정 파일의 시트만
+    """
+
+    def __init__(self, paths, sheet_names=None, n_jobs=None, cache_dir=None, id_filter=None):
+        """
+        paths: 단일 파일 경로(str) 또는 파일 경로 리스트(list)
+        sheet_names: 미리 읽어 둘 시트 목록 (None이면 모든 시트, 빈 리스트면 load할 때마다 해당 시트만 읽음)
+        n_jobs: 파일을 병렬로 읽을 프로세스 수 (None이면 파일 수와 CPU 수 중 작은 값, 1이면 현재 프로세스)
+        cache_dir: 지정하면 load_raw_file과 같은 키로 시트를 캐시합니다.
+        id_filter: IdFilter를 주면 모든 시트에서 '비식별키'가 필터를 통과하지 못한 행을 읽지 않습니다.
+            건너뛴 행 수는 id_filter.report()로 확인할 수 있습니다.
+        """
+        if isinstance(paths, str):
+            paths = [paths]
+        for path in paths:
+            if not (path.endswith(".xlsx") or path.endswith(".xlsm") or path.endswith(".xltx") or path.endswith(".xltm")):
+                raise ValueError(f"Invalid file format: {path!r}. .xlsx/.xlsm/.xltx/.xltm만 지원합니다.")
+        self.paths = list(paths)
+        self.cache_dir = cache_dir
+        self.id_filter = id_filter
+
+        if n_jobs is None:
+            n_jobs = min(len(self.paths), os.cpu_count() or 1)
+        if n_jobs <= 1 or len(self.paths) <= 1:
+            loaded = [_load_workbook_sheets(path, sheet_names, cache_dir, id_filter)[0] for path in self.paths]
+        else:
+            with ProcessPoolExecutor(max_workers=n_jobs) as executor:
+                results = list(executor.map(_load_workbook_sheets, self.paths, repeat(sheet_names),
+                                            repeat(cache_dir), repeat(id_filter)))
+            loaded = [sheets for sheets, _ in results]
+            if id_filter is not None:
+                # 작업 프로세스에서 집계된 건너뛴 행 수를 합칩니다.
+                for _, worker_filter in results:
+                    id_filter.merge_counts(worker_filter)
+        self._sheets = dict(zip(self.paths, loaded))
+
+    def sheet_names(self, path=None):
+        """읽어 둔 시트 이름 목록을 반환합니다 (path를 주면 해당 파일 기준)."""
+        path = self.paths[0] if path is None else path
+        return list(self._sheets[path].keys())
+
+    def load(self, sheet_name, paths=None):
+        """
+        지정한 시트를 load_raw_file과 같은 형태의 DataFrame으로 반환합니다.
+        paths를 주지 않으면 세션의 모든 파일을 순서대로 합칩니다.
+        미리 읽지 않은 시트는 이때 해당 파일에서 한 번 읽어 세션에 저장합니다.
+        반환값은 복사본이므로 호출한 쪽에서 자유롭게 수정해도 됩니다.
+        """
+        if paths is None:
+            paths = self.paths
+        elif isinstance(paths, str):
+            paths = [paths]
+
+        dfs = []
+        for path in paths:
+            sheets = self._sheets[path]
+            if sheet_name not in sheets:
+                sheets.update(_load_workbook_sheets(path, [sheet_name], self.cache_dir, self.id_filter)[0])
+            dfs.append(sheets[sheet_name])
+        return pd.concat(dfs, ignore_index=True)
+
+def _load_from(path, sheet_name, session=None):
+    """session이 있으면 세션에서, 없으면 load_raw_file로 시트를 불러옵니다."""
+    if session is not None:
+        return session.load(sheet_name, paths=path)
+    return load_raw_file(path, sheet_name=sheet_name)
+
+MINUTES_PER_DAY = 1440
+# 한 번에 이어 붙여 파싱할 행(일) 수: 문자열 하나가 지나치게 커지지 않도록 제한
+PARSE_CHUNK_ROWS = 5000
+
+def _minute_labels():
+    # 1분 단위 시간 인덱스 ('00:00:00' ~ '23:59:00' 총 1440개)
+    return pd.date_range('2022-01-01', periods=MINUTES_PER_DAY, freq='1min').strftime('%H:%M:%S').to_numpy(dtype=object)
+
+def _parse_irregular_row(text, n_minutes):
+    tokens = text.split(',')
+    if len(tokens) > n_minutes:
+        raise ValueError(f"{n_minutes}개보다 많은 측정값({len(tokens)}개)이 한 행에 있습니다.")
+    row = np.full(n_minutes, np.nan, dtype=np.float64)
+    row[:len(tokens)] = pd.to_numeric(pd.Series(tokens), errors='coerce').to_numpy(dtype=np.float64)
+    return row
+
+def parse_minute_values(values, n_minutes=MINUTES_PER_DAY, missing_value=-1):
+    """
+    "79,79,83,..." 형태의 쉼표로 이어진 문자열 Series를 (행 수, n_minutes) float64 행렬로 변환합니다.
+    - missing_value(-1), 빈 값, 숫자가 아닌 값은 NaN으로 처리합니다.
+    - 값이 n_minutes개인 행은 여러 행을 한 문자열로 이어 붙여 np.fromstring으로 한 번에 파싱하고,
+      값 개수가 다른 행(짧은 행, 결측 행)만 행 단위로 처리합니다. 짧은 행의 나머지 분은 NaN입니다.
+    """
+    texts = pd.Series(values).fillna('').astype(str).reset_index(drop=True)
+    matrix = np.full((len(texts), n_minutes), np.nan, dtype=np.float64)
+    regular = (texts.str.count(',') == n_minutes - 1).to_numpy()
+
+    regular_idx = np.flatnonzero(regular)
+    for start in range(0, len(regular_idx), PARSE_CHUNK_ROWS):
+        idx = regular_idx[start:start + PARSE_CHUNK_ROWS]
+        joined = ','.join(texts.iloc[idx])
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', DeprecationWarning)
+            parsed = np.fromstring(joined, dtype=np.float64, sep=',')
+        if parsed.size == len(idx) * n_minutes:
+            matrix[idx] = parsed.reshape(len(idx), n_minutes)
+        else:
+            # 빈 값이나 숫자가 아닌 값이 섞인 묶음은 행 단위로 파싱
+            for i in idx:
+                matrix[i] = _parse_irregular_row(texts.iloc[i], n_minutes)
+
+    for i in np.flatnonzero(~regular):
+        if texts.iloc[i]:
+            matrix[i] = _parse_irregular_row(texts.iloc[i], n_minutes)
+
+    matrix[matrix == missing_value] = np.nan
+    return matrix
+
+class HeartRateMatrix:
+    """
+    분 단위 심박수를 (일 수, 1440) float64 행렬로 보관합니다.
+    values[i]는 (ids[i], dates[i]) 하루의 심박수이며, 결측은 NaN입니다.
+    롱 포맷(date, ID, time, heart_rate)이 필요한 경우에만 to_long()으로 만듭니다.
+    """
+
+    def __init__(self, values, ids, dates):
+        self.values = values
+        self.ids = np.asarray(ids, dtype=object)
+        self.dates = np.asarray(dates, dtype=object)
+
+    def __len__(self):
+        return len(self.values)
+
+    def to_long(self):
+        """serialize_lifelog_heartrate와 같은 롱 포맷(melt 순서: 분 → 행)의 DataFrame을 반환합니다."""
+        n_rows, n_minutes = self.values.shape
+        return pd.DataFrame({
+            'date': np.tile(self.dates, n_minutes),
+            'ID': np.tile(self.ids, n_minutes),
+            'time': np.repeat(_minute_labels()[:n_minutes], n_rows),
+            'heart_rate': self.values.T.ravel(),
+        })
+
+def _merge_duplicate_days(values, ids, dates):
+    """
+    파싱이 끝난 (행 수, 1440) 행렬에서 같은 (date, ID)의 행들을 하루로 합칩니다.
+    각 분(minute)마다 행 순서상 처음 나오는 결측이 아닌 값을 사용하며, 결과는 (date, ID) 순으로 정렬됩니다.
+    """
+    keys = pd.DataFrame({'date': dates, 'ID': ids}).sort_values(['date', 'ID'], kind='stable')
+    order = keys.index.to_numpy()
+    first = ~keys.duplicated().to_numpy()
+    group = np.cumsum(first) - 1
+    values = values[order]
+    merged = values[first]
+    dup = np.isin(group, group[~first])
+    if dup.any():
+        # groupby.first()는 컬럼별로 NaN을 건너뛰므로 분 단위 first-valid가 됨
+        merged[np.unique(group[dup])] = pd.DataFrame(values[dup]).groupby(group[dup]).first().to_numpy()
+    return merged, keys['ID'].to_numpy()[first], keys['date'].to_numpy()[first]
+
+def deserialize_lifelog_heartrate(path, session=None, merge_duplicates=False, id_filter=None):
+    """
+    '라이프로그-심박수' 시트를 불러와 HeartRateMatrix((일 수, 1440) float64 행렬 + ID/날짜 배열)로 변환합니다.
+    문자열을 1440개 object 컬럼으로 나누거나 melt 하지 않고 한 번에 숫자 행렬로 파싱합니다.
+    merge_duplicates=True이면 파싱 후 같은 (date, ID)의 행들을 분 단위 first-valid로 하루로 합칩니다.
+    id_filter(IdFilter)를 주면 필터를 통과하지 못한 환자의 측정값 문자열은 파싱하지 않습니다.
+    """
+    # 1) 원본 시트 로드
+    df = _load_from(path, '라이프로그-심박수', session)
+
+    # 2) 컬럼명 한글 → 영문(관습적인 이름)으로 변경 (동적으로 컬럼명 탐지)
+    value_col = next(col for col in df.columns if '측정값' in col)
+    id_col = next(col for col in df.columns if '비식별키' in col)
+    date_col = next(col for col in df.columns if '날짜' in col)
+    df = df.rename(columns={id_col: 'ID', date_col: 'date', value_col: 'values'})
+    if id_filter is not None:
+        df = df[id_filter.mask(df['ID'].to_numpy())]
+
+    # 3) 쉼표로 이어진 문자열을 (일 수, 1440) 행렬로 파싱 (-1은 결측으로 처리)
+    values = parse_minute_values(df['values'])
+    ids, dates = df['ID'].to_numpy(), df['date'].to_numpy()
+
+    # 4) 같은 (date, ID)의 중복 행은 파싱된 행렬에서 합침
+    if merge_duplicates:
+        values, ids, dates = _merge_duplicate_days(values, ids, dates)
+    return HeartRateMatrix(values, ids, dates)
+
+def serialize_lifelog_heartrate(path, session=None, id_filter=None):
     """
     '라이프로그-심박수' 시트를 불러와 1분 단위 롱 포맷(날짜, ID, 시간, 심박수)으로 변환합니다.
+    session(WorkbookSession)을 주면 워크북을 다시 읽지 않고 세션에서 시트를 가져옵니다.
+    롱 포맷이 필요 없다면 deserialize_lifelog_heartrate로 행렬을 바로 사용하세요.
+    id_filter(IdFilter)를 주면 필터를 통과하지 못한 환자의 행은 파싱·변환하지 않습니다.
     
     반환 컬럼:
     - date (날짜)
@@ -556,53 +871,7 @@ def serialize_lifelog_heartrate(path):
     - time (HH:MM:SS)
     - heart_rate (각 분 단위 심박수, -1은 결측값)
     """
-    # 1) 원본 시트 로드
-    df = load_raw_file(path, sheet_name='라이프로그-심박수')
-    
-    # 2) 컬럼명 한글 → 영문(관습적인 이름)으로 변경 (동적으로 컬럼명 탐지)
-    # - '측정값'이 포함된 컬럼: values
-    # - '비식별키' 포함: ID
-    # - '날짜' 포함: date
-    # - '평균' 포함: avg_heart_rate (있을 경우)
-    value_col = next(col for col in df.columns if '측정값' in col)
-    id_col = next(col for col in df.columns if '비식별키' in col)
-    date_col = next(col for col in df.columns if '날짜' in col)
-    # 평균 심박수는 있을 수도, 없을 수도 있음
-    avg_col = next((col for col in df.columns if '평균' in col), None)
-    rename_dict = {
-        id_col: 'ID',
-        date_col: 'date',
-        value_col: 'values',
-    }
-    if avg_col:
-        rename_dict[avg_col] = 'avg_heart_rate'
-    df.rename(columns=rename_dict, inplace=True)
-    
-    # 3) 1분 단위 시간 인덱스 생성 ('00:00:00' ~ '23:59:00' 총 1440개)
-    temp_idx = pd.date_range('2022-01-01', periods=1440, freq='1T')
-    col_minutes = temp_idx.strftime('%H:%M:%S')
-    
-    # 4) 쉼표로 이어진 문자열을 1분 단위 컬럼으로 분리
-    # values 열의 문자열이 "79,79,83,..." 형태로 들어있다고 가정
-    df_splitted = pd.DataFrame(
-        df['values'].str.split(',').tolist(),
-        columns=col_minutes
-    )
-    df_splitted.reset_index(drop=True, inplace=True)
-    
-    # 5) 원본 df와 분리된 df_splitted를 인덱스 기준으로 병합
-    df_reset = df.reset_index(drop=True)
-    df_merged = pd.concat([df_reset[['date', 'ID']], df_splitted], axis=1)
-    
-    # 6) melt를 통해 롱 포맷으로 변환
-    df_melted = df_merged.melt(id_vars=['date', 'ID'], var_name='time', value_name='heart_rate')
-    
-    # 7) heart_rate 컬럼을 숫자형으로 변환 (-1은 결측으로 처리)
-    df_melted['heart_rate'] = pd.to_numeric(df_melted['heart_rate'], errors='coerce')
-    df_melted.loc[df_melted['heart_rate'] == -1, 'heart_rate'] = np.nan
-    
-    # 8) 필요한 컬럼만 반환
-    return df_melted[['date', 'ID', 'time', 'heart_rate']]
+    return deserialize_lifelog_heartrate(path, session, id_filter=id_filter).to_long()
 
 
 
@@ -1007,20 +1276,32 @@ SYM2-1-482
 SYM2-1-62
 SYM2-1-73
 SYM2-1-96"""
-valid_ids = id_text.strip().splitlines()
+valid_ids = set(id_text.strip().splitlines())
+# filter_by_valid_ids가 기본으로 사용하는 필터 (로더에는 IdFilter(allow=valid_ids)를 따로 만들어 넘겨
+# 원본 로딩 단계와 로딩 후 필터링의 집계가 섞이지 않도록 합니다)
+VALID_ID_FILTER = IdFilter(allow=valid_ids)
 
 # ------------------------------------------------------------
 # 3) 범용 필터 함수
 # ------------------------------------------------------------
-def filter_by_valid_ids(df, id_column="ID"):
+def load_valid_ids(file_path):
     """
-    DataFrame(df)의 id_column 컬럼 값을 valid_ids 리스트에 포함된 ID에 한해 필터링한 뒤
-    복사본을 반환합니다.
+    한 줄에 ID 하나씩 적힌 텍스트 파일에서 valid ID 집합을 읽어 IdFilter로 반환합니다.
+    예:
+        id_filter = load_valid_ids('valid_ids.txt')
+        HR_melted = serialize_lifelog_heartrate(path, id_filter=id_filter)
+    """
+    return IdFilter.from_files(allow_path=file_path)
+
+def filter_by_valid_ids(df, id_column="ID", id_filter=None):
+    """
+    DataFrame(df)의 id_column 컬럼 값을 valid_ids 집합에 포함된 ID에 한해 필터링한 뒤
+    복사본을 반환합니다. id_filter를 주면 valid_ids 대신 해당 필터를 사용합니다.
     
     예:
         df_filtered = filter_by_valid_ids(original_df, id_column="비식별키")
     """
-    return df[df[id_column].isin(valid_ids)].copy()
+    return (VALID_ID_FILTER if id_filter is None else id_filter).filter_frame(df, id_column)
 
 # 함수 사용 예시
 # file_path = '/mnt/data/backup_SYM1.xlsx'
@@ -1028,8 +1309,8 @@ def filter_by_valid_ids(df, id_column="ID"):
 # print(df_serialized_hr.head())
 
 
-def extract_emotion_diary_from_raw(path, questionnaire_sheet, df_name, questionnaire_column):
-    df = load_raw_file(path, sheet_name=questionnaire_sheet)
+def extract_emotion_diary_from_raw(path, questionnaire_sheet, df_name, questionnaire_column, session=None):
+    df = _load_from(path, questionnaire_sheet, session)
 
     # Dynamically detect ID and date columns
     id_col = next((col for col in df.columns if ('비식별키' in col) or ('Non_identifying' in col)), None)
@@ -1047,8 +1328,8 @@ def extract_emotion_diary_from_raw(path, questionnaire_sheet, df_name, questionn
     df.drop_duplicates(['ID', 'date'], keep='last', inplace=True, ignore_index=False)
     return df
 
-def extract_questionnaire_from_raw(path, questionnaire_sheet, df_name ,questionnaire_column):
-    df = load_raw_file(path, sheet_name=questionnaire_sheet)
+def extract_questionnaire_from_raw(path, questionnaire_sheet, df_name ,questionnaire_column, session=None):
+    df = _load_from(path, questionnaire_sheet, session)
     df = df[['비식별키', '설문종료일', '설문완료일', questionnaire_column]]
     df.drop(['설문종료일'], axis=1, inplace=True)
     df.columns = ["ID", 'date', df_name]
@@ -0,0 +1,179 @@
+"""
+cache_utils.py
+
+This module provides a content-addressed cache for tables extracted from raw source files
+(e.g. the PXPN zip archive or the SYM backup workbooks).
+
+Each cached table is keyed by the SHA-256 content hash of every source file, together with the
+extraction parameters (title, exclude_keywords, sheet_name, ...). A cached table is therefore
+reused only while the inputs and parameters are unchanged, wherever the sources are stored and
+whatever their modification time. The hash of a file is computed once per process and reused
+while the size and modification time of the file are unchanged.
+
+Functions:
+- file_fingerprint(file_path: str | Path) -> dict:
+    Compute the size, mtime and content hash of a file (memoized on size and mtime).
+- make_cache_key(sources: list, params: dict) -> str:
+    Build a cache key from source file fingerprints and extraction parameters.
+- load_cached_table(cache_dir: str | Path, key: str) -> pd.DataFrame | None:
+    Load a cached table if it exists.
+- save_cached_table(df: pd.DataFrame, cache_dir: str | Path, key: str) -> Path:
+    Save a table to the cache.
+- cached_table(loader: Callable, sources: list, params: dict, cache_dir: str | Path) -> pd.DataFrame:
+    Return the cached table for the given sources/params, or run the loader and cache its result.
+
+Logging is configured via the config module.
+"""
+import library.config as config
+import logging
+
+import hashlib
+import json
+import pandas as pd
+import pyarrow as pa
+
+from pathlib import Path
+from typing import Callable, Optional, Union
+
+from library.path_utils import make_dir
+
+HASH_CHUNK_SIZE = 8 * 1024 * 1024
+# (resolved path, size, mtime_ns) → sha256, so an unchanged file is hashed once per process
+_HASH_MEMO = {}
+
+def file_fingerprint(file_path: Union[str, Path]) -> dict:
+    """
+    Compute the size, mtime and SHA-256 content hash of a file.
+
+    The hash is memoized on (path, size, mtime_ns): calling this again for a file whose size and
+    modification time are unchanged does not read the file.
+
+    Args:
+        file_path (str | Path): The file to fingerprint.
+
+    Returns:
+        dict: {'path', 'size', 'mtime_ns', 'sha256'}
+
+    Raises:
+        FileNotFoundError: If the file does not exist.
+    """
+    path = Path(file_path)
+    if not path.is_file():
+        raise FileNotFoundError(f"File {path} not found.")
+
+    stat = path.stat()
+    resolved = str(path.resolve())
+    memo_key = (resolved, stat.st_size, stat.st_mtime_ns)
+    if memo_key not in _HASH_MEMO:
+        digest = hashlib.sha256()
+        with path.open("rb") as f:
+            for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+                digest.update(chunk)
+        _HASH_MEMO[memo_key] = digest.hexdigest()
+
+    return {
+        'path': resolved,
+        'size': stat.st_size,
+        'mtime_ns': stat.st_mtime_ns,
+        'sha256': _HASH_MEMO[memo_key],
+    }
+
+def make_cache_key(sources: list, params: dict) -> str:
+    """
+    Build a cache key from source file fingerprints and extraction parameters.
+
+    Only the content hash of every source enters the key, so moving, copying or touching a source
+    file keeps its cache entries.
+
+    Args:
+        sources (list): Source file paths the table is extracted from. Fingerprints already computed
+            with file_fingerprint may be passed instead of paths to avoid hashing a file twice.
+        params (dict): Extraction parameters (must be JSON serializable, or convertible with str()).
+
+    Returns:
+        str: A hex digest identifying the (sources, params) combination.
+    """
+    payload = {
+        'sources': [(src if isinstance(src, dict) else file_fingerprint(src))['sha256'] for src in sources],
+        'params': params,
+    }
+    encoded = json.dumps(payload, sort_keys=True, default=str, ensure_ascii=False)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+def load_cached_table(cache_dir: Union[str, Path], key: str) -> Optional[pd.DataFrame]:
+    """
+    Load a cached table if it exists.
+
+    Args:
+        cache_dir (str | Path): The cache directory.
+        key (str): The cache key returned by make_cache_key.
+
+    Returns:
+        pd.DataFrame | None: The cached table, or None if there is no cache entry.
+    """
+    cache_dir = Path(cache_dir)
+    parquet_path = cache_dir / f"{key}.parquet"
+    pickle_path = cache_dir / f"{key}.pkl"
+    if parquet_path.exists():
+        logging.debug(f"Cache hit: {parquet_path}")
+        return pd.read_parquet(parquet_path)
+    if pickle_path.exists():
+        logging.debug(f"Cache hit: {pickle_path}")
+        return pd.read_pickle(pickle_path)
+    return None
+
+def save_cached_table(df: pd.DataFrame, cache_dir: Union[str, Path], key: str) -> Path:
+    """
+    Save a table to the cache as Parquet.
+
+    Tables that cannot be represented in Parquet (e.g. object columns mixing dates and strings,
+    which is common in raw Excel sheets) are stored as pickle instead. An entry of the other format
+    saved earlier under the same key is removed, so load_cached_table always finds this table.
+
+    Args:
+        df (pd.DataFrame): The table to cache.
+        cache_dir (str | Path): The cache directory.
+        key (str): The cache key returned by make_cache_key.
+
+    Returns:
+        Path: The path of the cache file.
+    """
+    dir_path = make_dir(cache_dir)
+    path = dir_path / f"{key}.parquet"
+    tmp_path = dir_path / f"{key}.parquet.tmp"
+    pickle_path = dir_path / f"{key}.pkl"
+    try:
+        df.to_parquet(tmp_path, index=False)
+        tmp_path.replace(path)
+        pickle_path.unlink(missing_ok=True)
+    except (pa.ArrowException, ValueError, TypeError) as e:
+        tmp_path.unlink(missing_ok=True)
+        logging.debug(f"Parquet not supported for cache entry {key} ({e}). Falling back to pickle.")
+        path.unlink(missing_ok=True)
+        path = pickle_path
+        df.to_pickle(path)
+    logging.debug(f"Saved cache entry to {path}")
+    return path
+
+def cached_table(loader: Callable[[], pd.DataFrame], sources: list, params: dict,
+                 cache_dir: Union[str, Path]) -> pd.DataFrame:
+    """
+    Return the cached table for the given sources/params, or run the loader and cache its result.
+
+    Args:
+        loader (Callable[[], pd.DataFrame]): Function that extracts the table from the sources.
+        sources (list): Source file paths the table is extracted from.
+        params (dict): Extraction parameters that affect the result.
+        cache_dir (str | Path): The cache directory.
+
+    Returns:
+        pd.DataFrame: The extracted (or cached) table.
+    """
+    key = make_cache_key(sources, params)
+    df = load_cached_table(cache_dir, key)
+    if df is not None:
+        return df
+
+    df = loader()
+    save_cached_table(df, cache_dir, key)
+    return df
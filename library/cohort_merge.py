@@ -0,0 +1,218 @@
+"""
+cohort_merge.py
+
+This module merges the per-cohort stage-3 results (SYM_720.csv, PXPN_720.csv) into one CSV
+chunk by chunk, against a declared column/dtype contract (library/config_merge.yaml), and
+reports the dtype drift between the cohorts.
+
+The merge runs in two passes over the inputs, so memory stays at one chunk:
+    1. infer the dtypes of every cohort chunk by chunk (the dtype pandas would infer for the file)
+    2. reconcile the cohort schemas: declared dtypes win, other columns get the dtype pd.concat
+       would give them (e.g. int + float → float, bool + int → int, text mixed with anything → object)
+    3. read every cohort again, cast it to the reconciled dtypes and append it to the output
+       (object columns are read as text, so their cells keep the text of the input files)
+
+The output has the columns of pd.concat([SYM, PXPN]) (SYM columns first, then columns only in
+PXPN) without the dropped columns; a column missing in a cohort is empty for its rows.
+
+A column that is numeric in some chunks of a cohort and text in others is read as text in every
+cohort, so its cells keep the text of the input files; pd.concat of the whole files would hold
+numbers and strings in one object column instead (e.g. 1 written back as 1.0 after a NaN). Such
+a column is reported ("mixed types within ...") and may only be declared as 'object'.
+
+Functions:
+- promote_dtypes(dtypes: list) -> str:
+    The dtype of the concatenation of columns with the given dtypes (None: column missing).
+- infer_csv_dtypes(path: str | Path, chunksize: int, **read_kwargs) -> tuple:
+    The dtype of every column of a CSV and the columns whose chunks have mixed types.
+- reconcile_schemas(schemas: dict, dtypes: dict, drop_columns: list) -> tuple:
+    The merged columns, their dtypes and the drift report.
+- stream_merge(inputs: dict, output_path: str | Path, dtypes: dict, drop_columns: list,
+               chunksize: int, **read_kwargs) -> pd.DataFrame:
+    Merge the cohort CSVs chunk by chunk and return the drift report.
+
+Logging is configured via the config module.
+"""
+import library.config as config
+import logging
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from pathlib import Path
+from typing import Optional, Union
+
+DEFAULT_CHUNKSIZE = 100_000
+REPORT_COLUMNS = ['column', 'declared', 'merged', 'issue']
+
+def _dtype_name(dtype) -> str:
+    return 'object' if dtype in ('str', str, object) else np.dtype(dtype).name
+
+def _common_dtype(names: set) -> str:
+    # read_csv가 한 파일의 chunk들을 합칠 때의 규칙 (bool이나 text가 다른 dtype과 섞이면 object)
+    if len(names) == 1:
+        return next(iter(names))
+    kinds = {np.dtype(n).kind for n in names}
+    if 'O' in kinds or 'b' in kinds or not kinds <= {'i', 'u', 'f'}:
+        return 'object'
+    return 'float64'
+
+def promote_dtypes(dtypes: list) -> str:
+    """
+    Return the dtype of the concatenation of columns with the given dtypes, as pd.concat gives it.
+
+    The dtype is taken from pd.concat of one-row frames, since pd.concat of DataFrames does not
+    follow one simple rule (bool + int gives int64, bool + float depends on the order).
+
+    Args:
+        dtypes (list): dtype names of the parts in concat order; None for a part without the
+            column (all NaN).
+
+    Returns:
+        str: The dtype name of the concatenated column.
+    """
+    names = [None if d is None else _dtype_name(d) for d in dtypes]
+    present = {n for n in names if n is not None}
+    if len(present) == 1 and None not in names:
+        return present.pop()
+    parts = [pd.DataFrame({'column': np.zeros(1, dtype=n)}) if n is not None else pd.DataFrame({'other': [0]})
+             for n in names]
+    with warnings.catch_warnings():
+        # 빈/전부 NA인 부분의 dtype 처리 변경 예고 (pd.concat도 같은 경고를 냄)
+        warnings.simplefilter('ignore', FutureWarning)
+        return pd.concat(parts, ignore_index=True)['column'].dtype.name
+
+def infer_csv_dtypes(path: Union[str, Path], chunksize: int = DEFAULT_CHUNKSIZE, **read_kwargs) -> tuple:
+    """
+    Infer the dtype of every column of a CSV chunk by chunk.
+
+    Args:
+        path (str | Path): The CSV file.
+        chunksize (int): Rows per chunk.
+        **read_kwargs: Extra pd.read_csv arguments (e.g. index_col=False).
+
+    Returns:
+        tuple: (dict column → dtype name in file order, set of columns that are numeric in some
+            chunks and text in others).
+    """
+    parts = {}
+    for chunk in pd.read_csv(path, chunksize=chunksize, **read_kwargs):
+        for column, dtype in chunk.dtypes.items():
+            parts.setdefault(column, set()).add(dtype.name)
+    dtypes = {column: _common_dtype(names) for column, names in parts.items()}
+    mixed = {column for column, names in parts.items() if 'object' in names and len(names) > 1}
+    return dtypes, mixed
+
+def reconcile_schemas(schemas: dict, dtypes: Optional[dict] = None, drop_columns: Optional[list] = None) -> tuple:
+    """
+    Reconcile the cohort schemas against the declared dtypes.
+
+    Args:
+        schemas (dict): cohort → (dtypes, mixed) as returned by infer_csv_dtypes, in output order.
+        dtypes (dict, optional): Declared column → dtype ('object' for text).
+        drop_columns (list, optional): Columns left out of the output.
+
+    Returns:
+        tuple: (merged column list, dict column → merged dtype, drift report DataFrame with one
+            row per column that drifts: its dtype in every cohort ('' if missing), the declared
+            and merged dtype and the issues).
+
+    Raises:
+        ValueError: If a declared column is missing in every cohort, a declared int/bool
+            column is missing in a cohort (its rows could not be filled), or a column declared
+            with a non-text dtype has mixed types within a cohort.
+    """
+    declared = {column: _dtype_name(dtype) for column, dtype in (dtypes or {}).items()}
+    drop = set(drop_columns or [])
+    columns = []
+    for cohort_dtypes, _ in schemas.values():
+        columns += [c for c in cohort_dtypes if c not in drop and c not in columns]
+
+    missing_declared = [c for c in declared if c not in columns]
+    if missing_declared:
+        raise ValueError(f"Declared columns not found in any cohort: {missing_declared}")
+
+    merged, rows = {}, []
+    for column in columns:
+        found = {cohort: s[0].get(column) for cohort, s in schemas.items()}
+        absent = [cohort for cohort, dtype in found.items() if dtype is None]
+        inferred = promote_dtypes(list(found.values()))
+        merged[column] = declared.get(column, inferred)
+
+        issues = []
+        if absent:
+            if column in declared and np.dtype(declared[column]).kind in 'iub':
+                raise ValueError(f"Declared {declared[column]} column {column!r} is missing in {absent}")
+            issues.append(f"missing in {', '.join(absent)}")
+        if len({d for d in found.values() if d is not None}) > 1:
+            issues.append('dtype differs between cohorts')
+        mixed_in = [cohort for cohort, s in schemas.items() if column in s[1]]
+        if mixed_in and column in declared and declared[column] != 'object':
+            raise ValueError(f"Declared {declared[column]} column {column!r} has mixed types within {mixed_in}")
+        issues += [f"mixed types within {cohort}" for cohort in mixed_in]
+        if column in declared and any(d is not None and d != declared[column] for d in found.values()):
+            issues.append(f"cast to declared {declared[column]}")
+        if issues:
+            rows.append({'column': column, **{cohort: dtype or '' for cohort, dtype in found.items()},
+                         'declared': declared.get(column, ''), 'merged': merged[column], 'issue': '; '.join(issues)})
+
+    report = pd.DataFrame(rows, columns=['column', *schemas, *REPORT_COLUMNS[1:]])
+    return columns, merged, report
+
+def stream_merge(inputs: dict, output_path: Union[str, Path], dtypes: Optional[dict] = None,
+                 drop_columns: Optional[list] = None, chunksize: int = DEFAULT_CHUNKSIZE, **read_kwargs) -> pd.DataFrame:
+    """
+    Merge the cohort CSVs into one CSV chunk by chunk (rows in cohort order).
+
+    The output is written to a temporary file that replaces output_path when all cohorts are
+    written, so a failed merge leaves the previous output in place.
+
+    Args:
+        inputs (dict): cohort → CSV path, in output order (e.g. {'SYM': ..., 'PXPN': ...}).
+        output_path (str | Path): The merged CSV.
+        dtypes (dict, optional): Declared column → dtype ('object' for text).
+        drop_columns (list, optional): Columns left out of the output (ignored if missing).
+        chunksize (int): Rows per chunk.
+        **read_kwargs: Extra pd.read_csv arguments (e.g. index_col=False).
+
+    Returns:
+        pd.DataFrame: The drift report (see reconcile_schemas).
+
+    Raises:
+        ValueError: If the cohorts do not match the declared dtypes.
+    """
+    output_path = Path(output_path)
+    schemas = {cohort: infer_csv_dtypes(path, chunksize, **read_kwargs) for cohort, path in inputs.items()}
+    columns, merged, report = reconcile_schemas(schemas, dtypes, drop_columns)
+    unknown_drops = [c for c in (drop_columns or []) if all(c not in s[0] for s in schemas.values())]
+    if unknown_drops:
+        logging.warning(f"Columns to drop not found in any cohort: {unknown_drops}")
+    for row in report.itertuples(index=False):
+        logging.warning(f"{row.column}: {row.issue} (merged as {row.merged})")
+
+    tmp_path = output_path.with_name(output_path.name + '.tmp')
+    header, n_rows = True, 0
+    try:
+        for cohort, path in inputs.items():
+            own = schemas[cohort][0]
+            present = [c for c in columns if c in own]
+            # object 컬럼은 텍스트 그대로, 나머지는 코호트의 dtype으로 읽은 뒤 merge dtype으로 변환
+            read_dtypes = {c: 'object' if merged[c] == 'object' else own[c] for c in present}
+            casts = {c: merged[c] for c in present if merged[c] != read_dtypes[c]}
+            reader = pd.read_csv(path, chunksize=chunksize, usecols=present, dtype=read_dtypes, **read_kwargs)
+            try:
+                for chunk in reader:
+                    chunk.astype(casts).reindex(columns=columns).to_csv(tmp_path, index=False, header=header,
+                                                                        mode='w' if header else 'a')
+                    header, n_rows = False, n_rows + len(chunk)
+            except (ValueError, TypeError) as e:
+                raise ValueError(f"{cohort} ({path}) does not match the merge dtypes: {e}") from e
+        if header:
+            pd.DataFrame(columns=columns).to_csv(tmp_path, index=False)
+        tmp_path.replace(output_path)
+    finally:
+        tmp_path.unlink(missing_ok=True)
+
+    logging.debug(f"Merged {list(inputs)} into {output_path} ({n_rows} rows, {len(columns)} columns)")
+    return report
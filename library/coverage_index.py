@@ -0,0 +1,47 @@
+"""
+coverage_index.py
+
+This module provides a day-coverage index: the number of recorded, valid and nonzero minutes of
+every patient-day of a long (one row per minute) signal table.
+
+Stage 2 keeps only days with more than HR_FILTER (360 or 720) valid heart rate minutes for the
+interpolation, circadian and bandpower features. The index is computed once, the features are
+computed once for the loosest threshold, and every stricter threshold keeps the days of that
+result whose n_valid is above it, so all HR_FILTER variants come out of a single run
+(see hr_day_features in data_scraping/SYM/utils_for_analysis.py).
+
+Functions:
+- coverage_index(df: pd.DataFrame, value_col: str, id_col: str, date_col: str) -> pd.DataFrame:
+    n_rows, n_valid and n_nonzero per (ID, date).
+
+Logging is configured via the config module.
+"""
+import library.config as config
+import logging
+
+import numpy as np
+import pandas as pd
+
+def coverage_index(df: pd.DataFrame, value_col: str, id_col: str = 'ID', date_col: str = 'date') -> pd.DataFrame:
+    """
+    Count the recorded, valid and nonzero minutes of every patient-day.
+
+    Args:
+        df (pd.DataFrame): Long table (one row per minute) with ID, date and value columns.
+        value_col (str): The signal column (converted with pd.to_numeric, errors='coerce').
+        id_col (str): The patient ID column.
+        date_col (str): The date column.
+
+    Returns:
+        pd.DataFrame: id_col, date_col (as in df), n_rows (rows), n_valid (non-NaN values) and
+            n_nonzero (non-NaN, nonzero values); one row per (ID, date) in order of first appearance.
+    """
+    values = pd.to_numeric(df[value_col], errors='coerce').to_numpy(dtype=np.float64)
+    codes, uniques = pd.MultiIndex.from_frame(df[[id_col, date_col]]).factorize()
+    valid = ~np.isnan(values)
+    out = uniques.to_frame(index=False, name=[id_col, date_col])
+    out['n_rows'] = np.bincount(codes, minlength=len(uniques))
+    out['n_valid'] = np.bincount(codes[valid], minlength=len(uniques))
+    out['n_nonzero'] = np.bincount(codes[valid & (values != 0)], minlength=len(uniques))
+    logging.debug(f"Indexed coverage of {len(out)} days ({len(df)} rows of {value_col})")
+    return out
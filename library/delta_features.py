@@ -0,0 +1,105 @@
+"""
+delta_features.py
+
+This module provides a declarative engine for day-to-day difference (delta) features, such as
+step_delta, step_max_delta2 or acr_delta, which stage 2 built with a per-ID loop of date_range,
+right merges, .diff() calls and concat.
+
+A spec is a list of (column, name, periods) entries. For every entry and every period k the
+engine adds the column f"{name}_delta" (k = 1) or f"{name}_delta{k}" (k > 1), equal to
+df[column].diff(periods=k) within each patient after the patient's rows have been reindexed to a
+full daily calendar (missing days are NaN).
+
+Functions:
+- calendar_reindex(df: pd.DataFrame, id_col: str, date_col: str) -> pd.DataFrame:
+    Reindex every patient to all days between its first and last date in one merge.
+- delta_features(df: pd.DataFrame, spec: list, id_col: str, date_col: str, by_period: bool) -> pd.DataFrame:
+    Calendar reindex plus all delta columns of the spec in one grouped shift per period.
+- delta_column_name(name: str, period: int) -> str:
+    Output column name of one delta.
+
+Logging is configured via the config module.
+"""
+import library.config as config
+import logging
+
+import numpy as np
+import pandas as pd
+
+STEP_DELTA_SPEC = [
+    ('steps', 'step', (1, 2)),
+    ('step_max', 'step_max', (1, 2)),
+    ('step_mean', 'step_mean', (1, 2)),
+    ('step_hvar_mean', 'step_hvar_mean', (1, 2)),
+]
+CIRCADIAN_DELTA_SPEC = [
+    ('acr', 'acr', (1, 2)),
+    ('amp', 'amp', (1, 2)),
+    ('mesor', 'mesor', (1, 2)),
+]
+
+def delta_column_name(name: str, period: int) -> str:
+    """Return the delta column name: name_delta for period 1, name_delta{period} otherwise."""
+    return f"{name}_delta" if period == 1 else f"{name}_delta{period}"
+
+def calendar_reindex(df: pd.DataFrame, id_col: str = 'ID', date_col: str = 'date') -> pd.DataFrame:
+    """
+    Reindex every patient to all days between its first and last date.
+
+    Same result as concatenating, for every ID in order of first appearance,
+    pd.merge(df_id, pd.DataFrame({'date': pd.date_range(min, max, freq='D')}), how='right', on='date').
+
+    Args:
+        df (pd.DataFrame): Daily table with `id_col` and a datetime `date_col`.
+        id_col (str): The patient ID column.
+        date_col (str): The date column (datetime64).
+
+    Returns:
+        pd.DataFrame: One row per patient-day of the calendar (more if df has duplicate days),
+            the columns of df in the same order, with NaN on the added days.
+    """
+    dates = df.groupby(id_col, sort=False)[date_col].agg(['min', 'max']).dropna()
+    n_days = ((dates['max'] - dates['min']) // pd.Timedelta(days=1)).to_numpy(dtype=np.int64) + 1
+    starts = np.repeat(np.cumsum(n_days) - n_days, n_days)
+    offsets = np.arange(n_days.sum()) - starts
+    calendar = pd.DataFrame({
+        id_col: np.repeat(dates.index.to_numpy(), n_days),
+        date_col: np.repeat(dates['min'].to_numpy(), n_days) + pd.to_timedelta(offsets, unit='D'),
+    })
+    out = pd.merge(df, calendar, how='right', on=[id_col, date_col])
+    logging.debug(f"Reindexed {len(dates)} IDs to {len(calendar)} calendar days ({len(df)} rows)")
+    return out[df.columns]
+
+def delta_features(df: pd.DataFrame, spec: list, id_col: str = 'ID', date_col: str = 'date',
+                   by_period: bool = False) -> pd.DataFrame:
+    """
+    Reindex every patient to a full calendar and add all delta columns of a spec.
+
+    The columns are in the order of the stage-2 loops: id_col, date_col, the spec columns, the
+    delta columns, then the other columns of df (e.g. step_var of step_date.csv).
+
+    Args:
+        df (pd.DataFrame): Daily table with `id_col`, a datetime `date_col` and the spec columns.
+        spec (list): (column, name, periods) entries, e.g. STEP_DELTA_SPEC.
+        id_col (str): The patient ID column.
+        date_col (str): The date column (datetime64).
+        by_period (bool): Order the delta columns by period (step_delta, step_max_delta, ...,
+            step_delta2, ...) instead of by spec entry (acr_delta, acr_delta2, amp_delta, ...).
+
+    Returns:
+        pd.DataFrame: calendar_reindex(df) with the delta columns, in the order above.
+    """
+    out = calendar_reindex(df, id_col, date_col).reset_index(drop=True)
+    columns = list(dict.fromkeys(column for column, _, _ in spec))
+    periods = sorted({k for _, _, ks in spec for k in ks})
+    grouped = out.groupby(id_col, sort=False)[columns]
+    # 주기마다 그룹 shift 한 번으로 모든 컬럼의 diff(periods=k)를 계산
+    shifted = {k: grouped.shift(k) for k in periods}
+    entries = [(column, name, k) for column, name, ks in spec for k in ks]
+    if by_period:
+        entries = sorted(entries, key=lambda entry: entry[2])
+    deltas = {delta_column_name(name, k): out[column] - shifted[k][column] for column, name, k in entries}
+
+    leading = list(dict.fromkeys([id_col, date_col] + columns))
+    rest = [c for c in out.columns if c not in leading]
+    return pd.concat([out[leading], pd.DataFrame(deltas, index=out.index), out[rest]], axis=1)
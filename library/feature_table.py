@@ -0,0 +1,67 @@
+"""
+feature_table.py
+
+This module combines several per-day feature tables (for example HR_date, circadian_delta and
+bandpower) into one table keyed by (ID, date), and splits it back into the original tables.
+
+Every feature group keeps its own set of days. The combined table holds the union of those days,
+plus a boolean column has_<group> that marks the days in each group. Splitting keeps only the
+marked rows of each group, so a day that was a row of all-NaN values (for example a calendar day
+added by delta_features) is still a row of the split table.
+
+Functions:
+- combine_feature_groups(groups: dict, keys: list) -> pd.DataFrame:
+    Outer-join per-day feature tables on the keys and mark the days of every group.
+- split_feature_groups(table: pd.DataFrame, columns: dict, keys: list) -> dict:
+    The per-group tables of a combined table.
+
+Logging is configured via the config module.
+"""
+import library.config as config
+import logging
+
+import pandas as pd
+
+def combine_feature_groups(groups: dict, keys: list = ['ID', 'date']) -> pd.DataFrame:
+    """
+    Outer-join per-day feature tables on the keys and mark the days of every group.
+
+    Args:
+        groups (dict): {group name: DataFrame with the key columns and the group's feature columns}.
+            Each table must have at most one row per key, and the feature columns must not clash.
+        keys (list): The key columns (same dtype in every table).
+
+    Returns:
+        pd.DataFrame: keys, the feature columns of every group in order, and has_<group> (bool)
+            for every group; one row per key in the union, sorted by the keys.
+
+    Raises:
+        ValueError: If a table has duplicate keys.
+    """
+    table = None
+    for name, df in groups.items():
+        if df.duplicated(subset=keys).any():
+            raise ValueError(f"Feature group {name!r} has duplicate {keys} rows")
+        part = df.assign(**{f"has_{name}": True})
+        table = part if table is None else pd.merge(table, part, how='outer', on=keys)
+
+    flags = [f"has_{name}" for name in groups]
+    features = [c for c in table.columns if c not in keys and c not in flags]
+    table[flags] = table[flags].eq(True)
+    logging.debug(f"Combined {len(groups)} feature groups into {len(table)} rows")
+    return table[keys + features + flags].sort_values(keys).reset_index(drop=True)
+
+def split_feature_groups(table: pd.DataFrame, columns: dict, keys: list = ['ID', 'date']) -> dict:
+    """
+    Split a combined table back into per-group tables.
+
+    Args:
+        table (pd.DataFrame): Output of combine_feature_groups (or the same table read from CSV).
+        columns (dict): {group name: feature columns of the group, in output order}.
+        keys (list): The key columns.
+
+    Returns:
+        dict: {group name: DataFrame with the keys and the group's columns, only the group's days}.
+    """
+    return {name: table.loc[table[f"has_{name}"].astype(bool), keys + list(cols)].reset_index(drop=True)
+            for name, cols in columns.items()}
@@ -0,0 +1,244 @@
+"""
+hr_features.py
+
+This module holds the stage-2 HR feature table of both cohorts: the feature groups, the
+multitaper bandpower of the interpolated day signals, the assembly of the per-threshold table and
+the per-patient checkpointing. The cohort-specific day preparation (SYM utils_for_analysis.hr_day_features,
+PXPN utils_for_preprocessing.hr_day_features) is passed in as day_features.
+
+Functions:
+- bandpower_bands(signals, sf: float, bands: dict, relative: bool, lengths: np.ndarray) -> np.ndarray:
+    Bandpower of every band of every day, with one multitaper PSD per day.
+- padded_day_signals(values: np.ndarray, lengths: np.ndarray, keys: pd.DataFrame, selected: np.ndarray) -> tuple:
+    The minute grid day signals of the bandpower cells (each day padded to the next day).
+- bandpower_for_days(days: dict, bands: dict, n_jobs: int, chunk_size: int) -> dict:
+    Bandpower tables of several HR_FILTER thresholds, computing every distinct day once.
+- hr_feature_table(HR: pd.DataFrame, day_features: Callable, hr_filters: tuple, n_jobs: int,
+                   chunk_size: int, **params) -> pd.DataFrame:
+    The HR_date, circadian_delta and bandpower features of every HR_FILTER threshold in one table.
+- sort_by_filter(table: pd.DataFrame, hr_filters: tuple) -> pd.DataFrame:
+    Put a merged per-patient feature table back in the row order of hr_feature_table.
+- hr_feature_table_checkpointed(HR: pd.DataFrame, day_features: Callable, checkpoint_dir: str | Path,
+                                hr_filters: tuple, params: dict, batch_size: int, n_jobs: int,
+                                chunk_size: int) -> pd.DataFrame:
+    Compute hr_feature_table in batches of patients with per-patient checkpoints.
+
+Logging is configured via the config module.
+"""
+import library.config as config
+
+import numpy as np
+import pandas as pd
+
+from mne.time_frequency import psd_array_multitaper
+from pathlib import Path
+from scipy.integrate import simps
+from typing import Callable, Optional, Union
+
+from library.delta_features import delta_features, delta_column_name, CIRCADIAN_DELTA_SPEC
+from library.feature_table import combine_feature_groups
+from library.minute_features import fill_days
+from library.shard_checkpoint import code_signature, run_patient_shards
+from library.shared_pool import map_row_blocks
+
+BANDPOWER_BANDS = {
+    'bandpower_a': [0.0005, 0.001],
+    'bandpower_b': [0.0001, 0.0005],
+    'bandpower_c': [0.00005, 0.0001],
+    'bandpower_d': [0.00001, 0.00005],
+}
+
+HR_FEATURE_GROUPS = {
+    'HR_date': ['HR_var', 'HR_max', 'HR_mean', 'HR_hvar_mean'],
+    'circadian_delta': ['acr', 'amp', 'mesor'] + [delta_column_name(name, k) for _, name, ks in CIRCADIAN_DELTA_SPEC for k in ks],
+    'bandpower': list(BANDPOWER_BANDS),
+}
+
+def bandpower_bands(signals, sf: float, bands=BANDPOWER_BANDS, relative: bool = True,
+                    lengths: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Compute the multitaper PSD of every day once and the bandpower of all requested bands from it.
+
+    Same values as check_bandpower_value_a~d of the cohort utils (NaNs are forward- then
+    backward-filled first). Signals of the same length are passed to psd_array_multitaper together,
+    so the DPSS tapers are computed once per length.
+
+    Args:
+        signals: (n_days, n_samples) array, or a list of 1-D arrays of different lengths.
+        sf (float): Sampling frequency (1/60 for minute data).
+        bands (dict | list): {name: [low, high]} or a list of [low, high].
+        relative (bool): Divide by the total power of the day.
+        lengths (np.ndarray, optional): If given, signals is 2-D and day i is signals[i, :lengths[i]].
+
+    Returns:
+        np.ndarray: (n_days, n_bands) bandpower.
+    """
+    if lengths is not None:
+        signals = [row[:n] for row, n in zip(signals, lengths)]
+    signals = [np.asarray(s, dtype=np.float64) for s in signals]
+    band_list = list(bands.values()) if isinstance(bands, dict) else list(bands)
+    out = np.full((len(signals), len(band_list)), np.nan)
+    lengths = np.array([len(s) for s in signals])
+    for n in np.unique(lengths):
+        rows = np.flatnonzero(lengths == n)
+        batch = fill_days(np.vstack([signals[i] for i in rows]))
+        psd, freqs = psd_array_multitaper(batch, sf, adaptive=True,
+                                          normalization='full', verbose=0)
+        freq_res = freqs[1] - freqs[0]
+        masks = [np.logical_and(freqs >= low, freqs <= high) for low, high in band_list]
+        # 적분은 하루씩 (2차원 simps는 합산 순서가 달라 마지막 자리 값이 달라질 수 있음)
+        for row, day_psd in zip(rows, psd):
+            total = simps(day_psd, dx=freq_res) if relative else 1.0
+            out[row] = [simps(day_psd[idx_band], dx=freq_res) / total for idx_band in masks]
+    return out
+
+def padded_day_signals(values: np.ndarray, lengths: np.ndarray, keys: pd.DataFrame, selected: np.ndarray) -> tuple:
+    """
+    Build the day signals of the bandpower cells from a day matrix.
+
+    The old cells right-merged every ID onto date_range(first, last, freq='min') by date (a
+    midnight Timestamp), so the HR rows of a day sit at 00:00 and are followed by 1439 missing
+    minutes, except on the last day of the ID.
+
+    Args:
+        values (np.ndarray): values[i, :lengths[i]] are the HR rows of day i.
+        lengths (np.ndarray): Rows per day.
+        keys (pd.DataFrame): ID and date (Timestamp) of every day.
+        selected (np.ndarray): Days to return (the last day of an ID is taken over all days).
+
+    Returns:
+        tuple: (keys of the selected days, NaN-padded float64 signals, signal lengths), ordered by
+            first appearance of the ID, then date.
+    """
+    id_rank = pd.factorize(keys['ID'])[0]
+    order = np.lexsort((keys['date'].to_numpy(), id_rank))
+    order = order[selected[order]]
+    last_day = keys.groupby('ID', sort=False)['date'].transform('max').to_numpy()
+    # 마지막 날이 아니면 그날 00:00 이후 1439분(결측)이 신호 뒤에 붙습니다.
+    padding = np.where(keys['date'].to_numpy() == last_day, 0, 24 * 60 - 1)[order]
+
+    lengths = lengths[order] + padding
+    width = max(int(lengths.max()) if len(order) else 0, values.shape[1])
+    signals = np.full((len(order), width), np.nan)
+    signals[:, :values.shape[1]] = values[order]
+    return keys.iloc[order].reset_index(drop=True), signals, lengths
+
+def bandpower_for_days(days: dict, bands: dict = BANDPOWER_BANDS, n_jobs: Optional[int] = None,
+                       chunk_size: int = 64) -> dict:
+    """
+    Compute the bandpower tables of several HR_FILTER thresholds.
+
+    Days with the same (ID, date, signal length) have the same signal, so the PSD of every
+    distinct day is computed once (with map_row_blocks) over all thresholds.
+
+    Args:
+        days (dict): threshold → padded_day_signals result.
+        bands (dict): {name: [low, high]}.
+        n_jobs (int, optional): Worker processes (None: all cores).
+        chunk_size (int): Days per task.
+
+    Returns:
+        dict: threshold → DataFrame (ID, date and one column per band).
+    """
+    keys = pd.concat([k.assign(length=l) for k, _, l in days.values()], ignore_index=True)
+    codes, uniques = pd.MultiIndex.from_frame(keys).factorize()
+    first = np.unique(codes, return_index=True)[1]
+
+    # 서로 다른 날의 신호만 모아 한 번에 계산
+    width = max(s.shape[1] for _, s, _ in days.values())
+    signals = np.full((len(first), width), np.nan)
+    lengths = keys['length'].to_numpy()[first]
+    offsets = np.cumsum([0] + [len(k) for k, _, _ in days.values()])
+    for (_, s, _), start in zip(days.values(), offsets):
+        rows = np.flatnonzero((first >= start) & (first < start + len(s)))
+        signals[rows, :s.shape[1]] = s[first[rows] - start]
+    results = map_row_blocks(bandpower_bands, {'signals': signals, 'lengths': lengths},
+                             kwargs={'sf': 1/60, 'bands': bands}, n_jobs=n_jobs, chunk_size=chunk_size)
+
+    out = {}
+    for (t, (k, _, _)), start in zip(days.items(), offsets):
+        df = k.copy()
+        for j, name in enumerate(bands):
+            df[name] = results[codes[start:start + len(k)], j]
+        out[t] = df
+    return out
+
+def hr_feature_table(HR: pd.DataFrame, day_features: Callable, hr_filters: tuple = (360, 720),
+                     n_jobs: Optional[int] = None, chunk_size: int = 64, **params) -> pd.DataFrame:
+    """
+    Compute the HR features of every HR_FILTER threshold in one table.
+
+    The day matrix is built once by the cohort's day_features and shared by the cosinor fit and
+    the bandpower of all thresholds (split_feature_groups(table, HR_FEATURE_GROUPS) gives the
+    per-threshold tables of the old stage-2 files).
+
+    Args:
+        HR (pd.DataFrame): Long HR table (ID, date, time, HR or heart_rate).
+        day_features (Callable): day_features(HR, hr_filters, **params) -> (HR_date, circadian,
+            circadian_counts, days): the daily stats, the cosinor fit of the days over the loosest
+            threshold (ID, date, acr, amp, mesor), the count of every fitted day that must exceed a
+            threshold and threshold → padded_day_signals result.
+        hr_filters (tuple): HR_FILTER thresholds.
+        n_jobs (int, optional): Worker processes of the bandpower pool (None: all cores).
+        chunk_size (int): Days per bandpower task.
+        **params: Other day_features arguments (e.g. limit=30).
+
+    Returns:
+        pd.DataFrame: hr_filter, ID, date, the HR_FEATURE_GROUPS columns and has_HR_date /
+            has_circadian_delta / has_bandpower (by threshold, then ID, date).
+    """
+    if 'heart_rate' in HR.columns:
+        HR = HR.rename(columns={'heart_rate': 'HR'})
+    HR = HR.assign(HR=pd.to_numeric(HR['HR']))
+    HR_date, circadian, circadian_counts, days = day_features(HR, hr_filters, **params)
+    bandpower = bandpower_for_days(days, BANDPOWER_BANDS, n_jobs, chunk_size)
+
+    tables = []
+    for t in hr_filters:
+        circadian_t = circadian.loc[circadian_counts > t].reset_index(drop=True)
+        circadian_t['date'] = pd.to_datetime(circadian_t['date'])
+        circadian_delta = delta_features(circadian_t, CIRCADIAN_DELTA_SPEC)
+        circadian_delta['date'] = circadian_delta['date'].dt.strftime('%Y-%m-%d')
+        bandpower_t = bandpower[t].assign(date=bandpower[t]['date'].dt.strftime('%Y-%m-%d'))
+        table = combine_feature_groups({'HR_date': HR_date, 'circadian_delta': circadian_delta, 'bandpower': bandpower_t})
+        tables.append(table.assign(hr_filter=t)[['hr_filter'] + list(table.columns)])
+    return pd.concat(tables, ignore_index=True)
+
+def sort_by_filter(table: pd.DataFrame, hr_filters: tuple) -> pd.DataFrame:
+    """Put a table of merged patient partitions back in hr_feature_table order (threshold, then ID, date)."""
+    if table.empty:
+        return table
+    rank = table['hr_filter'].map({t: i for i, t in enumerate(hr_filters)})
+    order = table.assign(_rank=rank).sort_values(['_rank', 'ID', 'date'], kind='stable').index
+    return table.loc[order].reset_index(drop=True)
+
+def hr_feature_table_checkpointed(HR: pd.DataFrame, day_features: Callable, checkpoint_dir: Union[str, Path],
+                                  hr_filters: tuple = (360, 720), params: Optional[dict] = None,
+                                  batch_size: int = 32, n_jobs: Optional[int] = None, chunk_size: int = 64) -> pd.DataFrame:
+    """
+    Compute hr_feature_table in batches of patients and checkpoint every patient.
+
+    A rerun after a crash or kernel restart skips the patients whose HR rows and parameters are
+    unchanged and only computes the rest; editing the feature code (the module of day_features
+    and the library modules it uses, see code_signature) recomputes every patient (the features of a patient do not depend on the others,
+    so the result is the same as hr_feature_table(HR, day_features, hr_filters)).
+
+    Args:
+        HR (pd.DataFrame): Long HR table (ID, date, time, HR).
+        day_features (Callable): The cohort's hr_day_features (see hr_feature_table).
+        checkpoint_dir (str | Path): Folder of the manifest and the patient partitions.
+        hr_filters (tuple): HR_FILTER thresholds.
+        params (dict, optional): Other day_features arguments that change the result (e.g. {'limit': 30}).
+        batch_size (int): Patients per batch (one manifest save per batch).
+        n_jobs (int, optional): Worker processes of the bandpower pool (None: all cores).
+        chunk_size (int): Days per bandpower task.
+
+    Returns:
+        pd.DataFrame: The hr_feature_table result (by threshold, then ID, date).
+    """
+    params = dict(params or {})
+    signature_params = {'hr_filters': list(hr_filters), **params}
+    compute = lambda part: hr_feature_table(part, day_features, hr_filters, n_jobs=n_jobs, chunk_size=chunk_size, **params)
+    table = run_patient_shards(HR, compute, checkpoint_dir, 'HR_features', params=signature_params,
+                               code_version=code_signature(day_features), batch_size=batch_size)
+    return sort_by_filter(table, hr_filters)
@@ -0,0 +1,183 @@
+"""
+id_filter.py
+
+This module provides IdFilter, a patient ID allow/deny filter that is passed into the raw-data
+loaders (PXPN passive-data archive, SYM workbooks) so that archives and rows of excluded patients
+are skipped before they are decompressed or parsed.
+
+A patient is skipped if (checked in this order):
+- deny_prefix: the ID starts with one of deny_prefixes (e.g. 'SRTN')
+- deny: the ID is in the deny set
+- allow: an allow set is given and the ID is not in it
+
+Every skip is counted per filter (number of units and, when known, rows and bytes), so the
+amount of work saved can be reported with IdFilter.report().
+
+Functions:
+- load_id_file(file_path: str | Path) -> set:
+    Read a set of IDs from a text file (one ID per line, '#' comments allowed).
+
+Classes:
+- IdFilter: allow/deny filter with per-filter skip counters.
+
+Logging is configured via the config module.
+"""
+import library.config as config
+import logging
+
+import numpy as np
+import pandas as pd
+
+from collections import Counter
+from pathlib import Path
+from typing import Iterable, Optional, Union
+
+FILTER_NAMES = ['deny_prefix', 'deny', 'allow']
+
+def load_id_file(file_path: Union[str, Path]) -> set:
+    """
+    Read a set of IDs from a text file.
+
+    Args:
+        file_path (str | Path): Text file with one ID per line. Blank lines and lines starting
+            with '#' are ignored.
+
+    Returns:
+        set: The IDs in the file.
+
+    Raises:
+        FileNotFoundError: If the file does not exist.
+    """
+    path = Path(file_path)
+    if not path.exists():
+        raise FileNotFoundError(f"File {path} not found.")
+    with path.open('r', encoding='utf-8') as f:
+        return {line.strip() for line in f if line.strip() and not line.strip().startswith('#')}
+
+class IdFilter:
+    """
+    Patient ID allow/deny filter with per-filter skip counters.
+
+    Usage:
+        id_filter = IdFilter.from_files(allow_path='valid_ids.txt', deny_prefixes=('SRTN',))
+        df = id_filter.filter_frame(df, 'ID')       # rows of skipped patients are counted
+        if id_filter.accepts(pid, n_bytes=size):     # archives of skipped patients are counted
+            ...
+        id_filter.report()
+    """
+
+    def __init__(self, allow: Optional[Iterable[str]] = None, deny: Optional[Iterable[str]] = None,
+                 deny_prefixes: Iterable[str] = ()):
+        self.allow = None if allow is None else {str(pid) for pid in allow}
+        self.deny = set() if deny is None else {str(pid) for pid in deny}
+        self.deny_prefixes = tuple(deny_prefixes)
+        self.reset_counts()
+
+    @classmethod
+    def from_files(cls, allow_path: Optional[Union[str, Path]] = None, deny_path: Optional[Union[str, Path]] = None,
+                   deny_prefixes: Iterable[str] = ()) -> 'IdFilter':
+        """Build a filter from allow/deny ID files (see load_id_file)."""
+        return cls(allow=None if allow_path is None else load_id_file(allow_path),
+                   deny=None if deny_path is None else load_id_file(deny_path),
+                   deny_prefixes=deny_prefixes)
+
+    def reset_counts(self) -> None:
+        """Reset the skip counters."""
+        self.skipped_units = Counter()
+        self.skipped_rows = Counter()
+        self.skipped_bytes = Counter()
+        self.passed_units = 0
+        self.passed_rows = 0
+
+    def merge_counts(self, other: 'IdFilter') -> None:
+        """Add the counters of another filter (e.g. a copy used in a worker process)."""
+        self.skipped_units.update(other.skipped_units)
+        self.skipped_rows.update(other.skipped_rows)
+        self.skipped_bytes.update(other.skipped_bytes)
+        self.passed_units += other.passed_units
+        self.passed_rows += other.passed_rows
+
+    def cache_params(self) -> dict:
+        """Return a JSON-serializable description of the filter (for cache keys)."""
+        return {
+            'allow': None if self.allow is None else sorted(self.allow),
+            'deny': sorted(self.deny),
+            'deny_prefixes': list(self.deny_prefixes),
+        }
+
+    def reason(self, pid) -> Optional[str]:
+        """Return the name of the filter that skips the ID, or None if the ID passes."""
+        pid = str(pid)
+        if self.deny_prefixes and pid.startswith(self.deny_prefixes):
+            return 'deny_prefix'
+        if pid in self.deny:
+            return 'deny'
+        if self.allow is not None and pid not in self.allow:
+            return 'allow'
+        return None
+
+    def accepts(self, pid, n_rows: int = 0, n_bytes: int = 0) -> bool:
+        """
+        Check one unit (e.g. a patient archive) and count it if it is skipped.
+
+        Args:
+            pid: The patient ID.
+            n_rows (int): Rows in the unit, if known.
+            n_bytes (int): Size of the unit (e.g. compressed archive size), if known.
+
+        Returns:
+            bool: True if the patient passes the filter.
+        """
+        reason = self.reason(pid)
+        if reason is None:
+            self.passed_units += 1
+            return True
+        self.skipped_units[reason] += 1
+        self.skipped_rows[reason] += n_rows
+        self.skipped_bytes[reason] += n_bytes
+        return False
+
+    def mask(self, ids) -> np.ndarray:
+        """
+        Vectorized check of many rows; skipped rows are counted per filter.
+
+        Args:
+            ids (array-like): The patient ID of each row.
+
+        Returns:
+            np.ndarray: Boolean mask, True for rows that pass the filter.
+        """
+        ids = pd.Series(ids, dtype=object).astype(str)
+        keep = np.ones(len(ids), dtype=bool)
+        checks = [
+            ('deny_prefix', ids.str.startswith(self.deny_prefixes).to_numpy() if self.deny_prefixes else None),
+            ('deny', ids.isin(self.deny).to_numpy() if self.deny else None),
+            ('allow', ~ids.isin(self.allow).to_numpy() if self.allow is not None else None),
+        ]
+        for reason, skipped in checks:
+            if skipped is None:
+                continue
+            skipped = skipped & keep
+            self.skipped_rows[reason] += int(skipped.sum())
+            keep &= ~skipped
+        self.passed_rows += int(keep.sum())
+        return keep
+
+    def filter_frame(self, df: pd.DataFrame, id_column: str) -> pd.DataFrame:
+        """Return a copy of the rows of df whose id_column passes the filter."""
+        return df[self.mask(df[id_column].to_numpy())].copy()
+
+    def report(self) -> pd.DataFrame:
+        """
+        Return (and log) the skip counters per filter.
+
+        Returns:
+            pd.DataFrame: Index = filter name, columns = skipped units / rows / bytes.
+        """
+        df = pd.DataFrame({
+            'skipped_units': [self.skipped_units[name] for name in FILTER_NAMES],
+            'skipped_rows': [self.skipped_rows[name] for name in FILTER_NAMES],
+            'skipped_bytes': [self.skipped_bytes[name] for name in FILTER_NAMES],
+        }, index=FILTER_NAMES)
+        logging.info(f"ID filter: {self.passed_units} units / {self.passed_rows} rows passed\n{df}")
+        return df
@@ -0,0 +1,131 @@
+"""
+ingest_manifest.py
+
+This module provides IngestManifest, a JSON record of the raw-data units that have already been
+ingested (a patient's inner `_PassiveData.zip` in the PXPN archive, or a patient's rows of an input
+table, see shard_checkpoint.py), so that a rerun on a new data drop only processes new or changed
+patients.
+
+Each entry is keyed by "<source>::<member>" and stores:
+- pid: the patient ID
+- member: the archive member (or patient ID) the unit was read from
+- signature: what identifies the unit's content, e.g. {'crc': ..., 'size': ...} from the ZIP
+  directory, or {'sha256': ...} of the patient's table rows
+- output: the derived output partition (file path), or None if the unit produced no rows
+
+Functions:
+- row_signatures(df: pd.DataFrame, id_column: str) -> dict:
+    Hash the rows of every patient in a table.
+
+Classes:
+- IngestManifest: load/save the manifest and compare units against it.
+
+Logging is configured via the config module.
+"""
+import library.config as config
+import logging
+
+import hashlib
+import json
+import pandas as pd
+
+from pathlib import Path
+from typing import Optional, Union
+
+from library.path_utils import make_dir
+
+def row_signatures(df: pd.DataFrame, id_column: str) -> dict:
+    """
+    Hash the rows of every patient in a table.
+
+    The signature changes whenever a row of the patient is added, removed, reordered or edited.
+    Columns are hashed in their own dtype (no string copy of the table), so a value whose dtype
+    changes (e.g. 70 → 70.0) also changes the signature.
+
+    Args:
+        df (pd.DataFrame): The table (e.g. the long HR table).
+        id_column (str): The patient ID column.
+
+    Returns:
+        dict: {pid: {'rows': n_rows, 'sha256': hex digest}}
+    """
+    if df.empty:
+        return {}
+    row_hashes = pd.util.hash_pandas_object(df, index=False).to_numpy()
+    signatures = {}
+    for pid, idx in df.groupby(id_column, sort=False).indices.items():
+        signatures[str(pid)] = {
+            'rows': int(len(idx)),
+            'sha256': hashlib.sha256(row_hashes[idx].tobytes()).hexdigest(),
+        }
+    return signatures
+
+class IngestManifest:
+    """
+    Record of ingested units (patient archive members or table slices) and their output partitions.
+
+    Usage:
+        manifest = IngestManifest(path)
+        if not manifest.is_current(source, member, signature):
+            ... extract / compute, write the partition ...
+            manifest.record(source, member, pid, signature, output)
+        manifest.save()
+    """
+
+    def __init__(self, path: Union[str, Path]):
+        self.path = Path(path)
+        self.entries = {}
+        if self.path.exists():
+            with self.path.open('r', encoding='utf-8') as f:
+                self.entries = json.load(f)
+            logging.debug(f"Loaded ingest manifest {self.path} ({len(self.entries)} entries)")
+
+    @staticmethod
+    def _key(source: str, member: str) -> str:
+        return f"{source}::{member}"
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def get(self, source: str, member: str) -> Optional[dict]:
+        """Return the entry of a unit, or None if it has not been ingested."""
+        return self.entries.get(self._key(source, member))
+
+    def is_current(self, source: str, member: str, signature: dict) -> bool:
+        """
+        Return True if the unit was ingested with the same signature and its output still exists.
+        """
+        entry = self.get(source, member)
+        if entry is None or entry['signature'] != signature:
+            return False
+        return entry['output'] is None or Path(entry['output']).exists()
+
+    def record(self, source: str, member: str, pid: str, signature: dict, output: Optional[Union[str, Path]]) -> None:
+        """Record (or update) an ingested unit and its output partition."""
+        self.entries[self._key(source, member)] = {
+            'pid': pid,
+            'member': member,
+            'signature': signature,
+            'output': None if output is None else str(output),
+        }
+
+    def members(self, source: str) -> list:
+        """Return the members recorded for a source."""
+        prefix = f"{source}::"
+        return [entry['member'] for key, entry in self.entries.items() if key.startswith(prefix)]
+
+    def remove(self, source: str, member: str, delete_output: bool = True) -> None:
+        """Forget a unit (e.g. a patient that is no longer in the data drop) and delete its output."""
+        entry = self.entries.pop(self._key(source, member), None)
+        if entry is not None and delete_output and entry['output'] is not None:
+            Path(entry['output']).unlink(missing_ok=True)
+
+    def save(self) -> Path:
+        """Write the manifest atomically (temporary file, then rename)."""
+        make_dir(self.path.parent)
+        tmp_path = self.path.with_name(self.path.name + '.tmp')
+        with tmp_path.open('w', encoding='utf-8') as f:
+            json.dump(self.entries, f, ensure_ascii=False, indent=4)
+        tmp_path.replace(self.path)
+        logging.debug(f"Saved ingest manifest {self.path} ({len(self.entries)} entries)")
+        return self.path
@@ -0,0 +1,199 @@
+"""
+keyed_join.py
+
+This module joins many per-day feature tables (panic, sleep, step_delta, HR_date, bandpower, ...)
+onto a master (ID, date) calendar in one pass, for the stage-3 dataset merge.
+
+(ID, date) keys are encoded as integers: a patient code from one factorization of the ID
+columns of all tables, and an int32 day ordinal (days since 1970-01-01). Both are packed into one
+int64 key, so every table is matched against the calendar with a sort and two binary searches
+instead of a chain of pairwise pd.merge calls on string/datetime columns.
+
+align_to_master gives the same table as
+    reduce(lambda left, df: pd.merge(left, df, how='left', on=[id_col, date_col]), tables, master)
+including row multiplication for duplicate keys, NaN/NaT keys matching each other, dtype
+upcasting of unmatched rows and the '_x'/'_y' suffixes of clashing column names.
+
+Functions:
+- encode_keys(frames: list, id_col: str, date_col: str) -> tuple:
+    Shared patient codes and day ordinals of several tables.
+- master_calendar(tables: list, how: str, id_col: str, date_col: str) -> pd.DataFrame:
+    The (ID, date) calendar of a set of tables (observed days, or every day of each patient's range).
+- align_to_master(master: pd.DataFrame, tables: list, id_col: str, date_col: str) -> pd.DataFrame:
+    Left-join every table onto the master rows in one pass.
+
+Logging is configured via the config module.
+"""
+import library.config as config
+import logging
+
+import numpy as np
+import pandas as pd
+
+NS_PER_DAY = 86400 * 10**9
+# NaT의 날짜 번호 (실제 날짜와 겹치지 않음; pd.merge처럼 NaT 키끼리는 서로 매칭됨)
+NAT_DAY = np.iinfo(np.int32).min
+
+def _day_ordinals(dates) -> np.ndarray:
+    ns = pd.to_datetime(pd.Series(dates)).to_numpy(dtype='datetime64[ns]').astype(np.int64)
+    nat = ns == np.iinfo(np.int64).min
+    if (ns[~nat] % NS_PER_DAY).any():
+        raise ValueError("Dates must not have a time of day to be encoded as day ordinals")
+    days = np.where(nat, NAT_DAY, ns // NS_PER_DAY)
+    return days.astype(np.int32)
+
+def _pack(codes: np.ndarray, days: np.ndarray) -> np.ndarray:
+    # (ID 코드 + 1) × 2^32 + (날짜 번호 - int32 최솟값): 결측 ID(-1)와 NaT도 하나의 int64 키가 됨
+    return ((codes.astype(np.int64) + 1) << 32) + (days.astype(np.int64) - NAT_DAY)
+
+def encode_keys(frames: list, id_col: str = 'ID', date_col: str = 'date') -> tuple:
+    """
+    Encode the (ID, date) keys of several tables with shared integer codes.
+
+    Args:
+        frames (list): DataFrames with the ID and date columns (dates as datetime64 or parseable
+            values at midnight).
+        id_col (str): The patient ID column.
+        date_col (str): The date column.
+
+    Returns:
+        tuple: (codes, days, uniques) where codes and days are lists with one array per frame:
+            int32 patient codes into uniques (-1 for a missing ID) and int32 day ordinals
+            (NAT_DAY for NaT); uniques is the ndarray of IDs.
+
+    Raises:
+        ValueError: If a date has a time of day.
+    """
+    sizes = [len(df) for df in frames]
+    all_ids = np.concatenate([df[id_col].to_numpy(dtype=object) for df in frames]) if frames else np.array([], dtype=object)
+    all_codes, uniques = pd.factorize(all_ids)
+    splits = np.cumsum(sizes)[:-1]
+    codes = [c.astype(np.int32) for c in np.split(all_codes, splits)]
+    days = [_day_ordinals(df[date_col].to_numpy()) for df in frames]
+    return codes, days, uniques
+
+def master_calendar(tables: list, how: str = 'range', id_col: str = 'ID', date_col: str = 'date') -> pd.DataFrame:
+    """
+    Build the master (ID, date) calendar of a set of per-day tables.
+
+    Rows with a missing ID or date are ignored.
+
+    Args:
+        tables (list): DataFrames with the ID and date columns.
+        how (str): 'observed' for every (ID, date) that occurs in a table, or 'range' for every
+            day from the first to the last observed day of each patient.
+        id_col (str): The patient ID column.
+        date_col (str): The date column.
+
+    Returns:
+        pd.DataFrame: id_col and date_col (datetime64[ns]), one row per key, sorted by ID and date.
+
+    Raises:
+        ValueError: If how is not 'observed' or 'range', or a date has a time of day.
+    """
+    if how not in ('observed', 'range'):
+        raise ValueError(f"how must be 'observed' or 'range', got {how!r}")
+    codes, days, uniques = encode_keys(tables, id_col, date_col)
+    codes = np.concatenate(codes) if codes else np.array([], dtype=np.int32)
+    days = np.concatenate(days) if days else np.array([], dtype=np.int32)
+    valid = (codes >= 0) & (days != NAT_DAY)
+    codes, days = codes[valid], days[valid]
+
+    # ID 코드를 ID 값의 정렬 순서로 다시 매김 (groupby('ID')와 같은 순서)
+    rank = np.empty(len(uniques), dtype=np.int64)
+    rank[pd.Index(uniques).argsort()] = np.arange(len(uniques))
+    if how == 'observed':
+        keys = np.unique(_pack(rank[codes], days))
+        out_codes = (keys >> 32) - 1
+        out_days = (keys & 0xFFFFFFFF) + NAT_DAY
+    else:
+        n_ids = len(uniques)
+        first = np.full(n_ids, np.iinfo(np.int64).max)
+        last = np.full(n_ids, np.iinfo(np.int64).min)
+        np.minimum.at(first, rank[codes], days)
+        np.maximum.at(last, rank[codes], days)
+        present = np.flatnonzero(first <= last)
+        lengths = (last[present] - first[present] + 1).astype(np.int64)
+        out_codes = np.repeat(present, lengths)
+        starts = np.repeat(np.cumsum(lengths) - lengths, lengths)
+        out_days = np.repeat(first[present], lengths) + (np.arange(lengths.sum()) - starts)
+
+    order = np.empty(len(uniques), dtype=np.int64)
+    order[rank] = np.arange(len(uniques))
+    out = pd.DataFrame({
+        id_col: uniques[order[out_codes]] if len(out_codes) else np.array([], dtype=object),
+        date_col: (out_days.astype(np.int64) * NS_PER_DAY).astype('datetime64[ns]'),
+    })
+    logging.debug(f"Master calendar ({how}): {out[id_col].nunique()} patients, {len(out)} days")
+    return out
+
+def _merged_names(left: list, right: list, keys: list) -> tuple:
+    # pd.merge의 기본 suffixes=('_x', '_y')와 같은 이름 규칙
+    overlap = set(left) & set(right) - set(keys)
+    left = [f"{c}_x" if c in overlap else c for c in left]
+    right = [f"{c}_y" if c in overlap else c for c in right if c not in keys]
+    return left, right
+
+def align_to_master(master: pd.DataFrame, tables: list, id_col: str = 'ID', date_col: str = 'date') -> pd.DataFrame:
+    """
+    Left-join every table onto the master rows on (ID, date) in one pass.
+
+    The result equals chaining pd.merge(left, table, how='left', on=[id_col, date_col]) over
+    the tables: the master rows (and columns) come first in their order, each master row is
+    repeated for every combination of duplicate matches (earlier tables vary slowest), and the
+    columns of unmatched rows are NaN.
+
+    Args:
+        master (pd.DataFrame): The master rows, e.g. master_calendar() with demographic columns;
+            may have extra columns and NaT dates.
+        tables (list): DataFrames with the ID and date columns and their feature columns.
+        id_col (str): The patient ID column.
+        date_col (str): The date column.
+
+    Returns:
+        pd.DataFrame: master columns followed by the feature columns of every table, with a fresh RangeIndex.
+
+    Raises:
+        ValueError: If a date has a time of day.
+    """
+    keys = [id_col, date_col]
+    codes, days, _ = encode_keys([master] + list(tables), id_col, date_col)
+    master_key = _pack(codes[0], days[0])
+    n_master = len(master)
+
+    # 테이블마다 정렬된 키에서 마스터 키의 일치 구간 [lo, hi)를 찾음
+    matches = []
+    multiplicity = np.ones(n_master, dtype=np.int64)
+    for table, c, d in zip(tables, codes[1:], days[1:]):
+        table_key = _pack(c, d)
+        order = np.argsort(table_key, kind='stable')
+        sorted_key = table_key[order]
+        lo = np.searchsorted(sorted_key, master_key, side='left')
+        count = np.searchsorted(sorted_key, master_key, side='right') - lo
+        matches.append((order, lo, count))
+        multiplicity *= np.maximum(count, 1)
+
+    # 중복 키가 있으면 마스터 행을 일치 조합 수만큼 반복 (혼합 기수로 조합 번호를 분해)
+    rows = np.repeat(np.arange(n_master), multiplicity)
+    offset = np.arange(len(rows)) - np.repeat(np.cumsum(multiplicity) - multiplicity, multiplicity)
+    indexers = [None] * len(tables)
+    for i in range(len(tables) - 1, -1, -1):
+        order, lo, count = matches[i]
+        n = np.maximum(count, 1)[rows]
+        k = offset % n
+        offset = offset // n
+        indexers[i] = np.where(count[rows] > 0, order[np.minimum(lo[rows] + k, len(order) - 1)], -1) \
+            if len(order) else np.full(len(rows), -1)
+
+    # 이름 충돌은 지금까지 합쳐진 모든 컬럼을 기준으로 처리 (연속된 pd.merge와 같은 결과)
+    columns = list(master.columns)
+    frames = [master.reset_index(drop=True).take(rows)]
+    for table, indexer in zip(tables, indexers):
+        value_cols = [c for c in table.columns if c not in keys]
+        columns, names = _merged_names(columns, list(table.columns), keys)
+        columns = columns + names
+        frames.append(table[value_cols].reset_index(drop=True).reindex(indexer))
+    frames = [frame.set_axis(range(len(rows)), axis=0) for frame in frames]
+    out = pd.concat(frames, axis=1).set_axis(columns, axis=1)
+    logging.debug(f"Aligned {len(tables)} tables to {n_master} master rows ({len(out)} rows)")
+    return out
@@ -0,0 +1,370 @@
+"""
+minute_features.py
+
+This module provides vectorized kernels that work on a whole cohort of minute-level signals at
+once, stored as a (n_days, n_minutes) matrix (one row per patient-day, see long_to_day_matrix),
+instead of looping over every ID and date with pandas.
+
+The day matrix is built in memory once per run (hr_feature_table reads HR.csv once per cohort
+and derives every HR feature from it); it is deliberately not kept on disk as a fixed
+(n_days, 1440) float32 minute grid. The stage-2 features are defined on the rows of every
+(ID, date) group in file order, and such a grid cannot hold them exactly: PXPN days are not on a
+full minute grid, duplicated SYM days stack to more than 1440 rows, and float32 rounds decimal
+readings.
+
+Functions:
+- long_to_day_matrix(df: pd.DataFrame, value_col: str, keys: list, sort: bool) -> tuple:
+    Stack the rows of every (ID, date) group of a long table into a NaN-padded matrix,
+    keeping the original row order inside each group.
+- interpolate_days(values: np.ndarray, min_count: int, limit: int, x_step: float, counts: np.ndarray)
+    -> tuple[np.ndarray, np.ndarray]:
+    Linear interpolation (with edge clamping) of every qualifying day, matching
+    pandas' interpolate(method='values' / 'time', limit_direction='both').
+- fill_days(values: np.ndarray) -> np.ndarray:
+    Forward- then backward-fill the NaNs of every row (like fillna('ffill') then fillna('backfill')).
+- day_hour_stats(values: np.ndarray, hvar_values: np.ndarray) -> dict:
+    NaN-aware daily statistics and the mean of the hourly variances of a (n_days, 24, k) array.
+- daily_stats(df: pd.DataFrame, value_col: str, prefix: str, keys: list, time_col: str,
+              zero_as_missing: bool, hvar_zero_as_missing: bool, max_block_bytes: int) -> pd.DataFrame:
+    All daily statistics of a long signal table in one frame (one row per ID and date).
+- fit_cosinor_days(values: np.ndarray, period: float) -> dict:
+    Single-component cosinor fit (MESOR, amplitude, acrophase) of every row by least squares.
+- acrophase_to_hours(acrophase: np.ndarray, period: float) -> np.ndarray:
+    Vectorized CosinorPy.cosinor.acrophase_to_hours.
+
+Logging is configured via the config module.
+"""
+import library.config as config
+import logging
+
+import numpy as np
+import pandas as pd
+
+from typing import Optional
+
+HOURS_PER_DAY = 24
+MINUTES_PER_HOUR = 60
+DAILY_STATS = ['count', 'sum', 'mean', 'var', 'min', 'max', 'hvar_mean']
+
+def long_to_day_matrix(df: pd.DataFrame, value_col: str, keys: list = ['ID', 'date'],
+                       sort: bool = False) -> tuple:
+    """
+    Stack the rows of every group of a long table into a NaN-padded (n_groups, width) matrix.
+
+    Unlike a pivot on a time column, the rows of a group are kept in their original order, so
+    groups with missing or duplicated minutes are represented exactly as a per-group loop sees them.
+
+    Args:
+        df (pd.DataFrame): Long table (one row per minute).
+        value_col (str): The column holding the values (converted to float64).
+        keys (list): Group columns (default: ['ID', 'date']).
+        sort (bool): Order groups by key (True) or by first appearance (False, like `unique()`).
+
+    Returns:
+        tuple: (values (n_groups, width) float64, lengths (n_groups,) int64,
+                group_keys pd.DataFrame, codes (n_rows,) int64, positions (n_rows,) int64)
+            where values[codes[i], positions[i]] is the value of row i of df.
+    """
+    codes, uniques = pd.MultiIndex.from_frame(df[keys]).factorize(sort=sort)
+    codes = np.asarray(codes, dtype=np.int64)
+    n_groups = len(uniques)
+    lengths = np.bincount(codes, minlength=n_groups)
+    positions = pd.Series(codes).groupby(codes).cumcount().to_numpy()
+
+    width = int(lengths.max()) if n_groups else 0
+    values = np.full((n_groups, width), np.nan, dtype=np.float64)
+    values[codes, positions] = pd.to_numeric(df[value_col], errors='coerce').to_numpy(dtype=np.float64)
+    group_keys = uniques.to_frame(index=False, name=list(keys))
+    return values, lengths, group_keys, codes, positions
+
+def interpolate_days(values: np.ndarray, min_count: Optional[int] = None, limit: Optional[int] = None,
+                     x_step: float = 1.0, counts: Optional[np.ndarray] = None) -> tuple:
+    """
+    Linearly interpolate the NaNs of every qualifying row of a (n_days, n_minutes) matrix.
+
+    For each row this matches pandas' `interpolate(method='values' | 'time', limit=limit,
+    limit_direction='both')` on a series indexed by position * x_step:
+    - interior gaps are filled linearly between the surrounding valid values,
+    - leading/trailing gaps are filled with the first/last valid value,
+    - with `limit`, a NaN stays NaN if every value within `limit` steps on both sides
+      (clipped to the row) is NaN.
+    The arithmetic follows np.interp (slope * (x - x_prev) + y_prev in float64), so results are
+    bitwise identical to the per-day pandas loop.
+
+    Args:
+        values (np.ndarray): (n_days, n_minutes) matrix, NaN for missing minutes.
+        min_count (int, optional): Only rows with more than `min_count` valid values qualify.
+        limit (int, optional): Maximum number of consecutive NaNs to fill from either side.
+        x_step (float): Spacing of the x coordinates (1.0 for 'values' on a RangeIndex,
+            60e9 for 'time' on a 1-minute DatetimeIndex).
+        counts (np.ndarray, optional): Per-row counts used for the min_count check
+            (default: the number of valid values in the row).
+
+    Returns:
+        tuple: (interpolated float64 matrix (rows that do not qualify are left unchanged),
+                qualified (n_days,) bool mask)
+    """
+    values = np.asarray(values, dtype=np.float64)
+    n_rows, n_cols = values.shape
+    valid = ~np.isnan(values)
+    if counts is None:
+        counts = valid.sum(axis=1)
+    qualified = np.ones(n_rows, dtype=bool) if min_count is None else np.asarray(counts) > min_count
+    qualified &= valid.any(axis=1)
+
+    out = values.copy()
+    rows = np.flatnonzero(qualified)
+    if len(rows) == 0 or n_cols == 0:
+        return out, qualified
+
+    v = values[rows]
+    ok = valid[rows]
+    idx = np.arange(n_cols)
+    # 각 위치의 이전/다음 유효 위치 (없으면 -1 / n_cols)
+    prev = np.maximum.accumulate(np.where(ok, idx, -1), axis=1)
+    nxt = np.minimum.accumulate(np.where(ok, idx, n_cols)[:, ::-1], axis=1)[:, ::-1]
+
+    has_prev = prev >= 0
+    has_next = nxt < n_cols
+    y0 = np.take_along_axis(v, np.where(has_prev, prev, 0), axis=1)
+    y1 = np.take_along_axis(v, np.where(has_next, nxt, 0), axis=1)
+    x = idx * x_step
+    x0 = np.where(has_prev, prev, 0) * x_step
+    x1 = np.where(has_next, nxt, 0) * x_step
+
+    interior = has_prev & has_next & ~ok
+    with np.errstate(invalid='ignore', divide='ignore'):
+        slope = (y1 - y0) / (x1 - x0)
+        filled = np.where(interior, slope * (x - x0) + y0, v)
+    filled = np.where(~has_prev, y1, filled)   # 앞쪽 결측: 첫 유효값
+    filled = np.where(~has_next, y0, filled)   # 뒤쪽 결측: 마지막 유효값
+    filled[ok] = v[ok]
+
+    if limit is not None:
+        # pandas와 같이 [x - limit, x + limit] 구간(배열 범위로 잘림)이 모두 결측이면 그대로 둠
+        too_far = ((prev < np.maximum(idx - limit, 0)) & (nxt > np.minimum(idx + limit, n_cols - 1))) & ~ok
+        filled[too_far] = np.nan
+
+    out[rows] = filled
+    logging.debug(f"Interpolated {len(rows)} of {n_rows} days")
+    return out, qualified
+
+def fill_days(values: np.ndarray) -> np.ndarray:
+    """
+    Forward-fill, then backward-fill the NaNs of every row of a (n_days, n_minutes) matrix.
+
+    Args:
+        values (np.ndarray): (n_days, n_minutes) matrix, NaN for missing minutes.
+
+    Returns:
+        np.ndarray: Filled float64 copy (rows without any valid value stay NaN).
+    """
+    values = np.asarray(values, dtype=np.float64)
+    n_cols = values.shape[1]
+    ok = ~np.isnan(values)
+    idx = np.arange(n_cols)
+    prev = np.maximum.accumulate(np.where(ok, idx, -1), axis=1)
+    first = np.where(ok.any(axis=1), ok.argmax(axis=1), 0)
+    src = np.where(prev >= 0, prev, first[:, None])
+    return np.take_along_axis(values, src, axis=1)
+
+def _nan_moments(values: np.ndarray, axis) -> tuple:
+    """Count, sum, mean and sample variance (ddof=1, NaN below 2 values) over `axis`, ignoring NaNs."""
+    valid = ~np.isnan(values)
+    count = valid.sum(axis=axis)
+    total = np.where(valid, values, 0.0).sum(axis=axis)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = total / count
+        dev = np.where(valid, values - np.expand_dims(mean, axis), 0.0)
+        var = (dev * dev).sum(axis=axis) / (count - 1)
+    var[count < 2] = np.nan
+    return count, total, mean, var
+
+def day_hour_stats(values: np.ndarray, hvar_values: Optional[np.ndarray] = None) -> dict:
+    """
+    NaN-aware daily statistics of a (n_days, 24, k) array (e.g. a minute matrix reshaped to (n_days, 24, 60)).
+
+    Args:
+        values (np.ndarray): (n_days, 24, k) values, NaN for missing values.
+        hvar_values (np.ndarray, optional): Values used for the hourly variances if they differ from
+            `values` (e.g. HR including zeros). Same shape as `values`.
+
+    Returns:
+        dict: One (n_days,) array per name in DAILY_STATS:
+            count / sum / mean / var (ddof=1, NaN below 2 values) / min / max of the day, and
+            hvar_mean, the mean of the hourly variances (hours with fewer than 2 values are skipped).
+    """
+    values = np.asarray(values, dtype=np.float64)
+    n_days = values.shape[0]
+    flat = values.reshape(n_days, -1)
+    count, total, mean, var = _nan_moments(flat, axis=1)
+
+    valid = ~np.isnan(flat)
+    vmin = np.where(valid, flat, np.inf).min(axis=1, initial=np.inf)
+    vmax = np.where(valid, flat, -np.inf).max(axis=1, initial=-np.inf)
+    vmin[count == 0] = np.nan
+    vmax[count == 0] = np.nan
+
+    hourly = values if hvar_values is None else np.asarray(hvar_values, dtype=np.float64)
+    _, _, _, hvar = _nan_moments(hourly, axis=2)
+    n_hours, hvar_sum, _, _ = _nan_moments(hvar, axis=1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        hvar_mean = hvar_sum / n_hours
+
+    return {'count': count, 'sum': total, 'mean': mean, 'var': var,
+            'min': vmin, 'max': vmax, 'hvar_mean': hvar_mean}
+
+def _hour_of_day(times: pd.Series) -> np.ndarray:
+    # 고유한 시각 문자열만 파싱 (pd.to_datetime(time).dt.hour와 같음)
+    codes, uniques = pd.factorize(times)
+    hours = pd.to_datetime(pd.Series(uniques), format='mixed').dt.hour.to_numpy()
+    return hours[codes]
+
+def daily_stats(df: pd.DataFrame, value_col: str, prefix: Optional[str] = None, keys: list = ['ID', 'date'],
+                time_col: str = 'time', zero_as_missing: bool = True, hvar_zero_as_missing: Optional[bool] = None,
+                max_block_bytes: int = 256 * 2**20) -> pd.DataFrame:
+    """
+    Compute all daily statistics of a long signal table (one row per sample) in one frame.
+
+    The rows of every day are laid out as a NaN-padded (n_days, 24, k) array (k = most samples in
+    one hour, 60 for minute data) and reduced with day_hour_stats, which replaces the separate
+    groupby(['ID','date']) mean/var/min/max/sum calls, the groupby(['ID','date','hour']) variance
+    and the merges between them. Days are processed in blocks of at most `max_block_bytes`.
+
+    Args:
+        df (pd.DataFrame): Long table with the key columns, `time_col` and `value_col`.
+        value_col (str): The signal column (e.g. 'HR', 'step').
+        prefix (str, optional): Prefix of the output columns (default: value_col).
+        keys (list): Day key columns (default: ['ID', 'date']).
+        time_col (str): Time-of-day column used for the hour (parsed like pd.to_datetime(time).dt.hour).
+        zero_as_missing (bool): Ignore zeros in the daily statistics (like HR[HR.HR != 0]).
+        hvar_zero_as_missing (bool, optional): Ignore zeros in the hourly variances
+            (default: same as zero_as_missing).
+        max_block_bytes (int): Memory budget of one block of days.
+
+    Returns:
+        pd.DataFrame: Key columns and f"{prefix}_{stat}" for every stat in DAILY_STATS,
+            one row per day with at least one row in df, sorted by the keys.
+            All statistics except count ignore NaNs (and zeros if requested); sum is 0 for days
+            without valid values, the others are NaN.
+    """
+    prefix = value_col if prefix is None else prefix
+    if hvar_zero_as_missing is None:
+        hvar_zero_as_missing = zero_as_missing
+
+    codes, uniques = pd.MultiIndex.from_frame(df[keys]).factorize(sort=True)
+    rows = np.flatnonzero(codes >= 0)
+    codes = np.asarray(codes, dtype=np.int64)[rows]
+    values = pd.to_numeric(df[value_col]).to_numpy(dtype=np.float64)[rows]
+    hours = _hour_of_day(df[time_col].iloc[rows])
+    n_days = len(uniques)
+
+    # (날짜, 시) 칸 안에서의 위치 → (n_days, 24, width) 배열의 인덱스
+    cells = codes * HOURS_PER_DAY + hours
+    order = np.argsort(cells, kind='stable')
+    cells, values = cells[order], values[order]
+    cell_counts = np.bincount(cells, minlength=n_days * HOURS_PER_DAY)
+    starts = np.concatenate([[0], np.cumsum(cell_counts)[:-1]])
+    positions = np.arange(len(cells)) - starts[cells]
+    width = max(int(cell_counts.max()) if len(cells) else 0, 1)
+
+    day_values = np.where(values == 0, np.nan, values) if zero_as_missing else values
+    hour_values = np.where(values == 0, np.nan, values) if hvar_zero_as_missing else values
+    same = zero_as_missing == hvar_zero_as_missing
+
+    stats = {name: np.empty(n_days) for name in DAILY_STATS}
+    day_starts = starts[::HOURS_PER_DAY]
+    block_days = max(1, max_block_bytes // (HOURS_PER_DAY * width * 8 * (1 if same else 2)))
+    for d0 in range(0, n_days, block_days):
+        d1 = min(d0 + block_days, n_days)
+        lo = day_starts[d0]
+        hi = day_starts[d1] if d1 < n_days else len(cells)
+        idx = (cells[lo:hi] - d0 * HOURS_PER_DAY, positions[lo:hi])
+        block = np.full(((d1 - d0) * HOURS_PER_DAY, width), np.nan)
+        block[idx] = day_values[lo:hi]
+        block = block.reshape(d1 - d0, HOURS_PER_DAY, width)
+        hblock = None
+        if not same:
+            hblock = np.full(((d1 - d0) * HOURS_PER_DAY, width), np.nan)
+            hblock[idx] = hour_values[lo:hi]
+            hblock = hblock.reshape(d1 - d0, HOURS_PER_DAY, width)
+        for name, arr in day_hour_stats(block, hblock).items():
+            stats[name][d0:d1] = arr
+    logging.debug(f"Computed daily statistics of {n_days} days ({len(cells)} rows, width {width})")
+
+    out = uniques.to_frame(index=False, name=list(keys))
+    for name in DAILY_STATS:
+        out[f"{prefix}_{name}"] = stats[name].astype(np.int64) if name == 'count' else stats[name]
+    return out
+
+def fit_cosinor_days(values: np.ndarray, period: float = 1440) -> dict:
+    """
+    Fit y = MESOR + beta * cos(2 pi x / period) + gamma * sin(2 pi x / period) to every row at once.
+
+    x is the position in the row (0, 1, ..., like the 'index' column of a day) and NaNs are left out of
+    the fit, as statsmodels does in CosinorPy.cosinor1.fit_cosinor. All rows share one cos/sin design;
+    the 3x3 normal equations of every row are built with two matrix products and solved together.
+    Amplitude and acrophase follow CosinorPy's corrected definition (acrophase in radians, projected
+    to [-pi, pi]).
+
+    Args:
+        values (np.ndarray): (n_days, n_minutes) matrix, NaN for missing minutes (or padding).
+        period (float): Period in samples (default: 1440 minutes).
+
+    Returns:
+        dict: (n_days,) arrays 'mesor', 'amplitude', 'acrophase' (NaN for rows with fewer than
+            3 valid values or a singular design).
+    """
+    values = np.asarray(values, dtype=np.float64)
+    n_rows, n_cols = values.shape
+    mask = ~np.isnan(values)
+    w = mask.astype(np.float64)
+    y = np.where(mask, values, 0.0)
+
+    x = np.arange(n_cols) * (2 * np.pi / period)
+    rrr, sss = np.cos(x), np.sin(x)
+    basis = np.stack([np.ones(n_cols), rrr, sss], axis=1)                      # (n_cols, 3)
+    products = np.stack([np.ones(n_cols), rrr, sss, rrr * rrr, rrr * sss, sss * sss], axis=1)
+
+    m = w @ products                                                            # (n_rows, 6)
+    xtx = m[:, [[0, 1, 2], [1, 3, 4], [2, 4, 5]]]                               # (n_rows, 3, 3)
+    xty = y @ basis                                                             # (n_rows, 3)
+
+    ok = mask.sum(axis=1) >= 3
+    ok[ok] = np.abs(np.linalg.det(xtx[ok])) > 1e-12 * np.maximum(m[ok, 0], 1) ** 3
+    params = np.full((n_rows, 3), np.nan)
+    if ok.any():
+        params[ok] = np.linalg.solve(xtx[ok], xty[ok][:, :, None])[:, :, 0]
+
+    mesor, beta_r, beta_s = params[:, 0], params[:, 1], params[:, 2]
+    amplitude = np.sqrt(beta_s ** 2 + beta_r ** 2)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        t = np.arctan(np.abs(beta_s / beta_r))
+    # CosinorPy.cosinor1.amp_acr (corrected)의 사분면 규칙
+    acrophase = np.select(
+        [(beta_r > 0) & (beta_s > 0), (beta_r > 0) & (beta_s < 0), (beta_r < 0) & (beta_s > 0)],
+        [-t, -2 * np.pi + t, -np.pi + t],
+        default=-np.pi - t)
+    acrophase = _project_acr(acrophase)
+    acrophase[~ok] = np.nan
+    logging.debug(f"Fitted cosinor to {int(ok.sum())} of {n_rows} days")
+    return {'mesor': mesor, 'amplitude': amplitude, 'acrophase': acrophase}
+
+def _project_acr(acr: np.ndarray) -> np.ndarray:
+    # CosinorPy.cosinor.project_acr
+    acr = np.mod(acr, 2 * np.pi)
+    return np.where(acr > np.pi, acr - 2 * np.pi, np.where(acr < -np.pi, acr + 2 * np.pi, acr))
+
+def acrophase_to_hours(acrophase: np.ndarray, period: float = 24) -> np.ndarray:
+    """
+    Convert acrophases (radians) to time of the period, like CosinorPy.cosinor.acrophase_to_hours.
+
+    Args:
+        acrophase (np.ndarray): Acrophases in radians.
+        period (float): Length of the period in the output unit (default: 24 hours).
+
+    Returns:
+        np.ndarray: Values in [0, period).
+    """
+    hours = -period * _project_acr(np.asarray(acrophase, dtype=np.float64)) / (2 * np.pi)
+    return np.where(hours < 0, hours + period, hours)
@@ -11,8 +11,8 @@ Functions:
 - create_empty_df(columns: list[str] = None) -> pd.DataFrame:
     Creates an empty DataFrame with the specified columns.
 
-- read_csv(file_path: Path) -> pd.DataFrame:
-    Reads a CSV file from the given file path.
+- read_csv(file_path: Path, columns: list[str] = None, ids: list = None, id_col: str = 'ID') -> pd.DataFrame:
+    Reads a CSV file (or only the given columns and patients of it) from the given file path.
 
 - add_row(df: pd.DataFrame, row: dict) -> None:
     Adds a row to the DataFrame in place.
@@ -70,14 +70,26 @@ def create_empty_df(columns: list[str] = None) -> pd.DataFrame:
     
     return pd.DataFrame(columns=columns)
 
-def read_csv(file_path: Path) -> pd.DataFrame:
+def read_csv(file_path: Path, columns: list[str] = None, ids: list = None, id_col: str = 'ID') -> pd.DataFrame:
     """
     Reads a CSV file from the given file path.
 
+    When columns or ids are given and the partitioned Parquet dataset of the file
+    (<name>.parquet/, see library.partitioned_store) was built from the current CSV,
+    only those columns and patients are read from the dataset. Otherwise the CSV is
+    read with only the given columns and filtered to the given patients. Both paths
+    return the same values and dtypes.
+
     Parameters
     ----------
     file_path : Path
         The path to the CSV file.
+    columns : list of str, optional
+        Columns to read, in this order. If not provided, all columns are read.
+    ids : list, optional
+        Patient IDs to read. If not provided, all rows are read.
+    id_col : str, optional
+        The patient ID column used with ids (default 'ID').
 
     Returns
     -------
@@ -87,14 +99,27 @@ def read_csv(file_path: Path) -> pd.DataFrame:
     Raises
     ------
     FileNotFoundError
-        If the file does not exist at the given path.
+        If neither the file nor its partitioned dataset exists at the given path.
     ValueError
         If the file is empty, corrupt, or cannot be parsed.
     """
+    file_path = Path(file_path)
+    if columns is not None or ids is not None:
+        from library.partitioned_store import is_current, read_partitioned
+
+        if is_current(file_path):
+            logging.debug(f"Reading {file_path} from its partitioned dataset")
+            return read_partitioned(file_path, columns=columns, ids=ids, id_col=id_col)
     if not file_path.exists():
         raise FileNotFoundError(f"File {file_path} not found.")
     try:
-        return pd.read_csv(file_path)
+        if columns is None and ids is None:
+            return pd.read_csv(file_path)
+        usecols = None if columns is None else list(dict.fromkeys(list(columns) + ([id_col] if ids is not None else [])))
+        df = pd.read_csv(file_path, usecols=usecols)
+        if ids is not None:
+            df = df[df[id_col].isin(ids)].reset_index(drop=True)
+        return df if columns is None else df[list(columns)]
     except pd.errors.EmptyDataError:
         raise ValueError(f"The file {file_path} is empty or corrupt.")
     except pd.errors.ParserError as e:
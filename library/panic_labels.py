@@ -0,0 +1,78 @@
+"""
+panic_labels.py
+
+This module derives the sequential, per-patient panic labels of the stage-3 dataset with grouped
+shifts instead of Python loops over rows.
+
+The daily panic column is 2 on a panic day, 0 on a day without panic and NaN on a day without a
+record. The day before a run of panic days gets the label 1 (pre-panic) if it has no record.
+
+Functions:
+- fill_pre_event_days(df: pd.DataFrame, label_col: str, id_col: str, event: int, fill: int) -> pd.Series:
+    Label the unrecorded day before every run of event days.
+- pre_event_skip_counts(df: pd.DataFrame, label_col: str, id_col: str, event: int) -> dict:
+    Count the event days whose previous day could not be labeled, by reason.
+
+Logging is configured via the config module.
+"""
+import library.config as config
+import logging
+
+import pandas as pd
+
+def _previous_and_next(df: pd.DataFrame, label_col: str, id_col: str) -> tuple:
+    # Rows with a missing ID get no neighbours (NaN != NaN in the per-row loops as well)
+    grouped = df.groupby(id_col, sort=False)[label_col]
+    return grouped.shift(1), grouped.shift(-1), grouped.cumcount() == 0
+
+def fill_pre_event_days(df: pd.DataFrame, label_col: str = 'panic', id_col: str = 'ID',
+                        event: int = 2, fill: int = 1) -> pd.Series:
+    """
+    Label the unrecorded day before every run of event days.
+
+    Same result as walking back from every event row over the preceding event rows of the same
+    patient and setting the first non-event row to `fill` if it is NaN. Rows must be sorted by
+    patient and date (the rows of a patient contiguous); rows with a missing ID are never filled.
+
+    Args:
+        df (pd.DataFrame): The daily table, sorted by ID and date.
+        label_col (str): The label column (event, other values or NaN).
+        id_col (str): The patient ID column.
+        event (int): The event label (panic == 2).
+        fill (int): The label of the day before a run of events (1).
+
+    Returns:
+        pd.Series: The label column with the filled days (same index as df).
+    """
+    labels = df[label_col]
+    _, following, _ = _previous_and_next(df, label_col, id_col)
+    before_run = labels.isna() & following.eq(event)
+    logging.debug(f"Labeled {int(before_run.sum())} days before {label_col} == {event} with {fill}")
+    return labels.mask(before_run, fill)
+
+def pre_event_skip_counts(df: pd.DataFrame, label_col: str = 'panic', id_col: str = 'ID', event: int = 2) -> dict:
+    """
+    Count the event days whose previous day was not labeled by fill_pre_event_days, by reason.
+
+    Rows must be sorted by patient and date (the rows of a patient contiguous); rows with a
+    missing ID are not counted.
+
+    Args:
+        df (pd.DataFrame): The daily table, sorted by ID and date.
+        label_col (str): The label column.
+        id_col (str): The patient ID column.
+        event (int): The event label (panic == 2).
+
+    Returns:
+        dict: 'consecutive' (the previous day is also an event), 'first_date' (the event is on
+            the first day of the patient) and 'non_nan_prev' (the previous day already has another
+            label).
+    """
+    previous, _, first = _previous_and_next(df, label_col, id_col)
+    is_event = df[label_col].eq(event) & df[id_col].notna()
+    later = is_event & ~first
+    return {
+        'consecutive': int((later & previous.eq(event)).sum()),
+        'first_date': int((is_event & first).sum()),
+        'non_nan_prev': int((later & ~previous.eq(event) & previous.notna()).sum()),
+    }
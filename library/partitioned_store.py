@@ -0,0 +1,265 @@
+"""
+partitioned_store.py
+
+This module stores intermediate tables (HR, step_delta, panic_pre_data, full_panic, base_*, ...)
+as Parquet datasets partitioned by cohort and hashed patient bucket, next to the CSV of the same
+name, so that a reader can load only the columns and patients it needs.
+
+The dataset is built from the CSV itself (read chunk by chunk with the dtypes pandas infers for
+the whole file), so reading a column from the dataset gives the same values and dtypes as
+pd.read_csv of the CSV. The layout records the size and modification time of the CSV it was built
+from; a dataset whose CSV has been rewritten since is stale and readers use the CSV.
+
+Layout of <name>.parquet/ (written next to <name>.csv):
+    cohort=SYM/bucket=3/part-0.parquet     one directory per cohort (SYM, PXPN, other) and bucket
+    _layout.json                           id column, number of buckets, column order, source CSV
+
+The cohort is taken from the patient ID (SYM1-1-343 → SYM, PXPN_10001 → PXPN); the partition key
+is called `cohort` because `dataset` is already a data column (SYM1/SYM2/PXPN) of the
+preprocessed tables. The bucket is crc32(ID) % n_buckets, so every patient lives in exactly one
+directory and a read for a few patients only opens their buckets. Row order is kept through a
+hidden row number column.
+
+Functions:
+- cohort_of(ids) -> np.ndarray:
+    The cohort (SYM, PXPN or other) of every patient ID.
+- patient_bucket(ids, n_buckets: int) -> np.ndarray:
+    The hashed bucket of every patient ID.
+- dataset_path(file_path: str | Path) -> Path:
+    The dataset directory that belongs to a CSV path.
+- write_partitioned(csv_path: str | Path, id_col: str, n_buckets: int, chunksize: int) -> Path | None:
+    Write a CSV as a cohort/bucket partitioned Parquet dataset next to it.
+- is_current(file_path: str | Path) -> bool:
+    Whether the dataset of a CSV exists and was built from the current CSV.
+- read_partitioned(path: str | Path, columns: list, ids: list, cohorts: list, filters, id_col: str)
+    -> pd.DataFrame:
+    Read selected columns, patients, cohorts and rows of a partitioned dataset.
+
+Logging is configured via the config module.
+"""
+import library.config as config
+import logging
+
+import json
+import shutil
+import zlib
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+
+from pathlib import Path
+from typing import Optional, Union
+
+from library.cohort_merge import DEFAULT_CHUNKSIZE, infer_csv_dtypes
+
+DEFAULT_BUCKETS = 16
+COHORTS = ('SYM', 'PXPN')
+LAYOUT_FILE = '_layout.json'
+ROW_COLUMN = '__row'
+PARTITION_SCHEMA = pa.schema([('cohort', pa.string()), ('bucket', pa.int32())])
+FILTER_OPS = {
+    '==': lambda f, v: f == v, '!=': lambda f, v: f != v,
+    '<': lambda f, v: f < v, '<=': lambda f, v: f <= v,
+    '>': lambda f, v: f > v, '>=': lambda f, v: f >= v,
+    'in': lambda f, v: f.isin(list(v)), 'not in': lambda f, v: ~f.isin(list(v)),
+}
+
+def cohort_of(ids) -> np.ndarray:
+    """
+    Return the cohort of every patient ID ('SYM', 'PXPN', or 'other' for anything else).
+
+    Args:
+        ids (array-like): Patient IDs.
+
+    Returns:
+        np.ndarray: Cohort names (object array).
+    """
+    ids = pd.Series(np.asarray(ids, dtype=object)).astype(str)
+    out = np.full(len(ids), 'other', dtype=object)
+    for cohort in COHORTS:
+        out[ids.str.startswith(cohort).to_numpy()] = cohort
+    return out
+
+def patient_bucket(ids, n_buckets: int = DEFAULT_BUCKETS) -> np.ndarray:
+    """
+    Return the bucket (crc32 of the ID text modulo n_buckets) of every patient ID.
+
+    crc32 is used instead of hash() so that buckets are the same in every process and session.
+
+    Args:
+        ids (array-like): Patient IDs.
+        n_buckets (int): Number of buckets.
+
+    Returns:
+        np.ndarray: int32 bucket numbers.
+    """
+    codes, uniques = pd.factorize(pd.Series(np.asarray(ids, dtype=object)).astype(str))
+    buckets = np.array([zlib.crc32(u.encode('utf-8')) % n_buckets for u in uniques], dtype=np.int32)
+    return buckets[codes] if len(codes) else np.array([], dtype=np.int32)
+
+def dataset_path(file_path: Union[str, Path]) -> Path:
+    """Return the dataset directory of a CSV path (HR.csv → HR.parquet)."""
+    return Path(file_path).with_suffix('.parquet')
+
+def _csv_source(csv_path: Path) -> dict:
+    stat = csv_path.stat()
+    return {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+def _arrow_schema(dtypes: dict) -> pa.Schema:
+    # 텍스트(object) 컬럼은 첫 chunk가 모두 결측이어도 string으로 고정
+    return pa.schema([(column, pa.string() if dtype == 'object' else pa.from_numpy_dtype(np.dtype(dtype)))
+                      for column, dtype in dtypes.items()])
+
+def write_partitioned(csv_path: Union[str, Path], id_col: str = 'ID', n_buckets: int = DEFAULT_BUCKETS,
+                      chunksize: int = DEFAULT_CHUNKSIZE) -> Optional[Path]:
+    """
+    Write a CSV as a Parquet dataset partitioned by cohort and patient bucket (<name>.parquet/).
+
+    The CSV is read twice chunk by chunk: once to infer the dtype of every column over the whole
+    file, then to write the chunks with those dtypes, so memory stays at one chunk. The dataset is
+    written to a temporary directory and then replaces the old one. CSVs that the dataset cannot
+    represent as pd.read_csv reads them (columns numeric in some chunks and text in others) are
+    not written; the old dataset is removed so readers fall back to the CSV.
+
+    Args:
+        csv_path (str | Path): The CSV, just written (e.g. with to_csv(index=False)).
+        id_col (str): The patient ID column.
+        n_buckets (int): Number of patient buckets per cohort.
+        chunksize (int): Rows per chunk.
+
+    Returns:
+        Path | None: The dataset directory, or None if the CSV could not be written as a dataset.
+
+    Raises:
+        FileNotFoundError: If the CSV does not exist.
+    """
+    csv_path = Path(csv_path)
+    if not csv_path.exists():
+        raise FileNotFoundError(f"File {csv_path} not found.")
+    path = dataset_path(csv_path)
+    tmp_path = path.with_name(path.name + '.tmp')
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    source = _csv_source(csv_path)
+    try:
+        dtypes, mixed = infer_csv_dtypes(csv_path, chunksize)
+        if mixed:
+            raise ValueError(f"columns with mixed types {sorted(mixed)}")
+        schema = _arrow_schema(dtypes)
+
+        def batches():
+            offset = 0
+            for chunk in pd.read_csv(csv_path, chunksize=chunksize, dtype=dtypes):
+                table = pa.Table.from_pandas(chunk, schema=schema, preserve_index=False)
+                table = table.append_column(ROW_COLUMN, pa.array(np.arange(offset, offset + len(chunk), dtype=np.int64)))
+                table = table.append_column('cohort', pa.array(cohort_of(chunk[id_col]), type=pa.string()))
+                table = table.append_column('bucket', pa.array(patient_bucket(chunk[id_col], n_buckets), type=pa.int32()))
+                offset += len(chunk)
+                yield from table.to_batches()
+
+        full_schema = (schema.append(pa.field(ROW_COLUMN, pa.int64()))
+                       .append(pa.field('cohort', pa.string())).append(pa.field('bucket', pa.int32())))
+        ds.write_dataset(batches(), tmp_path, schema=full_schema, format='parquet',
+                         basename_template='part-{i}.parquet',
+                         partitioning=ds.partitioning(PARTITION_SCHEMA, flavor='hive'))
+    except (pa.ArrowException, ValueError, TypeError, KeyError) as e:
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        shutil.rmtree(path, ignore_errors=True)
+        logging.warning(f"Could not write partitioned dataset {path} ({e}); readers will use the CSV.")
+        return None
+
+    with (tmp_path / LAYOUT_FILE).open('w', encoding='utf-8') as f:
+        json.dump({'id_col': id_col, 'n_buckets': n_buckets, 'columns': list(dtypes), 'source': source}, f, indent=4)
+    shutil.rmtree(path, ignore_errors=True)
+    tmp_path.replace(path)
+    logging.debug(f"Wrote partitioned dataset {path} from {csv_path} ({n_buckets} buckets)")
+    return path
+
+def _read_layout(path: Path) -> Optional[dict]:
+    layout_path = path / LAYOUT_FILE
+    if not layout_path.exists():
+        return None
+    with layout_path.open('r', encoding='utf-8') as f:
+        return json.load(f)
+
+def is_current(file_path: Union[str, Path]) -> bool:
+    """
+    Return whether the dataset of a CSV exists and was built from the CSV as it is now.
+
+    A dataset without its CSV counts as current (the CSV may have been deleted to save space).
+    """
+    file_path = Path(file_path)
+    layout = _read_layout(dataset_path(file_path))
+    if layout is None:
+        return False
+    return not file_path.exists() or layout.get('source') == _csv_source(file_path)
+
+def _filter_expression(filters) -> Optional[ds.Expression]:
+    if filters is None or isinstance(filters, ds.Expression):
+        return filters
+    expr = None
+    for column, op, value in filters:
+        if op not in FILTER_OPS:
+            raise ValueError(f"Unsupported filter operator {op!r}; use one of {list(FILTER_OPS)}")
+        term = FILTER_OPS[op](ds.field(column), value)
+        expr = term if expr is None else expr & term
+    return expr
+
+def read_partitioned(path: Union[str, Path], columns: Optional[list] = None, ids: Optional[list] = None,
+                     cohorts: Optional[list] = None, filters=None, id_col: Optional[str] = None) -> pd.DataFrame:
+    """
+    Read selected columns, patients, cohorts and rows of a partitioned dataset.
+
+    Only the buckets of the requested patients and the requested cohorts are opened, only the
+    requested columns are decoded, and row filters are pushed down to the Parquet row groups.
+
+    Args:
+        path (str | Path): The dataset directory (or the CSV path it belongs to).
+        columns (list, optional): Columns to return, in this order (default: all, in written order).
+        ids (list, optional): Patient IDs to return (default: all patients).
+        cohorts (list, optional): Cohorts to return, e.g. ['SYM'] (default: all).
+        filters (list | pyarrow.dataset.Expression, optional): Row filters, either an expression or
+            a list of (column, op, value) tuples combined with AND; op is one of
+            ==, !=, <, <=, >, >=, in, not in.
+        id_col (str, optional): The patient ID column (default: the one the dataset was written with).
+
+    Returns:
+        pd.DataFrame: The selected rows in their written order, with a fresh RangeIndex.
+
+    Raises:
+        FileNotFoundError: If the dataset does not exist.
+        ValueError: If a filter operator is not supported.
+    """
+    path = dataset_path(path) if Path(path).suffix == '.csv' else Path(path)
+    layout = _read_layout(path)
+    if layout is None:
+        raise FileNotFoundError(f"Partitioned dataset {path} not found.")
+    id_col = id_col or layout['id_col']
+    columns = list(layout['columns']) if columns is None else list(columns)
+
+    dataset = ds.dataset(path, format='parquet', partitioning=ds.partitioning(PARTITION_SCHEMA, flavor='hive'))
+    terms = []
+    if cohorts is not None:
+        terms.append(ds.field('cohort').isin([str(c) for c in cohorts]))
+    if ids is not None:
+        ids = list(ids)
+        terms.append(ds.field('bucket').isin(np.unique(patient_bucket(ids, layout['n_buckets'])).tolist()))
+        id_type = dataset.schema.field(id_col).type
+        terms.append(ds.field(id_col).isin(pa.array([str(i) for i in ids] if pa.types.is_string(id_type) else ids,
+                                                     type=id_type)))
+    row_filter = _filter_expression(filters)
+    if row_filter is not None:
+        terms.append(row_filter)
+    expr = None
+    for term in terms:
+        expr = term if expr is None else expr & term
+
+    table = dataset.to_table(columns=columns + [ROW_COLUMN], filter=expr)
+    df = table.to_pandas()
+    df = df.sort_values(ROW_COLUMN, kind='stable').drop(columns=ROW_COLUMN).reset_index(drop=True)
+    # 텍스트 컬럼의 결측은 pd.read_csv와 같이 None이 아닌 NaN으로
+    for column in df.columns[df.dtypes == object]:
+        df[column] = df[column].where(df[column].notna(), np.nan)
+    logging.debug(f"Read {len(df)} rows x {len(columns)} columns from {path}")
+    return df
@@ -0,0 +1,348 @@
+"""
+pipeline.py
+
+This module runs the project's stage chain (PXPN/SYM 1_stage → 2_stage → 3_stage → merge →
+data_preprocessing → domain_main → domain_ensemble) from a YAML declaration, and reruns only
+the stages whose inputs, code or configuration changed since their last successful run.
+
+Every stage declares (paths relative to the project root):
+- notebook: a notebook to execute (run in its own directory, like opening it in Jupyter), or
+  command: a command line (list of arguments, run in the project root)
+- inputs: files the stage reads; a stage that lists another stage's output depends on it
+- outputs: files the stage writes
+- code: extra source files (globs allowed) the stage imports, e.g. utils modules or library/*.py
+- config: configuration files the stage reads (e.g. library/config_domain.yaml)
+- params: free-form parameters that change the result (recorded in the signature)
+
+A stage is skipped when the SHA-256 content hashes of its inputs, its code (notebooks: the source
+of the code cells only), its config files and params match the last successful run and its outputs
+are unchanged. Stages whose dependencies are finished run in parallel on a thread pool (each stage
+is its own process), so independent branches like the SYM and PXPN chains overlap.
+
+Run state (signatures, output fingerprints and a file hash cache keyed by size and mtime) is kept
+in <state_dir>/pipeline_state.json, executed notebooks in <state_dir>/notebooks and stage logs in
+<state_dir>/logs.
+
+Functions:
+- load_pipeline(config_path: str | Path, root: str | Path) -> tuple:
+    Read the stage declarations and the state directory from a YAML file.
+- stage_order(stages: dict, targets: list) -> list:
+    The selected stages and their upstream stages in dependency order.
+- run_pipeline(stages: dict, state_dir: str | Path, targets: list, force: bool, n_jobs: int,
+               dry_run: bool) -> dict:
+    Run (or skip) the stages and return their status.
+
+Classes:
+- Stage: one declared stage (paths, dependencies and signature).
+
+Logging is configured via the config module.
+"""
+import library.config as config
+import logging
+
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import threading
+import yaml
+
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from pathlib import Path
+from typing import Optional, Union
+
+from library.cache_utils import HASH_CHUNK_SIZE
+from library.path_utils import PROJECT_ROOT, make_dir
+
+STATE_FILE = 'pipeline_state.json'
+
+class Stage:
+    """
+    One stage of the pipeline, as declared in the YAML file.
+
+    Attributes:
+        name (str): The stage name.
+        notebook (Path | None): The notebook to execute.
+        command (list | None): The command line to run in the project root.
+        inputs, outputs, config (list[Path]): Declared files.
+        code (list[str]): Declared source files or globs.
+        params (dict): Declared parameters.
+        deps (list[str]): Upstream stages (filled by load_pipeline).
+    """
+
+    def __init__(self, name: str, spec: dict, root: Path = PROJECT_ROOT):
+        if ('notebook' in spec) == ('command' in spec):
+            raise ValueError(f"Stage {name!r} must declare exactly one of 'notebook' or 'command'")
+        self.name = name
+        self.root = root
+        self.notebook = root / spec['notebook'] if 'notebook' in spec else None
+        self.command = [str(arg) for arg in spec['command']] if 'command' in spec else None
+        self.inputs = [root / p for p in spec.get('inputs', [])]
+        self.outputs = [root / p for p in spec.get('outputs', [])]
+        self.config = [root / p for p in spec.get('config', [])]
+        self.code = list(spec.get('code', []))
+        self.params = spec.get('params', {}) or {}
+        self.deps = []
+
+    def code_files(self) -> list:
+        """Return the stage's own notebook/script and the declared code files (globs expanded)."""
+        files = [self.notebook] if self.notebook is not None else []
+        files += [self.root / arg for arg in (self.command or []) if arg.endswith('.py')]
+        for pattern in self.code:
+            matches = sorted(self.root.glob(pattern))
+            if not matches:
+                raise FileNotFoundError(f"Stage {self.name!r}: code {pattern!r} matches no file")
+            files += matches
+        return list(dict.fromkeys(files))
+
+class _HashCache:
+    # 크기와 mtime이 같은 파일은 다시 읽지 않도록 해시를 상태 파일에 보관
+    def __init__(self, entries: dict):
+        self.entries = entries
+        self.lock = threading.Lock()
+
+    def file_hash(self, path: Path) -> str:
+        stat = path.stat()
+        key = str(path)
+        with self.lock:
+            entry = self.entries.get(key)
+        if entry is not None and entry[0] == stat.st_size and entry[1] == stat.st_mtime_ns:
+            return entry[2]
+        if path.suffix == '.ipynb':
+            digest = _notebook_code_hash(path)
+        else:
+            digest = hashlib.sha256()
+            with path.open('rb') as f:
+                for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+                    digest.update(chunk)
+            digest = digest.hexdigest()
+        with self.lock:
+            self.entries[key] = [stat.st_size, stat.st_mtime_ns, digest]
+        return digest
+
+def _notebook_code_hash(path: Path) -> str:
+    # 실행 결과나 실행 번호가 아니라 코드 셀의 소스만 코드 버전으로 봄
+    with path.open('r', encoding='utf-8') as f:
+        nb = json.load(f)
+    sources = [''.join(cell['source']) for cell in nb.get('cells', []) if cell.get('cell_type') == 'code']
+    return hashlib.sha256(json.dumps(sources, ensure_ascii=False).encode('utf-8')).hexdigest()
+
+def _relative(path: Path, root: Path) -> str:
+    try:
+        return path.relative_to(root).as_posix()
+    except ValueError:
+        return str(path)
+
+def load_pipeline(config_path: Union[str, Path], root: Union[str, Path] = PROJECT_ROOT) -> tuple:
+    """
+    Read the stage declarations from a YAML file and link every stage to its upstream stages.
+
+    Args:
+        config_path (str | Path): The YAML file with STATE_DIR and stages: {name: spec}.
+        root (str | Path): The directory the declared paths are relative to (default: project root).
+
+    Returns:
+        tuple: ({name: Stage} in declaration order, state directory as an absolute Path).
+
+    Raises:
+        ValueError: If a stage is malformed, two stages write the same output, or the
+            dependencies form a cycle.
+    """
+    root = Path(root)
+    with open(config_path, 'r', encoding='utf-8') as f:
+        cfg = yaml.safe_load(f)
+    stages = {name: Stage(name, spec or {}, root) for name, spec in cfg['stages'].items()}
+
+    producers = {}
+    for stage in stages.values():
+        for output in stage.outputs:
+            if output in producers:
+                raise ValueError(f"{_relative(output, root)} is an output of both "
+                                 f"{producers[output]!r} and {stage.name!r}")
+            producers[output] = stage.name
+    for stage in stages.values():
+        deps = [producers[p] for p in stage.inputs if p in producers and producers[p] != stage.name]
+        stage.deps = list(dict.fromkeys(deps))
+    stage_order(stages, list(stages))
+    return stages, root / cfg.get('STATE_DIR', './_tmp/pipeline')
+
+def stage_order(stages: dict, targets: Optional[list] = None) -> list:
+    """
+    Return the target stages and all of their upstream stages in dependency order.
+
+    Args:
+        stages (dict): {name: Stage} from load_pipeline.
+        targets (list, optional): Stage names to run (default: all stages).
+
+    Returns:
+        list: Stage names; every stage comes after its dependencies.
+
+    Raises:
+        ValueError: If a target is unknown or the dependencies form a cycle.
+    """
+    targets = list(stages) if not targets else targets
+    unknown = [name for name in targets if name not in stages]
+    if unknown:
+        raise ValueError(f"Unknown stages {unknown}; declared stages are {list(stages)}")
+
+    order, visiting, done = [], set(), set()
+    def visit(name, path):
+        if name in done:
+            return
+        if name in visiting:
+            raise ValueError(f"Stage dependencies form a cycle: {' → '.join(path + [name])}")
+        visiting.add(name)
+        for dep in stages[name].deps:
+            visit(dep, path + [name])
+        visiting.discard(name)
+        done.add(name)
+        order.append(name)
+    for name in targets:
+        visit(name, [])
+    return order
+
+def _signature(stage: Stage, hashes: _HashCache) -> dict:
+    missing = [_relative(p, stage.root) for p in stage.inputs + stage.config if not p.is_file()]
+    if missing:
+        raise FileNotFoundError(f"Stage {stage.name!r} is missing inputs: {missing}")
+    return {
+        'run': _relative(stage.notebook, stage.root) if stage.notebook is not None else stage.command,
+        'inputs': {_relative(p, stage.root): hashes.file_hash(p) for p in stage.inputs},
+        'code': {_relative(p, stage.root): hashes.file_hash(p) for p in stage.code_files()},
+        'config': {_relative(p, stage.root): hashes.file_hash(p) for p in stage.config},
+        'params': stage.params,
+    }
+
+def _output_fingerprints(stage: Stage) -> Optional[dict]:
+    fingerprints = {}
+    for path in stage.outputs:
+        if not path.is_file():
+            return None
+        stat = path.stat()
+        fingerprints[_relative(path, stage.root)] = [stat.st_size, stat.st_mtime_ns]
+    return fingerprints
+
+def _is_current(stage: Stage, signature: dict, entry: Optional[dict]) -> bool:
+    if entry is None or entry['signature'] != signature:
+        return False
+    # 출력이 지워졌거나 바뀌었으면 다시 실행
+    return _output_fingerprints(stage) == entry['outputs']
+
+def _execute(stage: Stage, state_dir: Path) -> None:
+    log_path = make_dir(state_dir / 'logs') / f"{stage.name}.log"
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join([str(stage.root)] + ([env['PYTHONPATH']] if env.get('PYTHONPATH') else []))
+    if stage.notebook is not None:
+        # 노트북은 자기 폴더에서 실행 (import config as cfg가 동작하도록); 실행 결과는 state_dir에 저장
+        args = [sys.executable, '-m', 'nbconvert', '--to', 'notebook', '--execute',
+                '--ExecutePreprocessor.timeout=-1', '--output-dir', str(make_dir(state_dir / 'notebooks')),
+                '--output', stage.name, str(stage.notebook)]
+        cwd = stage.notebook.parent
+    else:
+        args = [sys.executable if arg == 'python' else arg for arg in stage.command]
+        cwd = stage.root
+    with log_path.open('w', encoding='utf-8') as log:
+        result = subprocess.run(args, cwd=cwd, env=env, stdout=log, stderr=subprocess.STDOUT)
+    if result.returncode != 0:
+        raise RuntimeError(f"Stage {stage.name!r} failed with exit code {result.returncode} (log: {log_path})")
+    missing = [_relative(p, stage.root) for p in stage.outputs if not p.is_file()]
+    if missing:
+        raise RuntimeError(f"Stage {stage.name!r} did not write its outputs {missing} (log: {log_path})")
+
+def _save_state(state: dict, state_dir: Path) -> None:
+    path = make_dir(state_dir) / STATE_FILE
+    tmp_path = path.with_name(path.name + '.tmp')
+    with tmp_path.open('w', encoding='utf-8') as f:
+        json.dump(state, f, ensure_ascii=False, indent=4)
+    tmp_path.replace(path)
+
+def run_pipeline(stages: dict, state_dir: Union[str, Path], targets: Optional[list] = None, force: bool = False,
+                 n_jobs: Optional[int] = None, dry_run: bool = False) -> dict:
+    """
+    Run the target stages (and their upstream stages), skipping stages that are up to date.
+
+    A stage starts once all of its dependencies have finished; its signature is computed at that
+    point, so a rerun upstream stage whose outputs changed makes its downstream stages rerun.
+    If a stage fails, its downstream stages are not run, but independent stages continue.
+
+    Args:
+        stages (dict): {name: Stage} from load_pipeline.
+        state_dir (str | Path): Directory of the run state, executed notebooks and logs.
+        targets (list, optional): Stage names to run (default: all stages).
+        force (bool): Rerun the target stages even if they are up to date.
+        n_jobs (int, optional): Number of stages run at the same time (None or < 1: os.cpu_count()).
+        dry_run (bool): Only report which stages would run.
+
+    Returns:
+        dict: {stage name: 'skipped' | 'done' | 'failed' | 'blocked' | 'would run' | 'would skip'}
+            in dependency order.
+    """
+    state_dir = Path(state_dir)
+    state_path = state_dir / STATE_FILE
+    state = {'stages': {}, 'hashes': {}}
+    if state_path.exists():
+        with state_path.open('r', encoding='utf-8') as f:
+            state = json.load(f)
+    hashes = _HashCache(state['hashes'])
+    order = stage_order(stages, targets)
+    forced = set(targets or order) if force else set()
+    status = {}
+
+    if dry_run:
+        for name in order:
+            stage = stages[name]
+            upstream = any(status[dep] == 'would run' for dep in stage.deps)
+            try:
+                current = _is_current(stage, _signature(stage, hashes), state['stages'].get(name))
+            except FileNotFoundError:
+                current = False
+            status[name] = 'would run' if name in forced or upstream or not current else 'would skip'
+            logging.info(f"{name}: {status[name]}")
+        return status
+
+    if n_jobs is None or n_jobs < 1:
+        n_jobs = os.cpu_count() or 1
+    # 상태 파일 저장과 해시 캐시 갱신이 겹치지 않도록 같은 잠금을 씀
+    lock = hashes.lock
+
+    def run_stage(name):
+        stage = stages[name]
+        signature = _signature(stage, hashes)
+        if name not in forced and _is_current(stage, signature, state['stages'].get(name)):
+            return 'skipped'
+        logging.info(f"{name}: running")
+        _execute(stage, state_dir)
+        with lock:
+            state['stages'][name] = {'signature': signature, 'outputs': _output_fingerprints(stage)}
+            _save_state(state, state_dir)
+        return 'done'
+
+    pending = list(order)
+    running = {}
+    with ThreadPoolExecutor(max_workers=n_jobs) as executor:
+        while pending or running:
+            for name in list(pending):
+                deps = [dep for dep in stages[name].deps if dep in order]
+                if any(status.get(dep) in ('failed', 'blocked') for dep in deps):
+                    status[name] = 'blocked'
+                    pending.remove(name)
+                    logging.warning(f"{name}: blocked (an upstream stage failed)")
+                elif all(status.get(dep) in ('skipped', 'done') for dep in deps) and len(running) < n_jobs:
+                    running[executor.submit(run_stage, name)] = name
+                    pending.remove(name)
+            if not running:
+                continue
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                name = running.pop(future)
+                try:
+                    status[name] = future.result()
+                    logging.info(f"{name}: {status[name]}")
+                except Exception as e:
+                    status[name] = 'failed'
+                    logging.error(f"{name}: {e}")
+
+    with lock:
+        _save_state(state, state_dir)
+    return {name: status[name] for name in order}
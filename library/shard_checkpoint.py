@@ -0,0 +1,136 @@
+"""
+shard_checkpoint.py
+
+This module runs a long per-patient computation (for example the stage-2 HR features) in
+batches of patients and checkpoints the result of every patient, so that a crash or kernel
+restart only loses the batch in progress.
+
+Checkpoint layout:
+    <checkpoint_dir>/manifest.json         IngestManifest: patient → signature, partition path
+    <checkpoint_dir>/<name>/<partition>    one table per patient (Parquet, or pickle as a fallback)
+
+A patient's signature is the hash of its input rows (row_signatures) together with the
+computation parameters and the code version (code_signature of the compute code, so that editing
+the feature code invalidates every checkpoint). A rerun skips every patient whose signature is unchanged and whose
+partition exists, recomputes new or changed patients, drops patients that are no longer in the
+input, and merges all partitions at the end.
+
+Functions:
+- code_signature(*objects) -> str:
+    Hash the source of the modules that define the given functions and of the library modules they use.
+- run_patient_shards(df: pd.DataFrame, compute: Callable, checkpoint_dir: str | Path, name: str,
+                     params: dict, code_version: str, id_col: str, batch_size: int) -> pd.DataFrame:
+    Compute, checkpoint and merge a per-patient result.
+
+Logging is configured via the config module.
+"""
+import library.config as config
+import logging
+
+import hashlib
+import inspect
+import pandas as pd
+
+from pathlib import Path
+from typing import Callable, Optional, Union
+
+from library.cache_utils import load_cached_table, save_cached_table
+from library.ingest_manifest import IngestManifest, row_signatures
+
+def _partition_name(pid: str) -> str:
+    # 파일 이름에 쓸 수 없는 문자가 있어도 겹치지 않도록 ID 해시를 덧붙입니다.
+    safe = ''.join(c if c.isalnum() or c in '-_' else '_' for c in pid)
+    return f"{safe}_{hashlib.sha1(pid.encode('utf-8')).hexdigest()[:8]}"
+
+def code_signature(*objects) -> str:
+    """
+    Hash the source code behind a computation.
+
+    For every object (a function, class or module) the source file of its module is hashed, together
+    with the source of every library module that module imports names from (one level), e.g.
+    code_signature(hr_day_features) covers utils_for_analysis.py, library/minute_features.py,
+    library/hr_features.py, ...
+
+    Args:
+        *objects: Functions, classes or modules whose code the result depends on.
+
+    Returns:
+        str: SHA-256 hex digest of the module names and sources.
+    """
+    modules = {}
+    for obj in objects:
+        module = obj if inspect.ismodule(obj) else inspect.getmodule(obj)
+        modules[module.__name__] = module
+        for value in vars(module).values():
+            used = value if inspect.ismodule(value) else inspect.getmodule(value)
+            if used is not None and used.__name__.startswith('library.'):
+                modules[used.__name__] = used
+    digest = hashlib.sha256()
+    for module_name in sorted(modules):
+        digest.update(module_name.encode('utf-8'))
+        digest.update(Path(inspect.getsourcefile(modules[module_name])).read_bytes())
+    return digest.hexdigest()
+
+def run_patient_shards(df: pd.DataFrame, compute: Callable[[pd.DataFrame], pd.DataFrame],
+                       checkpoint_dir: Union[str, Path], name: str, params: Optional[dict] = None,
+                       code_version: Optional[str] = None, id_col: str = 'ID', batch_size: int = 32) -> pd.DataFrame:
+    """
+    Compute a per-patient result in batches, checkpoint every patient and merge the partitions.
+
+    compute must treat patients independently (the rows of a patient in its output may only
+    depend on that patient's input rows); then the merged result equals compute(df) up to row order.
+
+    Args:
+        df (pd.DataFrame): The input table (e.g. HR.csv), with a patient ID column.
+        compute (Callable): Function from a subset of df (all rows of some patients) to a result
+            table with an `id_col` column.
+        checkpoint_dir (str | Path): The checkpoint directory (created if needed).
+        name (str): The name of the result (sub-directory and manifest source).
+        params (dict, optional): Parameters that affect the result; changing them invalidates
+            every checkpoint.
+        code_version (str, optional): Version of the compute code (e.g. code_signature(compute_function));
+            changing it invalidates every checkpoint.
+        id_col (str): The patient ID column of df and of the result.
+        batch_size (int): Number of patients per compute call (the manifest is saved after each batch).
+
+    Returns:
+        pd.DataFrame: The results of all patients, concatenated in order of first appearance in df.
+    """
+    params = {} if params is None else params
+    checkpoint_dir = Path(checkpoint_dir)
+    manifest = IngestManifest(checkpoint_dir / 'manifest.json')
+    signatures = {pid: {**sig, 'params': params, 'code': code_version} for pid, sig in row_signatures(df, id_col).items()}
+
+    # 입력에서 사라진 환자의 파티션 정리
+    n_removed = 0
+    for member in manifest.members(name):
+        if member not in signatures:
+            manifest.remove(name, member)
+            n_removed += 1
+
+    pending = [pid for pid, sig in signatures.items() if not manifest.is_current(name, pid, sig)]
+    rows = df.groupby(df[id_col].astype(str), sort=False).indices
+    for start in range(0, len(pending), batch_size):
+        batch = pending[start:start + batch_size]
+        index = sorted(i for pid in batch for i in rows[pid])
+        result = compute(df.iloc[index])
+        result_rows = result.groupby(result[id_col].astype(str), sort=False).indices
+        for pid in batch:
+            # 바뀐 환자의 이전 파티션은 지움 (Parquet ↔ pickle 형식이 바뀌어도 옛 파일이 남지 않도록)
+            manifest.remove(name, pid)
+            output = None
+            if pid in result_rows:
+                output = save_cached_table(result.iloc[result_rows[pid]].reset_index(drop=True),
+                                           checkpoint_dir / name, _partition_name(pid))
+            manifest.record(name, pid, pid, signatures[pid], output)
+        manifest.save()
+        logging.info(f"{name}: checkpointed {min(start + batch_size, len(pending))} of {len(pending)} patients")
+    manifest.save()
+    logging.info(f"{name}: {len(signatures)} patients, {len(pending)} computed, "
+                 f"{len(signatures) - len(pending)} reused, {n_removed} removed")
+
+    frames = []
+    for pid in signatures:
+        if manifest.get(name, pid)['output'] is not None:
+            frames.append(load_cached_table(checkpoint_dir / name, _partition_name(pid)))
+    return pd.concat(frames, axis=0, ignore_index=True) if frames else pd.DataFrame()
@@ -0,0 +1,117 @@
+"""
+shared_pool.py
+
+This module provides a process pool driver for per-day feature kernels (cosinor, bandpower,
+daily statistics, ...) that work on blocks of a (n_days, n_minutes) matrix.
+
+Instead of pickling a DataFrame slice for every (ID, day) task, the input arrays are copied once
+into shared memory. Every worker process attaches to them when it starts, and a task only carries
+a row range (start, stop) of `chunk_size` days. The kernel is called as
+func(**{name: array[start:stop]}, **kwargs) and must be a module-level (picklable) function that
+returns either an array with one row per day or a dict of such arrays.
+
+Functions:
+- map_row_blocks(func: Callable, arrays: dict, kwargs: dict, n_jobs: int, chunk_size: int)
+    -> Union[np.ndarray, dict]:
+    Run a per-day kernel over row blocks of shared arrays and concatenate the results.
+
+Logging is configured via the config module.
+"""
+import library.config as config
+import logging
+
+import os
+import numpy as np
+
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+from multiprocessing import shared_memory
+from typing import Callable, Optional, Union
+
+# 작업 프로세스가 붙은 공유 메모리: {이름: (SharedMemory, np.ndarray)}
+_ATTACHED = {}
+
+def _attach_shared(specs: dict) -> None:
+    # ProcessPoolExecutor의 initializer: 작업 프로세스마다 한 번만 공유 메모리에 붙습니다.
+    for name, (shm_name, shape, dtype) in specs.items():
+        # 자식 프로세스는 부모의 resource tracker를 공유하므로, 해제(unlink)는 부모에서 한 번만 합니다.
+        shm = shared_memory.SharedMemory(name=shm_name)
+        _ATTACHED[name] = (shm, np.ndarray(shape, dtype=np.dtype(dtype), buffer=shm.buf))
+
+def _run_block(func: Callable, start: int, stop: int, kwargs: dict):
+    blocks = {name: array[start:stop] for name, (_, array) in _ATTACHED.items()}
+    return func(**blocks, **kwargs)
+
+def _concat_results(results: list) -> Union[np.ndarray, dict]:
+    if isinstance(results[0], dict):
+        return {key: np.concatenate([r[key] for r in results]) for key in results[0]}
+    return np.concatenate([np.asarray(r) for r in results])
+
+def map_row_blocks(func: Callable, arrays: dict, kwargs: Optional[dict] = None, n_jobs: Optional[int] = None,
+                   chunk_size: int = 64) -> Union[np.ndarray, dict]:
+    """
+    Run a per-day kernel over row blocks of shared arrays on a process pool.
+
+    The result is the same as concatenating func(**{name: array[start:stop]}, **kwargs) over all
+    blocks in order, which is also what happens (without a pool) when n_jobs is 1 or there is
+    only one block.
+
+    Args:
+        func (Callable): Module-level kernel taking the block of every array as a keyword argument
+            and returning an array (one row per day) or a dict of arrays.
+        arrays (dict): {argument name: np.ndarray}, all with the same number of rows (days).
+            Object arrays cannot be shared; pass numeric arrays and keep the keys in the caller.
+        kwargs (dict, optional): Extra keyword arguments for func (pickled once per task).
+        n_jobs (int, optional): Number of worker processes (None or < 1: os.cpu_count()).
+        chunk_size (int): Number of days per task.
+
+    Returns:
+        np.ndarray | dict: The concatenated kernel results.
+
+    Raises:
+        ValueError: If arrays is empty, the arrays have different numbers of rows,
+            an array has object dtype, or chunk_size < 1.
+    """
+    kwargs = {} if kwargs is None else kwargs
+    arrays = {name: np.ascontiguousarray(array) for name, array in arrays.items()}
+    if not arrays:
+        raise ValueError("arrays must contain at least one array")
+    n_rows = {len(array) for array in arrays.values()}
+    if len(n_rows) != 1:
+        raise ValueError(f"All arrays must have the same number of rows, got {sorted(n_rows)}")
+    if any(array.dtype.hasobject for array in arrays.values()):
+        raise ValueError("Object arrays cannot be placed in shared memory")
+    if chunk_size < 1:
+        raise ValueError(f"chunk_size must be >= 1, got {chunk_size}")
+    n_rows = n_rows.pop()
+
+    starts = list(range(0, n_rows, chunk_size)) or [0]
+    stops = [min(start + chunk_size, n_rows) for start in starts]
+    if n_jobs is None or n_jobs < 1:
+        n_jobs = os.cpu_count() or 1
+
+    if n_jobs == 1 or len(starts) <= 1:
+        results = [func(**{name: array[start:stop] for name, array in arrays.items()}, **kwargs)
+                   for start, stop in zip(starts, stops)]
+        return _concat_results(results)
+
+    segments = []
+    try:
+        specs = {}
+        for name, array in arrays.items():
+            shm = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+            segments.append(shm)
+            np.ndarray(array.shape, dtype=array.dtype, buffer=shm.buf)[...] = array
+            specs[name] = (shm.name, array.shape, array.dtype.str)
+        logging.debug(f"Shared {sum(a.nbytes for a in arrays.values())} bytes of {n_rows} days; "
+                      f"{len(starts)} tasks on {min(n_jobs, len(starts))} workers")
+
+        with ProcessPoolExecutor(max_workers=min(n_jobs, len(starts)), initializer=_attach_shared,
+                                 initargs=(specs,)) as executor:
+            # map은 입력 순서를 유지하므로 결과가 단일 프로세스 실행과 같은 순서입니다.
+            results = list(executor.map(_run_block, repeat(func), starts, stops, repeat(kwargs)))
+    finally:
+        for shm in segments:
+            shm.close()
+            shm.unlink()
+    return _concat_results(results)
@@ -0,0 +1,157 @@
+"""
+sleep_summary.py
+
+This module turns raw sleep records into per-night sleep stage totals (SLT1-SLT6, in hours) with
+NumPy array arithmetic instead of a Python function per row:
+
+- SYM (라이프로그-수면): one comma-separated string of 30-second epoch codes per night. All strings
+  are parsed in bulk and the codes of every night are counted with one bincount.
+- PXPN (Sleep): one row per sleep interval (started_at, ended_at, type). Interval durations are
+  summed per (ID, night, stage) with one bincount over integer nanoseconds.
+
+Functions:
+- epoch_code_counts(values: pd.Series, codes: list) -> np.ndarray:
+    Count the epoch codes of every comma-separated string.
+- epoch_stage_hours(values: pd.Series, epoch_stages: dict, epoch_seconds: int) -> pd.DataFrame:
+    SLT1-SLT6 hours of every night from epoch code strings.
+- interval_stage_hours(sleep: pd.DataFrame, id_col: str, type_col: str, start_col: str, end_col: str)
+    -> pd.DataFrame:
+    SLT1-SLT6 and total_sleep hours per (ID, date) from sleep intervals.
+
+Logging is configured via the config module.
+"""
+import library.config as config
+import logging
+
+import warnings
+
+import numpy as np
+import pandas as pd
+
+SLT_STAGES = ['SLT1', 'SLT2', 'SLT3', 'SLT4', 'SLT5', 'SLT6']
+# SYM 수면 측정값 코드 → SLT (SLT3에 해당하는 코드는 없음)
+SYM_EPOCH_STAGES = {1: 'SLT1', 0: 'SLT2', 3: 'SLT4', 4: 'SLT5', 2: 'SLT6'}
+PARSE_CHUNK_ROWS = 4096
+NS_PER_HOUR = 3600 * 10**9
+
+def _parse_epoch_row(text: str) -> list:
+    # calc_slt_times와 같은 파싱 (빈 토큰은 건너뛰고, 정수가 아니면 ValueError)
+    return [int(x) for x in text.split(',') if x != '']
+
+def epoch_code_counts(values, codes: list) -> np.ndarray:
+    """
+    Count the epoch codes of every comma-separated string (e.g. "1,1,0,3,...").
+
+    Strings are joined in chunks and parsed with np.fromstring; only chunks that contain empty
+    tokens or non-integer values fall back to parsing row by row.
+
+    Args:
+        values (pd.Series | list): One string of epoch codes per night (NaN or '' = no epochs).
+        codes (list): The codes to count.
+
+    Returns:
+        np.ndarray: (n_rows, len(codes)) int64 counts.
+    """
+    texts = pd.Series(values).fillna('').astype(str).reset_index(drop=True)
+    n_rows, n_codes = len(texts), len(codes)
+    code_order = np.argsort(codes)
+    sorted_codes = np.asarray(codes, dtype=np.int64)[code_order]
+    flat = np.zeros(n_rows * n_codes, dtype=np.int64)
+
+    nonempty = np.flatnonzero(texts.str.len().to_numpy() > 0)
+    n_tokens = texts.iloc[nonempty].str.count(',').to_numpy() + 1
+    for start in range(0, len(nonempty), PARSE_CHUNK_ROWS):
+        idx = nonempty[start:start + PARSE_CHUNK_ROWS]
+        sizes = n_tokens[start:start + PARSE_CHUNK_ROWS]
+        joined = ','.join(texts.iloc[idx])
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', DeprecationWarning)
+            parsed = np.fromstring(joined, dtype=np.int64, sep=',')
+        if parsed.size == sizes.sum():
+            rows = np.repeat(idx, sizes)
+        else:
+            # 빈 토큰이나 정수가 아닌 값이 섞인 묶음은 행 단위로 파싱
+            parts = [_parse_epoch_row(texts.iloc[i]) for i in idx]
+            rows = np.repeat(idx, [len(p) for p in parts])
+            parsed = np.array([v for p in parts for v in p], dtype=np.int64)
+
+        # 코드 → 열 번호 (세지 않는 코드는 제외)
+        pos = np.clip(np.searchsorted(sorted_codes, parsed), 0, n_codes - 1)
+        keep = sorted_codes[pos] == parsed
+        flat += np.bincount(rows[keep] * n_codes + code_order[pos[keep]], minlength=n_rows * n_codes)
+    return flat.reshape(n_rows, n_codes)
+
+def epoch_stage_hours(values, epoch_stages: dict = SYM_EPOCH_STAGES, epoch_seconds: int = 30) -> pd.DataFrame:
+    """
+    SLT1-SLT6 hours of every night from comma-separated epoch code strings.
+
+    Args:
+        values (pd.Series | list): One string of epoch codes per night.
+        epoch_stages (dict): Code -> SLT stage (default: SYM_EPOCH_STAGES).
+        epoch_seconds (int): Length of one epoch in seconds (default: 30).
+
+    Returns:
+        pd.DataFrame: Columns SLT1-SLT6 (hours, float), one row per input string
+            (stages without a code are 0).
+    """
+    codes = list(epoch_stages)
+    counts = epoch_code_counts(values, codes)
+    out = pd.DataFrame(0.0, index=range(len(counts)), columns=SLT_STAGES)
+    for j, code in enumerate(codes):
+        out[epoch_stages[code]] = counts[:, j] * epoch_seconds / 3600
+    return out
+
+def interval_stage_hours(sleep: pd.DataFrame, id_col: str = 'ID', type_col: str = 'type',
+                         start_col: str = 'started_at', end_col: str = 'ended_at') -> pd.DataFrame:
+    """
+    Sum sleep interval durations per (ID, date of start, stage).
+
+    Same result as pivot_table(index=[ID, date], columns=type, values=duration, aggfunc='sum',
+    fill_value=0) followed by adding missing SLT columns, total_sleep = SLT1 + ... + SLT6 and
+    conversion of the SLT columns to hours. Other types (if any) stay as Timedelta columns.
+
+    Args:
+        sleep (pd.DataFrame): One row per interval, with datetime start/end columns.
+        id_col (str): The patient ID column.
+        type_col (str): The sleep stage column (SLT1-SLT6 after mapping).
+        start_col (str): Interval start (datetime64); the date of the start is the night.
+        end_col (str): Interval end (datetime64).
+
+    Returns:
+        pd.DataFrame: ID, date (datetime.date), one column per stage, total_sleep;
+            one row per (ID, date), sorted.
+    """
+    start = pd.to_datetime(sleep[start_col])
+    end = pd.to_datetime(sleep[end_col])
+    valid = (sleep[id_col].notna() & start.notna() & sleep[type_col].notna()).to_numpy()
+    ids = sleep[id_col].to_numpy()[valid]
+    types = sleep[type_col].to_numpy()[valid]
+    start, end = start[valid], end[valid]
+    dates = start.dt.date.to_numpy()
+
+    # 구간 길이(ns, NaT는 0)를 (ID, 날짜, 단계)별로 합산
+    duration = (end - start).to_numpy(dtype='timedelta64[ns]').astype(np.int64)
+    duration[pd.isna(end).to_numpy()] = 0
+    night_codes, nights = pd.MultiIndex.from_arrays([ids, dates], names=[id_col, 'date']).factorize(sort=True)
+    type_codes, type_names = pd.factorize(types, sort=True)
+    n_types = len(type_names)
+    totals = np.bincount(night_codes * n_types + type_codes, weights=duration,
+                         minlength=len(nights) * n_types).reshape(len(nights), n_types).astype(np.int64)
+
+    out = nights.to_frame(index=False, name=[id_col, 'date'])
+    type_names = list(type_names)
+    for j, name in enumerate(type_names):
+        out[name] = totals[:, j]
+    missing = [slt for slt in SLT_STAGES if slt not in type_names]
+    for slt in missing:
+        out[slt] = 0
+    out['total_sleep'] = out[SLT_STAGES].sum(axis=1)
+
+    # SLT와 total_sleep은 시간(float), 그 밖의 type은 Timedelta
+    for name in type_names + missing + ['total_sleep']:
+        if name in SLT_STAGES or name == 'total_sleep':
+            out[name] = out[name] / NS_PER_HOUR
+        else:
+            out[name] = pd.to_timedelta(out[name], unit='ns')
+    logging.debug(f"Summarized {len(ids)} sleep intervals into {len(nights)} nights")
+    return out
@@ -0,0 +1,46 @@
+"""
+Run the data pipeline declared in library/config_pipeline.yaml, skipping up-to-date stages.
+
+Usage:
+    python run_pipeline.py                      # run every stage that changed (SYM and PXPN in parallel)
+    python run_pipeline.py SYM_3_stage          # run SYM_3_stage and the upstream stages it needs
+    python run_pipeline.py --dry-run            # show which stages would run
+    python run_pipeline.py merge --force        # rerun merge even if it is up to date
+"""
+import argparse
+import sys
+from pathlib import Path
+
+from library.pipeline import load_pipeline, run_pipeline
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the pipeline stages whose inputs, code or config changed")
+    parser.add_argument(
+        'stages', nargs='*',
+        help='stages to run together with their upstream stages (default: all stages)'
+    )
+    parser.add_argument(
+        '--config', '-c', type=Path,
+        default=Path(__file__).parent / 'library' / 'config_pipeline.yaml',
+        help='path to the pipeline YAML file'
+    )
+    parser.add_argument(
+        '--jobs', '-j', type=int, default=2,
+        help='number of stages run at the same time (default: 2, one per SYM/PXPN chain)'
+    )
+    parser.add_argument('--force', action='store_true', help='rerun the given stages (or all) even if up to date')
+    parser.add_argument('--dry-run', action='store_true', help='only show which stages would run')
+    args = parser.parse_args()
+
+    stages, state_dir = load_pipeline(args.config)
+    status = run_pipeline(stages, state_dir, targets=args.stages, force=args.force,
+                          n_jobs=args.jobs, dry_run=args.dry_run)
+
+    width = max(len(name) for name in status)
+    for name, result in status.items():
+        print(f"{name:<{width}}  {result}")
+    if any(result in ('failed', 'blocked') for result in status.values()):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
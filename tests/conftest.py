@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# Make `library` importable when pytest is run from anywhere in the project
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
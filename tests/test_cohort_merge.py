@@ -0,0 +1,101 @@
+"""The streamed cohort merge must follow the dtype contract and give what pd.concat of the cohorts gives."""
+import numpy as np
+import pandas as pd
+import pytest
+
+from library.cohort_merge import promote_dtypes, reconcile_schemas, stream_merge
+
+SAMPLES = {
+    'int64': [1, 2],
+    'float64': [1.5, np.nan],
+    'bool': [True, False],
+    'object': ['a', 'b'],
+}
+
+# None: 그 코호트에 컬럼이 없음
+PAIRS = [(left, right) for left in [*SAMPLES, None] for right in [*SAMPLES, None] if left or right]
+
+@pytest.mark.parametrize('left, right', PAIRS)
+def test_promote_dtypes_matches_concat(left, right):
+    parts = [pd.DataFrame({'c': SAMPLES[d]}) if d is not None else pd.DataFrame({'other': [0, 0]})
+             for d in (left, right)]
+    assert promote_dtypes([left, right]) == pd.concat(parts)['c'].dtype.name
+
+def _schemas():
+    return {
+        'SYM': ({'ID': 'object', 'date': 'object', 'panic': 'int64', 'HR_mean': 'float64', 'mood': 'object'}, set()),
+        'PXPN': ({'ID': 'object', 'date': 'object', 'panic': 'float64', 'HR_mean': 'object', 'severity': 'float64'},
+                 {'HR_mean'}),
+    }
+
+def test_reconcile_schemas_contract_and_drift():
+    columns, merged, report = reconcile_schemas(_schemas(), dtypes={'panic': 'float64', 'severity': 'float64'},
+                                                drop_columns=['mood'])
+    assert columns == ['ID', 'date', 'panic', 'HR_mean', 'severity']
+    assert merged == {'ID': 'object', 'date': 'object', 'panic': 'float64', 'HR_mean': 'object', 'severity': 'float64'}
+    issues = dict(zip(report['column'], report['issue']))
+    assert issues == {
+        'panic': 'dtype differs between cohorts; cast to declared float64',
+        'HR_mean': 'dtype differs between cohorts; mixed types within PXPN',
+        'severity': 'missing in SYM',
+    }
+    assert list(report.columns) == ['column', 'SYM', 'PXPN', 'declared', 'merged', 'issue']
+    assert report.set_index('column').loc['severity', 'SYM'] == ''
+
+@pytest.mark.parametrize('dtypes, message', [
+    ({'steps': 'float64'}, 'not found in any cohort'),
+    ({'severity': 'int64'}, 'missing in'),
+    ({'HR_mean': 'float64'}, 'mixed types within'),
+])
+def test_reconcile_schemas_rejects_contract_violations(dtypes, message):
+    with pytest.raises(ValueError, match=message):
+        reconcile_schemas(_schemas(), dtypes=dtypes)
+
+def test_mixed_column_declared_as_text():
+    _, merged, _ = reconcile_schemas(_schemas(), dtypes={'HR_mean': 'object'})
+    assert merged['HR_mean'] == 'object'
+
+@pytest.fixture
+def cohorts(tmp_path):
+    rng = np.random.default_rng(0)
+    sym = pd.DataFrame({
+        'ID': [f'SYM1-1-{i % 7}' for i in range(50)],
+        'date': pd.date_range('2023-01-01', periods=50).strftime('%Y-%m-%d'),
+        'panic': rng.integers(0, 3, 50),
+        'HR_mean': rng.normal(70, 5, 50),
+        'flag': rng.random(50) > 0.5,
+        'mood': rng.integers(0, 5, 50),
+    })
+    pxpn = pd.DataFrame({
+        'ID': [f'PXPN_{10000 + i % 5}' for i in range(30)],
+        'date': pd.date_range('2023-02-01', periods=30).strftime('%Y-%m-%d'),
+        'severity': rng.integers(0, 10, 30).astype(float),
+        'panic': np.where(rng.random(30) > 0.2, rng.integers(0, 3, 30), np.nan),
+        'HR_mean': rng.normal(70, 5, 30),
+        'flag': rng.integers(0, 2, 30),
+    })
+    paths = {'SYM': tmp_path / 'SYM_720.csv', 'PXPN': tmp_path / 'PXPN_720.csv'}
+    sym.to_csv(paths['SYM'], index=False)
+    pxpn.to_csv(paths['PXPN'], index=False)
+    return paths
+
+def test_stream_merge_matches_concat(cohorts, tmp_path):
+    output = tmp_path / 'merged_df.csv'
+    report = stream_merge(cohorts, output, dtypes={'panic': 'float64', 'severity': 'float64'},
+                          drop_columns=['mood', 'Unnamed: 0'], chunksize=7)
+    expected = pd.concat([pd.read_csv(p) for p in cohorts.values()], ignore_index=True).drop(columns='mood')
+    pd.testing.assert_frame_equal(pd.read_csv(output), pd.read_csv(pd.io.common.StringIO(expected.to_csv(index=False))))
+    assert set(report['column']) == {'panic', 'flag', 'severity'}
+    assert report.set_index('column').loc['flag', 'merged'] == 'int64'   # pd.concat: bool + int → int64
+
+def test_stream_merge_keeps_mixed_column_text(cohorts, tmp_path):
+    with open(cohorts['PXPN'], 'a') as f:
+        f.write('PXPN_10001,2023-03-03,1.0,1,abc,1\n')
+    output = tmp_path / 'merged_df.csv'
+    report = stream_merge(cohorts, output, chunksize=7)
+    assert 'mixed types within PXPN' in report.set_index('column').loc['HR_mean', 'issue']
+    merged = pd.read_csv(output, dtype={'HR_mean': str})
+    source = pd.concat([pd.read_csv(p, dtype={'HR_mean': str}) for p in cohorts.values()], ignore_index=True)
+    assert merged['HR_mean'].tolist() == source['HR_mean'].tolist()
+    with pytest.raises(ValueError, match='mixed types'):
+        stream_merge(cohorts, output, dtypes={'HR_mean': 'float64'}, chunksize=7)
@@ -0,0 +1,67 @@
+"""Compare library.delta_features with the per-ID loop that 2_stage built step_delta.csv with."""
+import numpy as np
+import pandas as pd
+import pytest
+
+from library.delta_features import delta_features, STEP_DELTA_SPEC
+
+# 기존 루프의 빈 DataFrame concat 경고 (pandas 2.1+)
+pytestmark = pytest.mark.filterwarnings("ignore:The behavior of DataFrame concatenation:FutureWarning")
+
+LEGACY_STEP_DELTA_COLUMNS = ['ID', 'date', 'steps', 'step_max', 'step_mean', 'step_hvar_mean', 'step_delta', 'step_max_delta',
+                             'step_mean_delta', 'step_hvar_mean_delta', 'step_delta2', 'step_max_delta2',
+                             'step_mean_delta2', 'step_hvar_mean_delta2']
+
+def _legacy_step_delta(step):
+    # 2_stage_SYM / 2_stage의 기존 step_delta 셀
+    step_delta = pd.DataFrame(columns=LEGACY_STEP_DELTA_COLUMNS)
+    for id in step['ID'].unique():
+        step_id = step.loc[(step.ID == id)]
+        time_per_day = pd.date_range(step_id.date.min(), step_id.date.max(), freq='D')
+        temp = pd.DataFrame()
+        temp['date'] = time_per_day
+        step_id = pd.merge(step_id, temp, how='right', on='date')
+        step_id.ID = id
+        step_id['step_delta'] = step_id['steps'].diff()
+        step_id['step_delta2'] = step_id['steps'].diff(periods=2)
+        step_id['step_max_delta'] = step_id['step_max'].diff()
+        step_id['step_max_delta2'] = step_id['step_max'].diff(periods=2)
+        step_id['step_mean_delta'] = step_id['step_mean'].diff()
+        step_id['step_mean_delta2'] = step_id['step_mean'].diff(periods=2)
+        step_id['step_hvar_mean_delta'] = step_id['step_hvar_mean'].diff()
+        step_id['step_hvar_mean_delta2'] = step_id['step_hvar_mean'].diff(periods=2)
+        step_delta = pd.concat([step_delta, step_id], axis=0)
+    step_delta['date'] = step_delta['date'].dt.strftime('%Y-%m-%d')
+    return step_delta.reset_index(drop=True)
+
+@pytest.fixture
+def step_date():
+    # step_date.csv의 컬럼 순서 (ID, date, steps, step_var, step_max, step_mean, step_hvar_mean), 빠진 날 포함
+    rng = np.random.default_rng(0)
+    rows = []
+    for pid in ['SYM1-1-7', 'PXPN_10001', 'SYM2-1-3']:
+        dates = pd.date_range('2021-03-01', periods=20, freq='D')[np.sort(rng.choice(20, 12, replace=False))]
+        for date in dates:
+            rows.append({'ID': pid, 'date': date.strftime('%Y-%m-%d'), 'steps': int(rng.integers(0, 9000)),
+                         'step_var': rng.random() * 100, 'step_max': int(rng.integers(0, 200)),
+                         'step_mean': rng.random() * 50, 'step_hvar_mean': rng.random() * 30})
+    step = pd.DataFrame(rows)
+    step['date'] = pd.to_datetime(step['date'])
+    return step
+
+def test_step_delta_column_order_matches_legacy_loop(step_date):
+    expected = _legacy_step_delta(step_date)
+    result = delta_features(step_date, STEP_DELTA_SPEC, by_period=True)
+    result['date'] = result['date'].dt.strftime('%Y-%m-%d')
+
+    assert list(result.columns) == list(expected.columns)
+    assert list(result.columns) == LEGACY_STEP_DELTA_COLUMNS + ['step_var']
+
+def test_step_delta_values_match_legacy_loop(step_date):
+    expected = _legacy_step_delta(step_date)
+    result = delta_features(step_date, STEP_DELTA_SPEC, by_period=True)
+    result['date'] = result['date'].dt.strftime('%Y-%m-%d')
+
+    numeric = [c for c in expected.columns if c not in ('ID', 'date')]
+    pd.testing.assert_frame_equal(result[['ID', 'date']], expected[['ID', 'date']].astype(object), check_dtype=False)
+    pd.testing.assert_frame_equal(result[numeric].astype(float), expected[numeric].astype(float))
@@ -0,0 +1,49 @@
+"""Duplicate (date, ID) heart-rate days are merged after parsing, minute by minute."""
+import importlib.util
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+_PATH = Path(__file__).resolve().parents[1] / 'data_scraping' / 'SYM' / 'utils_for_preprocessing.py'
+_spec = importlib.util.spec_from_file_location('sym_utils_for_preprocessing', _PATH)
+sym = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(sym)
+
+class _Session:
+    """WorkbookSession 대신 고정된 시트를 돌려주는 세션."""
+    def __init__(self, df):
+        self.df = df
+
+    def load(self, sheet_name, paths=None):
+        assert sheet_name == '라이프로그-심박수'
+        return self.df.copy()
+
+def _row(fill, start=0, stop=1440):
+    values = np.full(1440, -1)
+    values[start:stop] = fill
+    return ','.join(map(str, values))
+
+@pytest.fixture
+def sheet():
+    return pd.DataFrame({
+        '비식별키': ['B', 'A', 'A', 'A', 'B'],
+        '날짜': ['2023-01-02', '2023-01-01', '2023-01-02', '2023-01-01', '2023-01-01'],
+        '측정값': [_row(90), _row(60, 0, 720), _row(70), _row(65, 600, 1440), _row(80)],
+    })
+
+def test_duplicates_merge_first_valid(sheet):
+    hr = sym.deserialize_lifelog_heartrate('x.xlsx', session=_Session(sheet), merge_duplicates=True)
+    assert list(zip(hr.dates, hr.ids)) == [('2023-01-01', 'A'), ('2023-01-01', 'B'),
+                                           ('2023-01-02', 'A'), ('2023-01-02', 'B')]
+    assert hr.values.shape == (4, 1440)
+    expected = np.r_[np.full(720, 60.0), np.full(720, 65.0)]
+    np.testing.assert_array_equal(hr.values[0], expected)
+    np.testing.assert_array_equal(hr.values[1:, 0], [80.0, 70.0, 90.0])
+
+def test_duplicates_kept_without_merge(sheet):
+    hr = sym.deserialize_lifelog_heartrate('x.xlsx', session=_Session(sheet))
+    assert hr.values.shape == (5, 1440)
+    assert list(hr.ids) == ['B', 'A', 'A', 'A', 'B']
+    assert np.isnan(hr.values[1, 720:]).all()
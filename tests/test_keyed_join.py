@@ -0,0 +1,65 @@
+"""library.keyed_join must give what the chained pd.merge of the stage-3 notebooks gives."""
+from functools import reduce
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from library.keyed_join import NAT_DAY, align_to_master, encode_keys, master_calendar
+
+IDS = np.array(['SYM1-1-1', 'SYM1-1-2', 'PXPN_10001', 'PXPN_10002', np.nan], dtype=object)
+
+def _table(rng, n, name, shared=False):
+    # 결측 ID / NaT, 중복 (ID, date)와 빠진 날이 섞인 일별 표
+    dates = pd.Timestamp('2023-01-01') + pd.to_timedelta(rng.integers(0, 20, n), unit='D')
+    df = pd.DataFrame({
+        'ID': rng.choice(IDS, n),
+        'date': dates.where(rng.random(n) > 0.05),
+        name: rng.integers(0, 100, n),
+    })
+    if shared:
+        # 두 표에 같은 이름의 컬럼 → '_x'/'_y' 접미사
+        df['shared'] = rng.normal(size=n)
+    return df
+
+def _merge_chain(master, tables):
+    return reduce(lambda left, df: pd.merge(left, df, how='left', on=['ID', 'date']), tables, master)
+
+@pytest.mark.parametrize('seed', range(5))
+def test_align_matches_merge_chain(seed):
+    rng = np.random.default_rng(seed)
+    tables = [_table(rng, 60, f'f{i}', shared=i in (1, 3)) for i in range(4)]
+    master = master_calendar(tables, how='range')
+    master['age'] = rng.integers(20, 60, len(master))
+    # 캘린더에 없는 키와 NaT 날짜의 마스터 행
+    extra = pd.DataFrame({'ID': ['OTHER', 'SYM1-1-1'], 'date': [pd.Timestamp('2023-01-05'), pd.NaT], 'age': [30, 40]})
+    master = pd.concat([master, extra], ignore_index=True)
+    assert any(t.duplicated(['ID', 'date']).any() for t in tables)
+
+    pd.testing.assert_frame_equal(align_to_master(master, tables), _merge_chain(master, tables))
+
+def test_master_calendar_matches_loops():
+    rng = np.random.default_rng(0)
+    tables = [_table(rng, 50, 'a'), _table(rng, 30, 'b')]
+    keys = pd.concat([t[['ID', 'date']] for t in tables]).dropna()
+
+    observed = keys.drop_duplicates().sort_values(['ID', 'date']).reset_index(drop=True)
+    pd.testing.assert_frame_equal(master_calendar(tables, how='observed'), observed)
+
+    ranges = [pd.DataFrame({'ID': id_, 'date': pd.date_range(g['date'].min(), g['date'].max(), freq='D')})
+              for id_, g in keys.groupby('ID')]
+    expected = pd.concat(ranges, ignore_index=True)
+    pd.testing.assert_frame_equal(master_calendar(tables, how='range'), expected)
+
+def test_encode_keys_shares_codes():
+    a = pd.DataFrame({'ID': ['x', np.nan, 'y'], 'date': pd.to_datetime(['2023-01-02', '2023-01-02', None])})
+    b = pd.DataFrame({'ID': ['y', 'x'], 'date': ['2023-01-03', '2023-01-01']})
+    codes, days, uniques = encode_keys([a, b])
+    assert list(uniques[codes[0][[0, 2]]]) == ['x', 'y'] and codes[0][1] == -1
+    assert list(codes[1]) == [codes[0][2], codes[0][0]]
+    assert days[0][2] == NAT_DAY and days[1][1] - days[0][0] == -1
+
+def test_time_of_day_raises():
+    df = pd.DataFrame({'ID': ['x'], 'date': [pd.Timestamp('2023-01-01 12:00')]})
+    with pytest.raises(ValueError):
+        encode_keys([df])
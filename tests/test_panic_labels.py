@@ -0,0 +1,61 @@
+"""The grouped panic labels must match the per-row loops they replaced in 3_stage_SYM."""
+import numpy as np
+import pandas as pd
+import pytest
+
+from library.panic_labels import fill_pre_event_days, pre_event_skip_counts
+
+def _loop_fill(df):
+    df = df.copy()
+    for i in range(1, len(df)):
+        if df.loc[i, 'panic'] == 2:
+            j = i - 1
+            while j >= 0 and df.loc[j, 'ID'] == df.loc[i, 'ID']:
+                if pd.isna(df.loc[j, 'panic']):
+                    df.loc[j, 'panic'] = 1
+                    break
+                elif df.loc[j, 'panic'] == 2:
+                    j -= 1
+                else:
+                    break
+    return df['panic']
+
+def _loop_skip_counts(df):
+    counts = {'consecutive': 0, 'first_date': 0, 'non_nan_prev': 0}
+    for _, group in df.groupby('ID'):
+        group = group.reset_index(drop=True)
+        for i in range(len(group)):
+            if group.loc[i, 'panic'] == 2:
+                if i == 0:
+                    counts['first_date'] += 1
+                else:
+                    prev_val = group.loc[i - 1, 'panic']
+                    if prev_val == 2:
+                        counts['consecutive'] += 1
+                    elif pd.notna(prev_val):
+                        counts['non_nan_prev'] += 1
+    return counts
+
+def _daily_table(seed, n=400):
+    rng = np.random.default_rng(seed)
+    ids = rng.choice(np.array(['A', 'B', 'C', 'D', np.nan], dtype=object), n, p=[0.3, 0.25, 0.2, 0.1, 0.15])
+    panic = rng.choice([np.nan, 0.0, 2.0], n, p=[0.5, 0.2, 0.3])
+    df = pd.DataFrame({'ID': ids, 'date': rng.integers(0, 10**6, n), 'panic': panic})
+    return df.sort_values(['ID', 'date']).reset_index(drop=True)
+
+@pytest.mark.parametrize('seed', range(5))
+def test_matches_loops(seed):
+    df = _daily_table(seed)
+    assert df['ID'].isna().any()
+    pd.testing.assert_series_equal(fill_pre_event_days(df, 'panic'), _loop_fill(df))
+    filled = df.assign(panic=_loop_fill(df))
+    assert pre_event_skip_counts(filled, 'panic') == _loop_skip_counts(filled)
+
+def test_missing_ids_are_not_one_patient():
+    # read_csv gives NaN for a missing ID, and NaN != NaN in the loop
+    df = pd.DataFrame({'ID': ['A', 'A', np.nan, np.nan, np.nan],
+                       'date': [1, 2, 1, 2, 3],
+                       'panic': [np.nan, 2.0, np.nan, 2.0, 2.0]})
+    pd.testing.assert_series_equal(fill_pre_event_days(df, 'panic'), _loop_fill(df))
+    assert np.isnan(fill_pre_event_days(df, 'panic')[2])
+    assert pre_event_skip_counts(df, 'panic') == {'consecutive': 0, 'first_date': 0, 'non_nan_prev': 0}
@@ -0,0 +1,54 @@
+"""Reading columns/patients through the partitioned dataset must give what the CSV path gives."""
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from library.pandas_utils import read_csv
+from library.partitioned_store import dataset_path, is_current, write_partitioned
+
+CHUNKSIZE = 1000
+
+@pytest.fixture
+def hr_csv(tmp_path):
+    rng = np.random.default_rng(0)
+    n = 5000
+    ids = [f'SYM1-1-{i}' for i in range(40)] + [f'PXPN_{10000 + i}' for i in range(40)] + ['OTHER1']
+    df = pd.DataFrame({
+        'date': pd.date_range('2023-01-01', periods=n, freq='h').strftime('%Y-%m-%d'),
+        'ID': rng.choice(ids, n),
+        'HR': rng.normal(70, 5, n).astype(np.float32),
+        'n': rng.integers(0, 9, n).astype(float),
+        'flag': rng.random(n) > 0.5,
+        'text': np.where(rng.random(n) > 0.3, 'a', 'b'),
+    })
+    df.loc[4000:, 'n'] = np.nan   # 앞 chunk는 int, 뒤 chunk는 float로 읽힘
+    df.loc[::7, 'text'] = np.nan
+    path = tmp_path / 'HR.csv'
+    df.to_csv(path, index=False)
+    return path
+
+def _csv_read(path, **kwargs):
+    os.utime(path)   # 데이터셋을 오래된 것으로 만들어 CSV 경로로 읽음
+    assert not is_current(path)
+    return read_csv(path, **kwargs)
+
+@pytest.mark.parametrize('columns, ids', [
+    (['date', 'ID', 'HR'], None),
+    (['HR', 'n', 'flag', 'text'], None),
+    (None, ['SYM1-1-3', 'PXPN_10005', 'missing']),
+    (['ID', 'n'], ['OTHER1']),
+])
+def test_dataset_matches_csv(hr_csv, columns, ids):
+    assert write_partitioned(hr_csv, chunksize=CHUNKSIZE) is not None
+    assert is_current(hr_csv)
+    from_dataset = read_csv(hr_csv, columns=columns, ids=ids)
+    pd.testing.assert_frame_equal(from_dataset, _csv_read(hr_csv, columns=columns, ids=ids))
+
+def test_mixed_column_falls_back_to_csv(hr_csv):
+    with open(hr_csv, 'a') as f:
+        f.write('2023-07-01,SYM1-1-1,70.0,abc,True,a\n')
+    assert write_partitioned(hr_csv, chunksize=CHUNKSIZE) is None
+    assert not dataset_path(hr_csv).exists()
+    assert len(read_csv(hr_csv, columns=['ID', 'n'])) == 5001